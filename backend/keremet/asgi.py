@@ -5,6 +5,10 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+Под ASGI async-вьюхи (/api/async/..., /api/auth/login/async/,
+/api/time-slots/stream/) выполняются прямо в event loop, без передачи
+запроса в поток; синхронные DRF-вьюхи по-прежнему работают через sync_to_async.
 """
 
 import os
@@ -24,12 +24,14 @@ INSTALLED_APPS = [
    ]
 
 MIDDLEWARE = [
+       'medical_system.metrics.RequestMetricsMiddleware',
        'django.middleware.security.SecurityMiddleware',
        'django.contrib.sessions.middleware.SessionMiddleware',
        'corsheaders.middleware.CorsMiddleware',
        'django.middleware.common.CommonMiddleware',
        'django.middleware.csrf.CsrfViewMiddleware',
        'django.contrib.auth.middleware.AuthenticationMiddleware',
+       'medical_system.routers.ReadReplicaMiddleware',
        'django.contrib.messages.middleware.MessageMiddleware',
        'django.middleware.clickjacking.XFrameOptionsMiddleware',
    ]
@@ -54,17 +56,82 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'keremet.wsgi.application'
 
+# Бэкенд работает под ASGI, а там каждый запрос выполняет ORM в своём
+# потоке, и постоянные соединения не переиспользуются, а копятся до лимита
+# Postgres. Поэтому по умолчанию CONN_MAX_AGE=0: соединение закрывается
+# после запроса. Переиспользование соединений — через пулер (PgBouncer в
+# режиме transaction), DB_HOST/DB_PORT указывают на него, а
+# DB_DISABLE_SERVER_SIDE_CURSORS=true отключает серверные курсоры
+# (iterator()), которые такой пулер не поддерживает. DB_CONN_MAX_AGE>0
+# имеет смысл только для WSGI-запуска (gunicorn keremet.wsgi).
 DATABASES = {
        'default': {
            'ENGINE': 'django.db.backends.postgresql',
-           'NAME': 'medical_db',
-           'USER': 'postgres',
-           'PASSWORD': 'admin',
-           'HOST': 'localhost',  # Для локальной разработки
-           'PORT': '5432',
+           'NAME': os.environ.get('DB_NAME', 'medical_db'),
+           'USER': os.environ.get('DB_USER', 'postgres'),
+           'PASSWORD': os.environ.get('DB_PASSWORD', 'admin'),
+           'HOST': os.environ.get('DB_HOST', 'localhost'),  # Для локальной разработки
+           'PORT': os.environ.get('DB_PORT', '5432'),
+           'CONN_MAX_AGE': int(os.environ['DB_CONN_MAX_AGE']) if os.environ.get('DB_CONN_MAX_AGE') else 0,
+           'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', 'true').lower() == 'true',
+           'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_DISABLE_SERVER_SIDE_CURSORS', 'false').lower() == 'true',
+           'OPTIONS': {
+               'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', '5')),
+           },
        }
    }
 
+# Реплики для чтения: DB_REPLICA_HOSTS=host1,host2 добавляет алиасы replica_1,
+# replica_2 с теми же учётными данными. Безопасные запросы к справочнику врачей,
+# слотам, анализам и дашбордам читают из реплик; после записи клиент
+# READ_REPLICA_PIN_SECONDS секунд читает из default.
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['medical_system.routers.ReadReplicaRouter']
+READ_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '5'))
+READ_REPLICA_PIN_CACHE = 'default'
+
+# Метрики запросов отдаются на /api/metrics/ в формате Prometheus по заголовку
+# "Authorization: Bearer <METRICS_TOKEN>"; без токена эндпоинт закрыт (кроме
+# DEBUG). С тем же токеном /api/health/ показывает статистику соединений и
+# ошибки баз. Запросы дольше METRICS_SLOW_REQUEST_SECONDS пишутся в лог
+# medical_system.slow_requests вместе с SQL, но только доля
+# METRICS_SLOW_REQUEST_SAMPLE_RATE из них.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_SLOW_REQUEST_SECONDS = float(os.environ.get('METRICS_SLOW_REQUEST_SECONDS', '0.5'))
+METRICS_SLOW_REQUEST_SAMPLE_RATE = float(os.environ.get('METRICS_SLOW_REQUEST_SAMPLE_RATE', '0.2'))
+
+# Кэш по умолчанию — память процесса; для нескольких воркеров задайте
+# REDIS_URL=redis://host:6379/0, чтобы кэш был общим. С репликами
+# (DB_REPLICA_HOSTS) общий кэш обязателен: в нём хранится закрепление клиента
+# за default после записи (READ_REPLICA_PIN_CACHE), см. medical_system.E001.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'keremet-default',
+        }
+    }
+
+# Справочник врачей (/api/doctors/)
+DOCTOR_DIRECTORY_CACHE = 'default'
+DOCTOR_DIRECTORY_CACHE_TIMEOUT = 600
+
+# Пользователи для JWT-аутентификации (сбрасываются при сохранении User)
+AUTH_USER_CACHE = 'default'
+AUTH_USER_CACHE_TIMEOUT = 60
+
 AUTH_PASSWORD_VALIDATORS = [
        {
            'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -110,11 +177,16 @@ CORS_ALLOW_HEADERS = [
 # REST Framework settings
 REST_FRAMEWORK = {
        'DEFAULT_AUTHENTICATION_CLASSES': (
-           'rest_framework_simplejwt.authentication.JWTAuthentication',
+           'medical_system.authentication.CachedJWTAuthentication',
        ),
        'DEFAULT_PERMISSION_CLASSES': [
            'rest_framework.permissions.IsAuthenticated',
        ],
+       # JSON через orjson (если установлен), байты те же, что у JSONRenderer
+       'DEFAULT_RENDERER_CLASSES': [
+           'medical_system.renderers.FastJSONRenderer',
+           'rest_framework.renderers.BrowsableAPIRenderer',
+       ],
    }
 
 # JWT settings
@@ -131,12 +203,33 @@ SIMPLE_JWT = {
     'TOKEN_TYPE_CLAIM': 'token_type',
 }
 
+# Вход: token bucket на email и IP, пул потоков для PBKDF2 в async-входе
+LOGIN_RATE_LIMIT_ENABLED = True
+LOGIN_RATE_LIMIT_BURST = 10
+LOGIN_RATE_LIMIT_PER_SECOND = 0.2
+LOGIN_HASH_WORKERS = 4
+# Сколько доверенных прокси (nginx, балансировщик) стоит перед Django. 0 —
+# X-Forwarded-For игнорируется и IP клиента берётся из REMOTE_ADDR.
+TRUSTED_PROXY_COUNT = int(os.environ.get('TRUSTED_PROXY_COUNT', '0'))
+
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 EMAIL_HOST_USER = 'your_email@gmail.com'  # Замените на ваш email
 EMAIL_HOST_PASSWORD = 'your_app_password'  # Замените на пароль приложения
+DEFAULT_FROM_EMAIL = 'from@example.com'
+
+# Ответ на запрос с Idempotency-Key повторяется столько часов; старые ключи
+# удаляет python manage.py clean_idempotency_keys (запускать по cron)
+IDEMPOTENCY_KEY_TTL_HOURS = 24
+
+# Письма отправляет воркер: python manage.py send_outbox --loop
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_BACKOFF_SECONDS = 60
+EMAIL_OUTBOX_MAX_BACKOFF_SECONDS = 3600
+# Письма, взятые воркером, который не записал результат за это время, берутся снова
+EMAIL_OUTBOX_LEASE_SECONDS = 300
 
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
@@ -147,6 +240,37 @@ USE_TZ = True
 MEDIA_URL = '/media/'  # Добавляем слеш в начале
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Файлы результатов анализов лежат в PRIVATE_MEDIA_ROOT, вне MEDIA_ROOT, и
+# отдаются только через /api/analyses/<id>/download/.
+# PROTECTED_MEDIA_SERVER=nginx — Django проверяет доступ и отвечает заголовком
+# X-Accel-Redirect, файл отдаёт nginx:
+#     location /protected-media/ { internal; alias /path/to/backend/private_media/; }
+# PROTECTED_MEDIA_SERVER=sendfile — заголовок X-Sendfile (Apache mod_xsendfile, lighttpd).
+# Без настройки файл стримит сам Django.
+PRIVATE_MEDIA_ROOT = os.environ.get('PRIVATE_MEDIA_ROOT') or os.path.join(BASE_DIR, 'private_media')
+PROTECTED_MEDIA_SERVER = os.environ.get('PROTECTED_MEDIA_SERVER') or None
+PROTECTED_MEDIA_INTERNAL_URL = '/protected-media/'
+
+# Докачиваемые загрузки (/api/uploads/): части пишутся во временный файл в
+# CHUNKED_UPLOAD_DIR, готовый файл кладётся в blobs/ (media/ или private_media/) под своим SHA-256.
+# Незавершённые сессии старше CHUNKED_UPLOAD_EXPIRE_HOURS удаляет clean_uploads.
+CHUNKED_UPLOAD_DIR = os.environ.get('CHUNKED_UPLOAD_DIR') or os.path.join(BASE_DIR, 'media', 'chunked')
+CHUNKED_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+CHUNKED_UPLOAD_MAX_SIZE = int(os.environ.get('CHUNKED_UPLOAD_MAX_SIZE', str(2 * 1024 * 1024 * 1024)))
+CHUNKED_UPLOAD_EXPIRE_HOURS = 24
+
+# Поток слотов /api/time-slots/stream/ (SSE) работает под ASGI:
+#     uvicorn keremet.asgi:application
+# События раздаются подписчикам внутри процесса. Токен передаётся в ?token=,
+# поэтому в логах доступа веб-сервера query string стоит отключить или маскировать.
+SLOT_STREAM_HEARTBEAT_SECONDS = 15
+SLOT_STREAM_MAX_SECONDS = 300
+SLOT_STREAM_RETRY_MS = 3000
+
+# Уменьшенные копии фото врачей (card, profile, profile_2x в WebP и JPEG)
+# готовятся после загрузки в пуле потоков; для старых фото — photo_variants.
+PHOTO_VARIANT_WORKERS = 2
+
 # Static files
 STATIC_URL = '/static/'  # Добавляем слеш в начале
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
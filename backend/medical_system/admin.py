@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor
+from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor, OutboxEmail
 
 @admin.register(Doctor)
 class DoctorAdmin(admin.ModelAdmin):
@@ -15,6 +15,11 @@ class DoctorAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'status', 'attempts', 'next_attempt_at', 'sent_at']
+    list_filter = ['status']
+
 admin.site.register(User)
 admin.site.register(TimeSlot)
 admin.site.register(Appointment)
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .caching import (
+    aget_cached_directory, aget_cached_user, aget_directory_version, aset_cached_directory, directory_etag,
+)
+from .dashboard import DOCTOR_SECTIONS, PATIENT_SECTIONS, abuild_dashboard
+from .filters import TimeSlotFilter, day_bounds
+from .login import (
+    check_rate_limit, client_ip, afind_user, login_payload, record_login, retry_after_header,
+    password_executor,
+)
+from .mixins import conditional_etag, list_aggregates
+from .models import Doctor, TimeSlot
+from .routers import read_from
+from .serializers import DoctorSerializer, TimeSlotSerializer, UserSerializer
+from .renderers import FastJSONRenderer
+from .slot_events import OVERFLOW, broker, format_event
+from .views import user_etag
+
+logger = logging.getLogger(__name__)
+
+
+def read_json(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    """
+    Вход для ASGI: пользователь читается async ORM, PBKDF2 считается в
+    ограниченном пуле потоков, так что event loop не блокируется, а число
+    одновременно занятых хэшированием ядер не превышает LOGIN_HASH_WORKERS.
+    """
+
+    async def post(self, request):
+        data = read_json(request)
+        if data is None:
+            return JsonResponse({"detail": "Некорректный JSON."}, status=400)
+        email = data.get('email')
+        password = data.get('password')
+        if not email or not password:
+            return JsonResponse({"detail": "Укажите email и пароль."}, status=400)
+
+        retry_after = check_rate_limit(email, client_ip(request))
+        if retry_after:
+            logger.warning(f"Login rate limit exceeded for {email}")
+            response = JsonResponse({"detail": "Слишком много попыток входа. Попробуйте позже."}, status=429)
+            response['Retry-After'] = retry_after_header(retry_after)
+            return response
+
+        user = await afind_user(email)
+        if user is None:
+            logger.warning(f"Login attempt failed: User with email {email} not found")
+            return JsonResponse({"detail": "Пользователь с таким email не найден."}, status=404)
+
+        loop = asyncio.get_running_loop()
+        valid = await loop.run_in_executor(password_executor, user.check_password, password)
+        if not valid or not user.is_active:
+            return JsonResponse({"detail": "Неверный пароль."}, status=401)
+
+        await sync_to_async(record_login)(user)
+        logger.info(f"User {email} logged in successfully")
+        return JsonResponse(login_payload(user))
+
+
+async def authenticate_token(request, query_param=None):
+    """
+    Пользователь по access-токену из заголовка Authorization (или из
+    ``query_param`` — EventSource в браузере не умеет передавать заголовки).
+    Проверки те же, что у CachedJWTAuthentication, но кэш и БД — через async API.
+    """
+    raw = request.GET.get(query_param) if query_param else None
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        raw = header[len('Bearer '):]
+    if not raw:
+        return None
+    try:
+        validated = CachedJWTAuthentication().get_validated_token(raw.encode())
+        user_id = validated[api_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        return None
+    user = await aget_cached_user(user_id, role=validated.get('role'))
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
+async def slot_snapshot(doctor_id, day):
+    slots = TimeSlot.objects.filter(doctor_id=doctor_id)
+    if day is None:
+        slots = slots.filter(start_time__gte=timezone.now())
+    else:
+        start, end = day_bounds(day)
+        slots = slots.filter(start_time__gte=start, start_time__lt=end)
+    rows = slots.order_by('start_time', 'id').values('id', 'doctor', 'start_time', 'end_time', 'status')
+    return [row async for row in rows]
+
+
+async def slot_events(doctor_id, day):
+    subscription = broker.subscribe(doctor_id, day)
+    loop = asyncio.get_running_loop()
+    # Поток периодически закрывается: EventSource переподключится, получит
+    # свежий снимок, а токен будет проверен заново
+    deadline = loop.time() + settings.SLOT_STREAM_MAX_SECONDS
+    try:
+        yield f'retry: {settings.SLOT_STREAM_RETRY_MS}\n\n'.encode()
+        # Подписка раньше снимка, чтобы не потерять изменения между ними
+        yield format_event('snapshot', await slot_snapshot(doctor_id, day))
+        while True:
+            timeout = min(settings.SLOT_STREAM_HEARTBEAT_SECONDS, deadline - loop.time())
+            if timeout <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                # Комментарий не даёт прокси закрыть молчащее соединение
+                yield b': ping\n\n'
+                continue
+            if event is OVERFLOW:
+                yield format_event('snapshot', await slot_snapshot(doctor_id, day))
+                continue
+            event_id, payload = event
+            yield format_event('slot', payload, event_id)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+class SlotStreamView(View):
+    """
+    Server-sent events со слотами врача:
+    GET /api/time-slots/stream/?doctor=<id профиля>[&date=YYYY-MM-DD]&token=<access>.
+
+    Сначала событие ``snapshot`` со слотами дня (без date — всеми будущими),
+    затем ``slot`` на каждое бронирование, отмену, создание, изменение или
+    удаление слота (status DELETED). Держать поток открытым умеет только
+    ASGI (keremet.asgi); под WSGI отдаётся один снимок, и EventSource
+    переподключается через SLOT_STREAM_RETRY_MS, как при опросе.
+    """
+
+    async def get(self, request):
+        user = await authenticate_token(request, query_param='token')
+        if user is None:
+            return JsonResponse({"detail": "Учетные данные не были предоставлены."}, status=401)
+        try:
+            doctor = int(request.GET['doctor'])
+            day = date.fromisoformat(request.GET['date']) if request.GET.get('date') else None
+        except (KeyError, ValueError):
+            return JsonResponse({"detail": "Укажите doctor и date в формате YYYY-MM-DD."}, status=400)
+        doctor_id = await Doctor.objects.filter(pk=doctor).values_list('user_id', flat=True).afirst()
+        if doctor_id is None:
+            return JsonResponse({"detail": "Врач не найден."}, status=404)
+
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(slot_events(doctor_id, day), content_type='text/event-stream')
+        else:
+            snapshot = await slot_snapshot(doctor_id, day)
+            response = HttpResponse(
+                f'retry: {settings.SLOT_STREAM_RETRY_MS}\n\n'.encode() + format_event('snapshot', snapshot),
+                content_type='text/event-stream',
+            )
+        response['Cache-Control'] = 'no-cache'
+        # nginx не должен буферизовать поток
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+def render_json(data, status=200):
+    # Тот же рендерер, что у DRF-вьюх: ответы совпадают байт в байт
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
+
+
+class AsyncReadView(View):
+    """
+    Чтение без DRF для ASGI: JWT из заголовка, проверка роли, ответ в JSON
+    того же вида, что у синхронного эндпоинта. Запросы идут через async ORM,
+    поэтому, пока ждём базу, event loop обслуживает другие запросы.
+    """
+    roles = None
+    use_read_replica = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await authenticate_token(request)
+        if user is None:
+            response = render_json({'detail': 'Authentication credentials were not provided.'}, status=401)
+            response['WWW-Authenticate'] = 'Bearer realm="api"'
+            return response
+        if self.roles and user.role not in self.roles:
+            return render_json({'detail': 'You do not have permission to perform this action.'}, status=403)
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncMeView(AsyncReadView):
+    """GET /api/async/users/me/ — как UserViewSet.me."""
+
+    async def get(self, request):
+        user = request.user
+        etag = user_etag(user)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = render_json(UserSerializer(user, context={'request': request}).data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AsyncDoctorDirectoryView(AsyncReadView):
+    """GET /api/async/doctors/[?specialty=] — справочник врачей с тем же кэшем, что у DoctorViewSet.list."""
+
+    async def directory(self, request, specialty):
+        doctors = Doctor.objects.select_related('user')
+        if specialty:
+            doctors = doctors.filter(specialty=specialty)
+        rows = [doctor async for doctor in doctors.aiterator()]
+        return DoctorSerializer(rows, many=True, context={'request': request}).data
+
+    async def get(self, request):
+        specialty = request.GET.get('specialty')
+        if set(request.GET) - {'specialty'}:
+            return render_json(await self.directory(request, specialty))
+
+        version = await aget_directory_version()
+        etag = quote_etag(directory_etag(version, request, specialty))
+        last_modified = int(version)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        data = await aget_cached_directory(version, request, specialty)
+        if data is None:
+            with read_from(None):
+                data = await self.directory(request, specialty)
+            await aset_cached_directory(version, request, specialty, data)
+        response = render_json(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class AsyncTimeSlotListView(AsyncReadView):
+    """GET /api/async/time-slots/ — как TimeSlotViewSet.list, с теми же фильтрами и ETag."""
+
+    async def get(self, request):
+        user = request.user
+        if user.role == 'DOCTOR':
+            queryset = TimeSlot.objects.filter(doctor=user)
+        else:
+            queryset = TimeSlot.objects.filter(status='AVAILABLE')
+        queryset = queryset.order_by('start_time')
+
+        filterset = TimeSlotFilter(request.GET, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            return render_json({field: list(errors) for field, errors in filterset.errors.items()}, status=400)
+        stats = await filterset.qs.order_by().aaggregate(
+            **list_aggregates(TimeSlot, 'updated_at', TimeSlotSerializer.Meta.select_related)
+        )
+        etag = conditional_etag(request.get_full_path(), user.pk, 'json', *stats.values())
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        slots = filterset.qs.select_related(*TimeSlotSerializer.Meta.select_related)
+        slots = [slot async for slot in slots.aiterator()]
+        response = render_json(TimeSlotSerializer(slots, many=True, context={'request': request}).data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AsyncDashboardSummaryView(AsyncReadView):
+    """Кабинет одним запросом, как DashboardSummaryView."""
+    sections = {}
+    default_limit = 5
+    max_limit = 50
+
+    async def get(self, request):
+        try:
+            limit = int(request.GET.get('limit', self.default_limit))
+        except ValueError:
+            return render_json({'error': 'limit must be an integer'}, status=400)
+        limit = max(1, min(limit, self.max_limit))
+        return render_json(await abuild_dashboard(request, self.sections, limit))
+
+
+class AsyncPatientDashboardView(AsyncDashboardSummaryView):
+    roles = ('PATIENT',)
+    sections = PATIENT_SECTIONS
+
+
+class AsyncDoctorDashboardView(AsyncDashboardSummaryView):
+    roles = ('DOCTOR',)
+    sections = DOCTOR_SECTIONS
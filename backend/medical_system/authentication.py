@@ -0,0 +1,38 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .caching import get_cached_user
+
+
+def tokens_for_user(user):
+    """Пара токенов с ролью и именем в claims, чтобы клиенту и серверу не нужен был лишний запрос."""
+    refresh = RefreshToken.for_user(user)
+    refresh['role'] = user.role
+    refresh['full_name'] = f"{user.first_name} {user.last_name}"
+    return refresh
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация без запроса пользователя на каждый вызов API.
+
+    Пользователь собирается из кэша (сбрасывается сигналом при сохранении
+    User); роль из токена сверяется с кэшем, при расхождении данные
+    перечитываются из БД.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id, role=validated_token.get('role'))
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
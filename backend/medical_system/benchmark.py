@@ -0,0 +1,222 @@
+"""
+Нагрузочные замеры API: синтетические данные и сценарий смешанной нагрузки.
+
+Данные помечены доменом BENCH_DOMAIN в email, поэтому их можно сгенерировать
+рядом с рабочими и удалить, не трогая остальное.
+"""
+import json
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connections
+from django.test import Client
+from django.utils import timezone
+
+from .authentication import tokens_for_user
+from .models import Doctor, TimeSlot, Analysis
+from .seeding import SPECIALTIES, flush_seeded, seed_database, seeded_users
+
+BENCH_DOMAIN = 'bench.keremet.kg'
+BENCH_PASSWORD = 'bench-password'
+
+
+def bench_users():
+    return seeded_users(BENCH_DOMAIN)
+
+
+def flush_dataset():
+    flush_seeded(BENCH_DOMAIN)
+
+
+def generate_dataset(doctors, patients, slots, appointments, seed=0, batch_size=5000, log=None):
+    """Данные бенчмарка — тот же генератор, что у команды seed, в домене BENCH_DOMAIN."""
+    return seed_database(doctors, patients, slots, appointments, seed=seed, domain=BENCH_DOMAIN,
+                         password=BENCH_PASSWORD, batch_size=batch_size, log=log)
+
+
+def percentile(sorted_values, share):
+    """Процентиль по ближайшему рангу."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(share * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Workload:
+    """
+    Смешанный сценарий поверх тестового клиента Django: справочник врачей,
+    слоты, запись и отмена, кабинеты, загрузка результата анализа.
+    Запросы идут через весь стек middleware и JWT-аутентификацию.
+    """
+
+    MIX = {
+        'browse_doctors': 25,
+        'list_slots': 25,
+        'dashboard': 20,
+        'book': 12,
+        'cancel': 8,
+        'upload_analysis': 10,
+    }
+
+    def __init__(self, seed=0, mix=None):
+        self.rng = random.Random(seed)
+        self.mix = mix or self.MIX
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        # Операции, которые не смогли выполниться: нет свободных слотов, записей для отмены
+        self.skipped = defaultdict(int)
+        self.booked = []
+
+        users = bench_users().order_by('id')
+        self.patients = list(users.filter(role='PATIENT')[:200])
+        self.doctors = list(users.filter(role='DOCTOR')[:200])
+        if not self.patients or not self.doctors:
+            raise ValueError('No benchmark data: generate it first')
+        self.tokens = {user.pk: str(tokens_for_user(user).access_token) for user in self.patients + self.doctors}
+        self.doctor_profiles = dict(
+            Doctor.objects.filter(user__in=self.doctors).values_list('user_id', 'id')
+        )
+        self.free_slots = list(
+            TimeSlot.objects.filter(doctor__in=self.doctors, status='AVAILABLE', start_time__gte=timezone.now())
+            .order_by('?').values_list('id', flat=True)[:5000]
+        )
+        self.analyses = list(
+            Analysis.objects.filter(doctor__in=self.doctors).values_list('id', 'doctor_id')[:1000]
+        )
+
+    def skip(self, name):
+        with self.lock:
+            self.skipped[name] += 1
+
+    def pick(self, items):
+        with self.lock:
+            return self.rng.choice(items)
+
+    def request(self, name, client, method, path, user, **extra):
+        started = time.perf_counter()
+        response = getattr(client, method)(path, HTTP_AUTHORIZATION=f'Bearer {self.tokens[user.pk]}', **extra)
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.latencies[name].append(elapsed)
+            self.statuses[name][response.status_code] += 1
+        return response
+
+    def browse_doctors(self, client):
+        specialty = self.pick([None, *SPECIALTIES])
+        self.request('browse_doctors', client, 'get', '/api/doctors/', self.pick(self.patients),
+                     data={'specialty': specialty} if specialty else None)
+
+    def list_slots(self, client):
+        doctor = self.pick(self.doctors)
+        day = timezone.localdate() + timedelta(days=self.pick(range(7)))
+        params = {'date': day.isoformat()}
+        if doctor.pk in self.doctor_profiles:
+            params['doctor'] = self.doctor_profiles[doctor.pk]
+        self.request('list_slots', client, 'get', '/api/time-slots/', self.pick(self.patients), data=params)
+
+    def dashboard(self, client):
+        if self.pick([True, False]):
+            self.request('dashboard', client, 'get', '/api/patient/dashboard/', self.pick(self.patients))
+        else:
+            self.request('dashboard', client, 'get', '/api/doctor/dashboard/', self.pick(self.doctors))
+
+    def book(self, client):
+        with self.lock:
+            slot_id = self.free_slots.pop() if self.free_slots else None
+        if slot_id is None:
+            return self.skip('book')
+        patient = self.pick(self.patients)
+        response = self.request(
+            'book', client, 'post', '/api/appointments/', patient,
+            data=json.dumps({'time_slot': slot_id, 'status': 'SCHEDULED', 'reason': 'Бенчмарк'}),
+            content_type='application/json',
+        )
+        if response.status_code == 201:
+            with self.lock:
+                self.booked.append((response.json()['id'], patient))
+
+    def cancel(self, client):
+        with self.lock:
+            booked = self.booked.pop() if self.booked else None
+        if booked is None:
+            # Отменять пока нечего: считаем пропуск и записываемся, чтобы было что отменить дальше
+            self.skip('cancel')
+            return self.book(client)
+        appointment_id, patient = booked
+        self.request('cancel', client, 'patch', f'/api/appointments/{appointment_id}/cancel/', patient)
+
+    def upload_analysis(self, client):
+        if not self.analyses:
+            return self.skip('upload_analysis')
+        analysis_id, doctor_id = self.pick(self.analyses)
+        doctor = next(user for user in self.doctors if user.pk == doctor_id)
+        upload = SimpleUploadedFile('result.pdf', b'%PDF-1.4\n' + b'0' * 20_000, content_type='application/pdf')
+        self.request('upload_analysis', client, 'post', f'/api/analyses/{analysis_id}/upload_result/', doctor,
+                     data={'result_file': upload})
+
+    def run(self, total, concurrency=1):
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        plan = self.rng.choices(names, weights=weights, k=total)
+
+        def worker(operations):
+            client = Client()
+            try:
+                for name in operations:
+                    getattr(self, name)(client)
+            finally:
+                if concurrency > 1:
+                    connections.close_all()
+
+        started = time.perf_counter()
+        if concurrency > 1:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(worker, [plan[i::concurrency] for i in range(concurrency)]))
+        else:
+            worker(plan)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        endpoints = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            statuses = self.statuses[name]
+            endpoints[name] = {
+                'requests': len(values),
+                'throughput': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 2),
+                'errors': sum(count for code, count in statuses.items() if code >= 500),
+                'statuses': {str(code): count for code, count in sorted(statuses.items())},
+            }
+        total = sum(endpoint['requests'] for endpoint in endpoints.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'throughput': round(total / elapsed, 2) if elapsed else 0.0,
+            'endpoints': endpoints,
+            'skipped': dict(sorted(self.skipped.items())),
+            # Операции с ненулевым весом, не сделавшие ни одного запроса: прогон не отражает смесь
+            'missing': sorted(name for name, weight in self.mix.items() if weight and name not in endpoints),
+        }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Эндпоинты, у которых p95 вырос больше чем на ``tolerance`` относительно базового прогона."""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous or not previous['p95_ms']:
+            continue
+        change = current['p95_ms'] / previous['p95_ms'] - 1
+        if change > tolerance:
+            regressions.append((name, previous['p95_ms'], current['p95_ms'], change))
+    return regressions
@@ -0,0 +1,109 @@
+"""
+Контентно-адресуемое хранилище загруженных файлов.
+
+Файл лежит под своим SHA-256 в подкаталогах по первым байтам хеша
+(``blobs/3f/a9/3fa9….pdf``), поэтому одинаковые файлы хранятся один раз,
+а каталоги не разрастаются до сотен тысяч записей. Публичные файлы (фото
+врачей) лежат в MEDIA_ROOT, результаты анализов — в PRIVATE_MEDIA_ROOT,
+который не раздаётся по MEDIA_URL.
+"""
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+
+BLOB_ROOT = 'blobs'
+READ_SIZE = 1024 * 1024
+
+
+def blob_name(digest, filename):
+    ext = os.path.splitext(filename)[1].lower()[:10]
+    return f'{BLOB_ROOT}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+def file_digest(fileobj):
+    """SHA-256 файла, читая его кусками, без загрузки в память целиком."""
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(READ_SIZE), b''):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+class PrivateStorage(FileSystemStorage):
+    """Файлы в PRIVATE_MEDIA_ROOT: URL у них нет, отдаются только через serve_file."""
+
+    @property
+    def base_location(self):
+        return settings.PRIVATE_MEDIA_ROOT
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+    @property
+    def base_url(self):
+        return None
+
+
+private_storage = PrivateStorage()
+
+
+def get_private_storage():
+    return private_storage
+
+
+class LocalFile(File):
+    """Файл на локальном диске: FileSystemStorage перемещает его, а не копирует."""
+
+    def __init__(self, path):
+        super().__init__(open(path, 'rb'), name=os.path.basename(path))
+        self.path = path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def store_file(content, filename, digest=None, storage=None):
+    """
+    Кладёт файл в хранилище (по умолчанию default_storage) под его хешем и
+    возвращает (имя, был_ли_уже).
+
+    ``content`` — File/UploadedFile; если у него есть temporary_file_path,
+    локальное хранилище переместит файл без копирования.
+    """
+    storage = storage or default_storage
+    digest = digest or file_digest(content)
+    name = blob_name(digest, filename)
+    if storage.exists(name):
+        return name, True
+    saved = storage.save(name, content)
+    return saved, False
+
+
+def store_upload(upload, storage=None):
+    """Файл из request.FILES: временный файл на диске перемещается, маленький в памяти — записывается."""
+    if hasattr(upload, 'temporary_file_path'):
+        with open(upload.temporary_file_path(), 'rb') as f:
+            digest = file_digest(f)
+    else:
+        digest = file_digest(upload)
+    return store_file(upload, upload.name, digest, storage)
+
+
+def store_local_file(path, filename, digest=None, storage=None):
+    """Собранный на диске файл: перемещается в хранилище или удаляется, если такой уже есть."""
+    if digest is None:
+        with open(path, 'rb') as f:
+            digest = file_digest(f)
+    content = LocalFile(path)
+    try:
+        name, existed = store_file(content, filename, digest, storage)
+    finally:
+        content.close()
+    if os.path.exists(path):
+        os.remove(path)
+    return name, existed
@@ -0,0 +1,54 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TimeSlot, Appointment
+from .slot_events import publish_slots
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+class AppointmentAlreadyCanceled(Exception):
+    pass
+
+
+def book_time_slot(patient, time_slot_id, reason=None):
+    """
+    Бронирует слот одним условным UPDATE.
+
+    Строка слота блокируется самим UPDATE ... WHERE status = 'AVAILABLE',
+    поэтому из нескольких одновременных запросов слот получит ровно один,
+    а остальные получат SlotUnavailable без чтения-изменения-записи.
+    """
+    with transaction.atomic():
+        booked = TimeSlot.objects.filter(pk=time_slot_id, status='AVAILABLE').update(
+            status='BOOKED', updated_at=timezone.now()
+        )
+        if not booked:
+            raise SlotUnavailable(time_slot_id)
+        time_slot = TimeSlot.objects.select_related('doctor').get(pk=time_slot_id)
+        publish_slots([time_slot])
+        return Appointment.objects.create(
+            doctor=time_slot.doctor,
+            patient=patient,
+            time_slot=time_slot,
+            status='SCHEDULED',
+            reason=reason,
+        )
+
+
+def cancel_appointment(appointment):
+    with transaction.atomic():
+        canceled = (
+            Appointment.objects.filter(pk=appointment.pk)
+            .exclude(status='CANCELED')
+            .update(status='CANCELED', updated_at=timezone.now())
+        )
+        if not canceled:
+            raise AppointmentAlreadyCanceled(appointment.pk)
+        TimeSlot.objects.filter(pk=appointment.time_slot_id).update(status='AVAILABLE', updated_at=timezone.now())
+        publish_slots([appointment.time_slot], status='AVAILABLE')
+    appointment.status = 'CANCELED'
+    appointment.time_slot.status = 'AVAILABLE'
+    return appointment
@@ -0,0 +1,125 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DIRECTORY_VERSION_KEY = 'doctor-directory:version'
+
+
+def directory_cache():
+    return caches[getattr(settings, 'DOCTOR_DIRECTORY_CACHE', 'default')]
+
+
+def get_directory_version():
+    """
+    Текущая версия справочника врачей — момент последнего изменения.
+
+    Записи кэша содержат версию в ключе, поэтому инвалидация — это запись
+    новой версии, а старые записи просто истекают по TTL.
+    """
+    cache = directory_cache()
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        cache.add(DIRECTORY_VERSION_KEY, time.time(), timeout=None)
+        version = cache.get(DIRECTORY_VERSION_KEY)
+    return version
+
+
+async def aget_directory_version():
+    cache = directory_cache()
+    version = await cache.aget(DIRECTORY_VERSION_KEY)
+    if version is None:
+        await cache.aadd(DIRECTORY_VERSION_KEY, time.time(), timeout=None)
+        version = await cache.aget(DIRECTORY_VERSION_KEY)
+    return version
+
+
+def invalidate_directory():
+    # Last-Modified имеет точность в секунду, поэтому версия растёт минимум на 1
+    version = max(time.time(), (directory_cache().get(DIRECTORY_VERSION_KEY) or 0) + 1)
+    directory_cache().set(DIRECTORY_VERSION_KEY, version, timeout=None)
+
+
+def directory_key(version, request, specialty):
+    # photo_url абсолютный, поэтому ключ зависит от схемы и хоста
+    return f'doctor-directory:{version}:{request.scheme}://{request.get_host()}:{specialty or "*"}'
+
+
+def directory_etag(version, request, specialty):
+    return hashlib.sha1(directory_key(version, request, specialty).encode()).hexdigest()
+
+
+def get_cached_directory(version, request, specialty):
+    return directory_cache().get(directory_key(version, request, specialty))
+
+
+def set_cached_directory(version, request, specialty, data):
+    timeout = getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 600)
+    directory_cache().set(directory_key(version, request, specialty), data, timeout=timeout)
+
+
+async def aget_cached_directory(version, request, specialty):
+    return await directory_cache().aget(directory_key(version, request, specialty))
+
+
+async def aset_cached_directory(version, request, specialty, data):
+    timeout = getattr(settings, 'DOCTOR_DIRECTORY_CACHE_TIMEOUT', 600)
+    await directory_cache().aset(directory_key(version, request, specialty), data, timeout=timeout)
+
+
+def user_cache():
+    return caches[getattr(settings, 'AUTH_USER_CACHE', 'default')]
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def cached_user_fields():
+    from .models import User
+    # Хэш пароля в кэш не кладём: поле остаётся отложенным и грузится только при обращении
+    return [field.attname for field in User._meta.concrete_fields if field.attname != 'password']
+
+
+def get_cached_user(user_id, role=None):
+    """
+    Пользователь для аутентификации без запроса к БД.
+
+    Поля берутся из кэша; при промахе или если роль из токена не совпала
+    с кэшированной — один запрос ``.values()`` и запись в кэш. Возвращает
+    обычный экземпляр User (через ``from_db``), так что ``save()`` обновит
+    только загруженные поля.
+    """
+    from .models import User
+    fields = cached_user_fields()
+    cache = user_cache()
+    values = cache.get(user_cache_key(user_id))
+    if values is not None and role is not None and values.get('role') != role:
+        values = None
+    if values is None:
+        values = User.objects.filter(pk=user_id).values(*fields).first()
+        if values is None:
+            return None
+        cache.set(user_cache_key(user_id), values, timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return User.from_db('default', fields, [values[name] for name in fields])
+
+
+async def aget_cached_user(user_id, role=None):
+    """То же, что get_cached_user, для async-кода: кэш и запрос через async API."""
+    from .models import User
+    fields = cached_user_fields()
+    cache = user_cache()
+    values = await cache.aget(user_cache_key(user_id))
+    if values is not None and role is not None and values.get('role') != role:
+        values = None
+    if values is None:
+        values = await User.objects.filter(pk=user_id).values(*fields).afirst()
+        if values is None:
+            return None
+        await cache.aset(user_cache_key(user_id), values, timeout=getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 60))
+    return User.from_db('default', fields, [values[name] for name in fields])
+
+
+def invalidate_cached_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Кэши, которые видит только свой процесс
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """
+    Закрепление клиента за default после записи хранится в кэше. Кэш в
+    памяти процесса при нескольких воркерах его теряет: следующее чтение
+    уходит в другой воркер и читает отстающую реплику.
+    """
+    if not getattr(settings, 'DATABASE_REPLICAS', None):
+        return []
+    alias = getattr(settings, 'READ_REPLICA_PIN_CACHE', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f'Read replicas need a shared cache for READ_REPLICA_PIN_CACHE ("{alias}"), not {backend}.',
+            hint='Set REDIS_URL (or another shared cache backend) when DB_REPLICA_HOSTS is set.',
+            id='medical_system.E001',
+        )]
+    return []
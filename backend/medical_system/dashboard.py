@@ -0,0 +1,181 @@
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis
+from .pagination import KeysetPagination
+from .serializers import (
+    UserSerializer, TimeSlotSerializer, AppointmentSerializer, MedicalRecordSerializer, AnalysisSerializer,
+)
+
+
+class Section:
+    """
+    Раздел личного кабинета: выборка, сериализатор и порядок курсора.
+
+    ``user_relations`` — внешние ключи на User. В сводном ответе все разделы
+    подгружают этих пользователей одним общим запросом.
+    """
+
+    def __init__(self, url_name, serializer_class, ordering, queryset,
+                 user_relations=(), select_related=(), updated_field='updated_at'):
+        self.url_name = url_name
+        self.serializer_class = serializer_class
+        self.ordering = ordering
+        self.queryset = queryset
+        self.user_relations = user_relations
+        self.select_related = select_related
+        self.updated_field = updated_field
+
+
+PATIENT_SECTIONS = {
+    'upcoming': Section(
+        'patient_upcoming_appointments', AppointmentSerializer, ('time_slot__start_time', 'id'),
+        lambda user, now: Appointment.objects.filter(
+            patient=user, status='SCHEDULED', time_slot__start_time__gte=now
+        ),
+        user_relations=('doctor', 'patient'), select_related=('time_slot',),
+    ),
+    'history': Section(
+        'patient_appointment_history', AppointmentSerializer, ('-time_slot__start_time', '-id'),
+        lambda user, now: Appointment.objects.filter(patient=user, time_slot__start_time__lt=now),
+        user_relations=('doctor', 'patient'), select_related=('time_slot',),
+    ),
+    'analyses': Section(
+        'patient_analyses', AnalysisSerializer, ('-date_added', '-id'),
+        lambda user, now: Analysis.objects.filter(patient=user),
+        user_relations=('doctor', 'patient'),
+    ),
+    'medical_records': Section(
+        'patient_medical_record', MedicalRecordSerializer, ('-created_at', '-id'),
+        lambda user, now: MedicalRecord.objects.filter(patient=user),
+        user_relations=('doctor', 'patient'),
+    ),
+}
+
+DOCTOR_SECTIONS = {
+    'upcoming': Section(
+        'doctor_upcoming_appointments', AppointmentSerializer, ('time_slot__start_time', 'id'),
+        lambda user, now: Appointment.objects.filter(
+            doctor=user, status='SCHEDULED', time_slot__start_time__gte=now
+        ),
+        user_relations=('doctor', 'patient'), select_related=('time_slot',),
+    ),
+    'history': Section(
+        'doctor_appointment_history', AppointmentSerializer, ('-time_slot__start_time', '-id'),
+        lambda user, now: Appointment.objects.filter(doctor=user, time_slot__start_time__lt=now),
+        user_relations=('doctor', 'patient'), select_related=('time_slot',),
+    ),
+    'schedule': Section(
+        'doctor_schedule', TimeSlotSerializer, ('start_time', 'id'),
+        lambda user, now: TimeSlot.objects.filter(doctor=user, start_time__gte=now),
+        user_relations=('doctor',),
+    ),
+    'patients': Section(
+        'doctor_patients', UserSerializer, ('id',),
+        lambda user, now: User.objects.filter(
+            pk__in=Appointment.objects.filter(doctor=user).values('patient_id')
+        ),
+        updated_field=None,
+    ),
+}
+
+
+class FirstPagePagination(KeysetPagination):
+    """Первая страница раздела; ссылка next ведёт на отдельный эндпоинт раздела."""
+    page_size_query_param = None
+
+    def decode_cursor(self, request):
+        return None
+
+    def set_first_page(self, request, section, rows, limit):
+        """
+        Состояние пагинатора по уже выбранным ``limit + 1`` строкам — то же,
+        что оставляет paginate_queryset без курсора. Строки читает вызывающий,
+        синхронно или через async ORM.
+        """
+        self.request = request
+        self.page_size = limit
+        self.ordering = section.ordering
+        self.cursor = None
+        self.page = list(rows[:limit])
+        self.has_next = len(rows) > limit
+        self.has_previous = False
+        if self.has_next:
+            self.next_position = self._get_position_from_instance(rows[limit], self.ordering)
+        self.base_url = request.build_absolute_uri(f'{reverse(section.url_name)}?page_size={limit}')
+        return self.page
+
+
+def first_page_queryset(section, user, now, limit):
+    queryset = section.queryset(user, now)
+    if section.select_related:
+        queryset = queryset.select_related(*section.select_related)
+    return queryset.order_by(*section.ordering)[:limit + 1]
+
+
+def missing_user_ids(rows_by_section, sections, users):
+    missing = set()
+    for name, rows in rows_by_section.items():
+        for relation in sections[name].user_relations:
+            missing.update(getattr(row, f'{relation}_id') for row in rows)
+    return missing - set(users)
+
+
+def set_users(rows_by_section, sections, users):
+    for name, rows in rows_by_section.items():
+        for relation in sections[name].user_relations:
+            for row in rows:
+                setattr(row, relation, users[getattr(row, f'{relation}_id')])
+
+
+def attach_users(rows_by_section, sections, known_users):
+    """Подгружает всех пользователей, на которых ссылаются разделы, одним запросом."""
+    users = {user.pk: user for user in known_users}
+    missing = missing_user_ids(rows_by_section, sections, users)
+    if missing:
+        users.update(User.objects.in_bulk(missing))
+    set_users(rows_by_section, sections, users)
+
+
+def serialize_dashboard(request, sections, pages):
+    context = {'request': request}
+    data = {'user': UserSerializer(request.user, context=context).data}
+    for name, section in sections.items():
+        data[name] = {
+            'results': section.serializer_class(pages[name].page, many=True, context=context).data,
+            'next': pages[name].get_next_link(),
+        }
+    return data
+
+
+def build_dashboard(request, sections, limit):
+    """Все разделы кабинета в одном ответе, каждый — первая страница из ``limit`` строк."""
+    user = request.user
+    now = timezone.now()
+    pages = {}
+    for name, section in sections.items():
+        rows = list(first_page_queryset(section, user, now, limit))
+        pages[name] = FirstPagePagination()
+        pages[name].set_first_page(request, section, rows, limit)
+
+    attach_users({name: page.page for name, page in pages.items()}, sections, known_users=[user])
+    return serialize_dashboard(request, sections, pages)
+
+
+async def abuild_dashboard(request, sections, limit):
+    """build_dashboard на async ORM: запросы разделов идут без блокировки event loop."""
+    user = request.user
+    now = timezone.now()
+    pages = {}
+    for name, section in sections.items():
+        rows = [row async for row in first_page_queryset(section, user, now, limit)]
+        pages[name] = FirstPagePagination()
+        pages[name].set_first_page(request, section, rows, limit)
+
+    rows_by_section = {name: page.page for name, page in pages.items()}
+    users = {user.pk: user}
+    missing = missing_user_ids(rows_by_section, sections, users)
+    if missing:
+        users.update({row.pk: row async for row in User.objects.filter(pk__in=missing)})
+    set_users(rows_by_section, sections, users)
+    return serialize_dashboard(request, sections, pages)
@@ -0,0 +1,82 @@
+import threading
+import time
+import weakref
+
+from django.conf import settings
+from django.db import connections
+
+_lock = threading.Lock()
+_wrappers = {}  # alias -> WeakSet обёрток соединений всех потоков
+_created = {}  # alias -> сколько физических соединений открыто за жизнь процесса
+_in_flight = 0
+
+
+def connection_opened(connection):
+    with _lock:
+        _wrappers.setdefault(connection.alias, weakref.WeakSet()).add(connection)
+        _created[connection.alias] = _created.get(connection.alias, 0) + 1
+
+
+def request_started():
+    global _in_flight
+    with _lock:
+        _in_flight += 1
+
+
+def request_finished():
+    global _in_flight
+    with _lock:
+        _in_flight = max(0, _in_flight - 1)
+
+
+def pool_stats(alias):
+    """
+    Состояние постоянных соединений процесса для ``alias``.
+
+    У Django нет общего пула: каждое соединение живёт в своём потоке до
+    CONN_MAX_AGE. ``open`` — соединения, которые сейчас открыты, ``in_use`` —
+    сколько из них обслуживают запросы (оценка по числу запросов в работе),
+    ``idle`` — остальные, ждущие следующего запроса в своём потоке.
+    """
+    with _lock:
+        wrappers = list(_wrappers.get(alias, ()))
+        in_flight = _in_flight
+        created = _created.get(alias, 0)
+    open_count = sum(1 for wrapper in wrappers if wrapper.connection is not None)
+    in_use = min(in_flight, open_count)
+    db_settings = settings.DATABASES[alias]
+    return {
+        'open': open_count,
+        'in_use': in_use,
+        'idle': open_count - in_use,
+        'created_total': created,
+        'requests_in_flight': in_flight,
+        'conn_max_age': db_settings.get('CONN_MAX_AGE', 0),
+        'health_checks': db_settings.get('CONN_HEALTH_CHECKS', False),
+    }
+
+
+def probe(alias):
+    """Получает соединение и выполняет SELECT 1, замеряя ожидание и запрос."""
+    connection = connections[alias]
+    started = time.perf_counter()
+    try:
+        reused = connection.connection is not None
+        connection.ensure_connection()
+        connected = time.perf_counter()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+        finished = time.perf_counter()
+    except Exception as exc:
+        return {
+            'status': 'error',
+            'error': str(exc) or exc.__class__.__name__,
+            'wait_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+    return {
+        'status': 'ok',
+        'reused_connection': reused,
+        'wait_ms': round((connected - started) * 1000, 2),
+        'query_ms': round((finished - connected) * 1000, 2),
+    }
@@ -0,0 +1,120 @@
+import hashlib
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """
+    Один диапазон из заголовка Range -> (start, end) включительно.
+
+    None — заголовка нет или он не поддерживается (несколько диапазонов,
+    другие единицы): отдаём файл целиком. ValueError — диапазон вне файла.
+    """
+    match = RANGE_RE.match(header.replace(' ', '')) if header else None
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # bytes=-500 — последние 500 байт
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def if_range_matches(request, etag, last_modified):
+    value = request.META.get('HTTP_IF_RANGE')
+    if not value:
+        return True
+    if value.startswith(('"', 'W/')):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def read_range(file, start, length):
+    try:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def serve_file(request, field_file, as_attachment=True, filename=None):
+    """
+    Отдаёт файл из FileField: 304/412 по ETag и Last-Modified, Range
+    (206/416), а при PROTECTED_MEDIA_SERVER — передаёт отправку веб-серверу
+    через X-Accel-Redirect (nginx) или X-Sendfile (Apache, lighttpd), чтобы
+    воркер Django не занимался копированием байтов. ``filename`` — имя для
+    Content-Disposition, по умолчанию имя файла в хранилище.
+    """
+    storage, name = field_file.storage, field_file.name
+    size = storage.size(name)
+    last_modified = int(storage.get_modified_time(name).timestamp())
+    etag = quote_etag(hashlib.sha1(f'{name}|{size}|{last_modified}'.encode()).hexdigest())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_file_response(request, field_file, size, etag, last_modified)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, no-cache'
+    if response.status_code in (200, 206):
+        filename = filename or name.rsplit('/', 1)[-1]
+        disposition = 'attachment' if as_attachment else 'inline'
+        response['Content-Disposition'] = f"{disposition}; filename*=UTF-8''{quote(filename)}"
+    return response
+
+
+def build_file_response(request, field_file, size, etag, last_modified):
+    content_type = mimetypes.guess_type(field_file.name)[0] or 'application/octet-stream'
+
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+    if server:
+        # Range и докачку обрабатывает веб-сервер
+        response = HttpResponse(content_type=content_type)
+        if server == 'nginx':
+            response['X-Accel-Redirect'] = quote(settings.PROTECTED_MEDIA_INTERNAL_URL + field_file.name)
+        else:
+            response['X-Sendfile'] = field_file.path
+        return response
+
+    byte_range = None
+    if if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        # FileResponse отдаёт файл через wsgi.file_wrapper (sendfile), если сервер его поддерживает
+        return FileResponse(field_file.open('rb'), content_type=content_type)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(read_range(field_file.open('rb'), start, length), status=206,
+                                     content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
@@ -0,0 +1,58 @@
+from datetime import datetime, time, timedelta
+
+import django_filters
+from django.utils import timezone
+
+from .models import TimeSlot, Appointment, Doctor
+
+
+def day_bounds(value):
+    """Начало и конец дня ``value`` в текущей временной зоне."""
+    start = timezone.make_aware(datetime.combine(value, time.min))
+    return start, start + timedelta(days=1)
+
+
+class TimeSlotFilter(django_filters.FilterSet):
+    date = django_filters.DateFilter(method='filter_date')
+    start__gte = django_filters.IsoDateTimeFilter(field_name='start_time', lookup_expr='gte')
+    start__lt = django_filters.IsoDateTimeFilter(field_name='start_time', lookup_expr='lt')
+    # id профиля врача из /api/doctors/, а не id пользователя
+    doctor = django_filters.NumberFilter(method='filter_doctor')
+    specialty = django_filters.CharFilter(method='filter_specialty')
+
+    class Meta:
+        model = TimeSlot
+        fields = ['status']
+
+    def filter_date(self, queryset, name, value):
+        start, end = day_bounds(value)
+        return queryset.filter(start_time__gte=start, start_time__lt=end)
+
+    # Подзапросы по Doctor сводят фильтр к doctor_id, чтобы работал индекс слотов
+    def filter_doctor(self, queryset, name, value):
+        return queryset.filter(doctor__in=Doctor.objects.filter(pk=value).values('user_id'))
+
+    def filter_specialty(self, queryset, name, value):
+        return queryset.filter(doctor__in=Doctor.objects.filter(specialty=value).values('user_id'))
+
+
+class AppointmentFilter(django_filters.FilterSet):
+    date = django_filters.DateFilter(method='filter_date')
+    start__gte = django_filters.IsoDateTimeFilter(field_name='time_slot__start_time', lookup_expr='gte')
+    start__lt = django_filters.IsoDateTimeFilter(field_name='time_slot__start_time', lookup_expr='lt')
+    doctor = django_filters.NumberFilter(method='filter_doctor')
+    specialty = django_filters.CharFilter(method='filter_specialty')
+
+    class Meta:
+        model = Appointment
+        fields = ['status']
+
+    def filter_date(self, queryset, name, value):
+        start, end = day_bounds(value)
+        return queryset.filter(time_slot__start_time__gte=start, time_slot__start_time__lt=end)
+
+    def filter_doctor(self, queryset, name, value):
+        return queryset.filter(doctor__in=Doctor.objects.filter(pk=value).values('user_id'))
+
+    def filter_specialty(self, queryset, name, value):
+        return queryset.filter(doctor__in=Doctor.objects.filter(specialty=value).values('user_id'))
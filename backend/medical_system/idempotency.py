@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+
+def key_cutoff(hours=None, now=None):
+    """Ключи, созданные раньше этого момента, считаются истёкшими."""
+    hours = settings.IDEMPOTENCY_KEY_TTL_HOURS if hours is None else hours
+    return (now or timezone.now()) - timedelta(hours=hours)
+
+
+def active_keys():
+    return IdempotencyKey.objects.filter(created_at__gte=key_cutoff())
+
+
+def purge_expired_keys(hours=None, now=None):
+    """Удаляет истёкшие ключи одним DELETE; возвращает их число."""
+    expired = IdempotencyKey.objects.filter(created_at__lt=key_cutoff(hours, now))
+    return expired._raw_delete(expired.db)
@@ -0,0 +1,114 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import update_last_login
+from rest_framework_simplejwt.settings import api_settings
+
+from .authentication import tokens_for_user
+from .models import User
+
+
+class TokenBucket:
+    """
+    Ограничитель по алгоритму token bucket в памяти процесса.
+
+    У каждого ключа (email, IP) своё ведро на ``capacity`` попыток, которое
+    пополняется со скоростью ``refill_rate`` в секунду. Хранится не больше
+    ``max_keys`` вёдер — самые старые вытесняются.
+    """
+
+    def __init__(self, capacity, refill_rate, max_keys=100_000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _level(self, key, now):
+        tokens, updated = self.buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+    def consume(self, *keys):
+        """Списывает по жетону с каждого ключа. Возвращает 0 или сколько секунд ждать."""
+        now = time.monotonic()
+        with self.lock:
+            levels = {key: self._level(key, now) for key in keys}
+            empty = [level for level in levels.values() if level < 1]
+            if empty:
+                return (1 - min(empty)) / self.refill_rate
+            for key, level in levels.items():
+                self.buckets[key] = (level - 1, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+            return 0
+
+    def reset(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+login_limiter = TokenBucket(
+    capacity=getattr(settings, 'LOGIN_RATE_LIMIT_BURST', 10),
+    refill_rate=getattr(settings, 'LOGIN_RATE_LIMIT_PER_SECOND', 0.2),
+)
+
+# PBKDF2 занимает CPU: async-вход считает хэши в ограниченном пуле потоков
+password_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'LOGIN_HASH_WORKERS', 4),
+    thread_name_prefix='login-hash',
+)
+
+
+def client_ip(request):
+    """
+    IP клиента для лимитов. X-Forwarded-For клиент может подставить любой,
+    поэтому он читается только за TRUSTED_PROXY_COUNT доверенными прокси:
+    берётся адрес, который дописал ближайший к нам из них (счёт справа).
+    """
+    proxies = getattr(settings, 'TRUSTED_PROXY_COUNT', 0)
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if proxies and forwarded:
+        hops = [hop.strip() for hop in forwarded.split(',') if hop.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_rate_limit(email, ip):
+    if not getattr(settings, 'LOGIN_RATE_LIMIT_ENABLED', True):
+        return 0
+    return login_limiter.consume(f'email:{email.lower()}', f'ip:{ip}')
+
+
+def retry_after_header(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+def find_user(email):
+    return User.objects.filter(email=email).first()
+
+
+async def afind_user(email):
+    return await User.objects.filter(email=email).afirst()
+
+
+def record_login(user):
+    if api_settings.UPDATE_LAST_LOGIN:
+        update_last_login(None, user)
+
+
+def login_payload(user):
+    """Ответ на успешный вход, собранный из уже загруженного пользователя."""
+    refresh = tokens_for_user(user)
+    return {
+        'refresh': str(refresh),
+        'access': str(refresh.access_token),
+        'user_role': user.role,
+        'user_id': user.id,
+        'full_name': f"{user.first_name} {user.last_name}",
+    }
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from medical_system.benchmark import Workload, compare_to_baseline
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs a mixed API workload (browse doctors, list slots, dashboards, book, cancel, upload analysis '
+        'results) against data from bench_data and reports throughput and p50/p95/p99 latency per '
+        'endpoint. Results can be saved as a baseline and compared on later runs.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--save-baseline', metavar='PATH', help='Write results as JSON to PATH')
+        parser.add_argument('--compare', metavar='PATH', help='Compare with a saved baseline')
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help='Allowed p95 growth over the baseline before failing (0.2 = 20%%)')
+
+    def handle(self, *args, **options):
+        # Загруженные файлы анализов пишем во временный каталог, а не в MEDIA_ROOT и PRIVATE_MEDIA_ROOT
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root, PRIVATE_MEDIA_ROOT=os.path.join(media_root, 'private'),
+            LOGIN_RATE_LIMIT_ENABLED=False,
+        ):
+            try:
+                workload = Workload(seed=options['seed'])
+            except ValueError as exc:
+                raise CommandError(f'{exc} (manage.py bench_data)')
+            results = workload.run(options['requests'], options['concurrency'])
+
+        self.stdout.write(
+            f"{results['requests']} requests in {results['elapsed_s']}s -> {results['throughput']} req/s "
+            f"(concurrency {options['concurrency']})"
+        )
+        self.stdout.write(f"{'endpoint':<16}{'count':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}  statuses")
+        for name, endpoint in results['endpoints'].items():
+            statuses = ' '.join(f'{code}:{count}' for code, count in endpoint['statuses'].items())
+            self.stdout.write(
+                f"{name:<16}{endpoint['requests']:>7}{endpoint['throughput']:>9}{endpoint['p50_ms']:>9}"
+                f"{endpoint['p95_ms']:>9}{endpoint['p99_ms']:>9}  {statuses}"
+            )
+
+        for name, count in results['skipped'].items():
+            self.stdout.write(self.style.WARNING(f'{name}: skipped {count} time(s), nothing to operate on'))
+        if results['missing']:
+            raise CommandError(
+                f"No requests recorded for {', '.join(results['missing'])}: the data has nothing to operate on "
+                '(regenerate it with manage.py bench_data)'
+            )
+
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Saved baseline to {options['save_baseline']}")
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+            regressions = compare_to_baseline(results, baseline, options['tolerance'])
+            for name, previous, current, change in regressions:
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: p95 {previous} ms -> {current} ms (+{change:.0%})'
+                ))
+            if regressions:
+                raise CommandError(f'{len(regressions)} endpoint(s) regressed beyond {options["tolerance"]:.0%}')
+            self.stdout.write(self.style.SUCCESS('No regressions against the baseline'))
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.utils import timezone
+
+from medical_system.authentication import tokens_for_user
+from medical_system.benchmark import bench_users, percentile
+from medical_system.models import Doctor
+from medical_system.seeding import SPECIALTIES
+
+ENDPOINTS = ('me', 'doctors', 'time_slots', 'dashboard')
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the sync read endpoints (one thread per in-flight request, as under WSGI) with their '
+        'async versions under /api/async/ (one event loop) at the same concurrency. Reports req/s, '
+        'p50/p95 latency, peak Python memory (tracemalloc) and peak thread count. Uses data from bench_data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--endpoint', choices=[*ENDPOINTS, 'all'], default='all')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        users = bench_users().order_by('id')
+        patients = list(users.filter(role='PATIENT')[:100])
+        doctors = list(users.filter(role='DOCTOR')[:100])
+        if not patients or not doctors:
+            raise CommandError('No benchmark data: generate it first (manage.py bench_data)')
+        tokens = {user.pk: str(tokens_for_user(user).access_token) for user in patients + doctors}
+        profiles = list(Doctor.objects.filter(user__in=doctors).values_list('id', flat=True))
+        endpoints = ENDPOINTS if options['endpoint'] == 'all' else (options['endpoint'],)
+
+        # Один и тот же план запросов для обоих режимов
+        rng = random.Random(options['seed'])
+        plan = []
+        for _ in range(options['requests']):
+            endpoint = rng.choice(endpoints)
+            user = rng.choice(patients)
+            params = {}
+            if endpoint == 'me':
+                path = 'users/me/'
+            elif endpoint == 'doctors':
+                path = 'doctors/'
+                specialty = rng.choice([None, *SPECIALTIES])
+                if specialty:
+                    params['specialty'] = specialty
+            elif endpoint == 'time_slots':
+                path = 'time-slots/'
+                params['date'] = (timezone.localdate() + timedelta(days=rng.randrange(7))).isoformat()
+                if profiles:
+                    params['doctor'] = rng.choice(profiles)
+            else:
+                user = rng.choice([rng.choice(patients), rng.choice(doctors)])
+                path = 'patient/dashboard/' if user.role == 'PATIENT' else 'doctor/dashboard/'
+            plan.append((path, params, f'Bearer {tokens[user.pk]}'))
+
+        self.stdout.write(
+            f"{'mode':<6}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'peak MiB':>10}{'threads':>9}  statuses"
+        )
+        if options['mode'] in ('sync', 'both'):
+            self.report('sync', *self.measure(lambda: self.run_sync(plan, options['concurrency'])))
+        if options['mode'] in ('async', 'both'):
+            self.report('async', *self.measure(lambda: asyncio.run(self.run_async(plan, options['concurrency']))))
+
+    def measure(self, run):
+        self.max_threads = threading.active_count()
+        tracemalloc.start()
+        try:
+            started = time.perf_counter()
+            results = run()
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return results, elapsed, peak
+
+    def sample_threads(self):
+        self.max_threads = max(self.max_threads, threading.active_count())
+
+    def run_sync(self, plan, concurrency):
+        def fetch(item):
+            path, params, auth = item
+            try:
+                started = time.perf_counter()
+                response = Client().get(f'/api/{path}', params, HTTP_AUTHORIZATION=auth)
+                elapsed = time.perf_counter() - started
+                self.sample_threads()
+                return response.status_code, elapsed
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(fetch, plan))
+
+    async def run_async(self, plan, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(item):
+            path, params, auth = item
+            async with semaphore:
+                # Как ASGIHandler: у каждого запроса свой поток для sync-кода
+                async with ThreadSensitiveContext():
+                    started = time.perf_counter()
+                    response = await client.get(f'/api/async/{path}', params, headers={'Authorization': auth})
+                    elapsed = time.perf_counter() - started
+                    self.sample_threads()
+                    await sync_to_async(connections.close_all)()
+            return response.status_code, elapsed
+
+        return await asyncio.gather(*(fetch(item) for item in plan))
+
+    def report(self, mode, results, elapsed, peak):
+        latencies = sorted(latency for _, latency in results)
+        statuses = {}
+        for code, _ in results:
+            statuses[code] = statuses.get(code, 0) + 1
+        self.stdout.write(
+            f'{mode:<6}{len(results):>9}{len(results) / elapsed:>9.1f}'
+            f'{percentile(latencies, 0.50) * 1000:>9.2f}{percentile(latencies, 0.95) * 1000:>9.2f}'
+            f'{peak / 1024 / 1024:>10.1f}{self.max_threads:>9}  '
+            + ' '.join(f'{code}:{count}' for code, count in sorted(statuses.items()))
+        )
@@ -0,0 +1,47 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from medical_system.benchmark import bench_users, flush_dataset, generate_dataset
+from medical_system.seeding import SCALES
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates benchmark data with the seed generator (users with emails @bench.keremet.kg, doctor '
+        'profiles, time slots, appointments, analyses and medical records). Use --scale for a preset or '
+        'override individual counts; --flush removes previously generated benchmark data.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES), default='small')
+        for name in ('doctors', 'patients', 'slots', 'appointments'):
+            parser.add_argument(f'--{name}', type=int)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--flush', action='store_true', help='Remove existing benchmark data first')
+        parser.add_argument('--flush-only', action='store_true', help='Only remove benchmark data')
+
+    def handle(self, *args, **options):
+        if options['flush'] or options['flush_only']:
+            flush_dataset()
+            self.stdout.write('Removed existing benchmark data')
+            if options['flush_only']:
+                return
+        elif bench_users().exists():
+            raise CommandError('Benchmark data already exists; pass --flush to regenerate it')
+
+        counts = dict(SCALES[options['scale']])
+        for name in counts:
+            if options[name] is not None:
+                counts[name] = options[name]
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            generate_dataset(
+                seed=options['seed'], batch_size=options['batch_size'],
+                log=lambda message: self.stdout.write(f'  {message} ({time.perf_counter() - started:.1f}s)'),
+                **counts,
+            )
+        self.stdout.write(self.style.SUCCESS(f'Generated benchmark data in {time.perf_counter() - started:.1f}s'))
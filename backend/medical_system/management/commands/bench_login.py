@@ -0,0 +1,86 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from medical_system.models import User
+
+PASSWORD = 'bench-password'
+EMAIL_TEMPLATE = 'bench-login-{}@keremet.kg'
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures logins per second through the sync (/api/auth/login/) and async '
+        '(/api/auth/login/async/) endpoints. Creates temporary users in the configured '
+        'database and removes them afterwards; the rate limiter is disabled for the run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=['sync', 'async', 'both'], default='both')
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--users', type=int, default=10)
+
+    def handle(self, *args, **options):
+        emails = [EMAIL_TEMPLATE.format(i) for i in range(options['users'])]
+        password_hash = make_password(PASSWORD)
+        User.objects.filter(email__in=emails).delete()
+        User.objects.bulk_create([
+            User(email=email, password=password_hash, first_name='Bench', last_name=str(i), role='PATIENT')
+            for i, email in enumerate(emails)
+        ])
+        try:
+            with override_settings(LOGIN_RATE_LIMIT_ENABLED=False):
+                if options['mode'] in ('sync', 'both'):
+                    self.report('sync', *self.run_sync(emails, options['requests'], options['concurrency']))
+                if options['mode'] in ('async', 'both'):
+                    self.report('async', *asyncio.run(
+                        self.run_async(emails, options['requests'], options['concurrency'])
+                    ))
+        finally:
+            User.objects.filter(email__in=emails).delete()
+
+    def body(self, emails, i):
+        return json.dumps({'email': emails[i % len(emails)], 'password': PASSWORD})
+
+    def run_sync(self, emails, total, concurrency):
+        def login(i):
+            try:
+                response = Client().post('/api/auth/login/', self.body(emails, i), content_type='application/json')
+                return response.status_code
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            codes = list(pool.map(login, range(total)))
+        return codes, time.perf_counter() - started
+
+    async def run_async(self, emails, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def login(i):
+            async with semaphore:
+                response = await client.post(
+                    '/api/auth/login/async/', self.body(emails, i), content_type='application/json'
+                )
+                return response.status_code
+
+        started = time.perf_counter()
+        codes = await asyncio.gather(*(login(i) for i in range(total)))
+        return codes, time.perf_counter() - started
+
+    def report(self, mode, codes, elapsed):
+        ok = sum(1 for code in codes if code == 200)
+        self.stdout.write(
+            f'{mode:>5}: {len(codes)} logins in {elapsed:.2f}s -> {len(codes) / elapsed:.1f} logins/s '
+            f'({ok} succeeded)'
+        )
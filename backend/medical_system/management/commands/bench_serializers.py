@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from medical_system.benchmark import bench_users, percentile
+from medical_system.models import Analysis, Appointment
+from medical_system.read_serializers import AnalysisReadSerializer, AppointmentReadSerializer
+from medical_system.renderers import FastJSONRenderer
+from medical_system.serializers import AnalysisSerializer, AppointmentSerializer
+
+CASES = {
+    'appointments': (Appointment, AppointmentSerializer, AppointmentReadSerializer, ('-time_slot__start_time', '-id')),
+    'analyses': (Analysis, AnalysisSerializer, AnalysisReadSerializer, ('-date_added', '-id')),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Micro-benchmark of list serialization: ModelSerializer + JSONRenderer against the .values() read '
+        'serializers + FastJSONRenderer on the same rows from bench_data. Reports median and p95 time per '
+        'list, query and encoding included, and checks that both produce identical bytes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--case', choices=[*CASES, 'all'], default='all')
+        parser.add_argument('--rows', type=int, default=200, help='Rows per list (the max page size is 200)')
+        parser.add_argument('--repeat', type=int, default=30)
+
+    def handle(self, *args, **options):
+        if not bench_users().exists():
+            raise CommandError('No benchmark data: generate it first (manage.py bench_data)')
+        request = RequestFactory().get('/api/')
+        context = {'request': request}
+        cases = CASES if options['case'] == 'all' else {options['case']: CASES[options['case']]}
+
+        self.stdout.write(
+            f"{'case':<14}{'rows':>6}{'drf p50':>9}{'drf p95':>9}{'fast p50':>10}{'fast p95':>10}{'speedup':>9}  output"
+        )
+        for name, (model, serializer_class, reader_class, ordering) in cases.items():
+            queryset = model.objects.filter(patient__in=bench_users()).order_by(*ordering)[:options['rows']]
+            select_related = serializer_class.Meta.select_related
+
+            def drf():
+                rows = list(queryset.select_related(*select_related))
+                return JSONRenderer().render(serializer_class(rows, many=True, context=context).data)
+
+            def fast():
+                reader = reader_class(context=context)
+                return FastJSONRenderer().render(reader.serialize(reader.project(queryset)))
+
+            drf_times, drf_body = self.measure(drf, options['repeat'])
+            fast_times, fast_body = self.measure(fast, options['repeat'])
+            rows = len(queryset)
+            drf_ms = [percentile(drf_times, share) * 1000 for share in (0.5, 0.95)]
+            fast_ms = [percentile(fast_times, share) * 1000 for share in (0.5, 0.95)]
+            self.stdout.write(
+                f'{name:<14}{rows:>6}{drf_ms[0]:>9.2f}{drf_ms[1]:>9.2f}{fast_ms[0]:>10.2f}{fast_ms[1]:>10.2f}'
+                f'{drf_ms[0] / fast_ms[0]:>8.1f}x  '
+                + ('identical' if drf_body == fast_body else self.style.ERROR('DIFFERENT'))
+            )
+
+    def measure(self, run, repeat):
+        body = run()
+        times = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+        return sorted(times), body
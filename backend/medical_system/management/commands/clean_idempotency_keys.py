@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from medical_system.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Deletes stored Idempotency-Key responses older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help='Retention window, defaults to IDEMPOTENCY_KEY_TTL_HOURS')
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys(options['hours'])
+        self.stdout.write(f'Deleted {deleted} idempotency keys')
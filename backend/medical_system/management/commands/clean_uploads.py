@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from medical_system.uploads import clean_expired_uploads
+
+
+class Command(BaseCommand):
+    help = 'Deletes chunked upload sessions with no activity and their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=None,
+                            help='Inactivity period, defaults to CHUNKED_UPLOAD_EXPIRE_HOURS')
+
+    def handle(self, *args, **options):
+        deleted, removed = clean_expired_uploads(options['hours'])
+        self.stdout.write(f'Deleted {deleted} upload sessions, removed {removed} partial files')
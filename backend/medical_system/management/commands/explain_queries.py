@@ -0,0 +1,114 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from medical_system.models import User
+from medical_system.views import (
+    DoctorViewSet, TimeSlotViewSet, AppointmentViewSet, MedicalRecordViewSet,
+    AnalysisViewSet, PatientDashboardView, DoctorDashboardView,
+)
+
+# (название, класс вьюхи, роль пользователя, параметры запроса, атрибуты вьюхи)
+TARGETS = [
+    ('doctors', DoctorViewSet, 'PATIENT', {}, {}),
+    ('doctors?specialty', DoctorViewSet, 'PATIENT', {'specialty': 'THERAPIST'}, {}),
+    ('time-slots (doctor)', TimeSlotViewSet, 'DOCTOR', {}, {}),
+    ('time-slots (patient)', TimeSlotViewSet, 'PATIENT', {}, {}),
+    ('time-slots?date (doctor)', TimeSlotViewSet, 'DOCTOR', {'date': '2025-01-15'}, {}),
+    ('time-slots?specialty&date (patient)', TimeSlotViewSet, 'PATIENT', {'specialty': 'THERAPIST', 'date': '2025-01-15'}, {}),
+    ('appointments (doctor)', AppointmentViewSet, 'DOCTOR', {}, {}),
+    ('appointments (patient)', AppointmentViewSet, 'PATIENT', {}, {}),
+    ('appointments?date (doctor)', AppointmentViewSet, 'DOCTOR', {'date': '2025-01-15'}, {}),
+    ('medical-records (patient)', MedicalRecordViewSet, 'PATIENT', {}, {}),
+    ('analyses (doctor)', AnalysisViewSet, 'DOCTOR', {}, {}),
+    ('analyses?status (patient)', AnalysisViewSet, 'PATIENT', {'status': 'READY'}, {}),
+    ('patient dashboard upcoming', PatientDashboardView, 'PATIENT', {}, {'view_type': 'upcoming'}),
+    ('patient dashboard history', PatientDashboardView, 'PATIENT', {}, {'view_type': 'history'}),
+    ('doctor dashboard upcoming', DoctorDashboardView, 'DOCTOR', {}, {'view_type': 'upcoming'}),
+    ('patient dashboard analyses', PatientDashboardView, 'PATIENT', {}, {'view_type': 'analyses'}),
+    ('patient dashboard medical records', PatientDashboardView, 'PATIENT', {}, {'view_type': 'medical_records'}),
+    ('doctor dashboard history', DoctorDashboardView, 'DOCTOR', {}, {'view_type': 'history'}),
+    ('doctor dashboard schedule', DoctorDashboardView, 'DOCTOR', {}, {'view_type': 'schedule'}),
+    ('doctor dashboard patients', DoctorDashboardView, 'DOCTOR', {}, {'view_type': 'patients'}),
+]
+
+# PostgreSQL: "Seq Scan on medical_system_timeslot", SQLite: "SCAN medical_system_timeslot"
+SEQ_SCAN_PATTERNS = [
+    re.compile(r'Seq Scan on (\w+)'),
+    re.compile(r'\bSCAN (\w+)(?! USING)(?:\s|$)'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs EXPLAIN on the queryset of every list endpoint and flags sequential scans. '
+        'Run it against a database with realistic volumes: on tiny tables the planner '
+        'prefers sequential scans regardless of indexes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Use EXPLAIN ANALYZE (PostgreSQL only)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query')
+        parser.add_argument('--fail-on-seq-scan', action='store_true', help='Exit with an error if any sequential scan is found')
+
+    def handle(self, *args, **options):
+        users = {
+            role: User.objects.filter(role=role).order_by('id').first()
+            for role in ('DOCTOR', 'PATIENT')
+        }
+        missing = [role for role, user in users.items() if user is None]
+        if missing:
+            raise CommandError(f'Need at least one user with role {", ".join(missing)} to build the querysets')
+
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError('--analyze is only supported on PostgreSQL')
+            explain_options['analyze'] = True
+
+        flagged = 0
+        for label, view_class, role, params, attrs in TARGETS:
+            queryset = self.build_queryset(view_class, users[role], params, attrs)
+            plan = queryset.explain(**explain_options)
+            scans = self.find_seq_scans(plan)
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f'{label}: sequential scan on {", ".join(scans)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{label}: ok'))
+            if options['verbose_plans'] or scans:
+                self.stdout.write(self.indent(plan))
+
+        if flagged and options['fail_on_seq_scan']:
+            raise CommandError(f'{flagged} queries use sequential scans')
+
+    def build_queryset(self, view_class, user, params, attrs):
+        request = Request(APIRequestFactory().get('/', params))
+        request.user = user
+        view = view_class(**attrs)
+        view.request = request
+        view.args = ()
+        view.kwargs = {}
+        view.format_kwarg = None
+        view.action = 'list'
+        queryset = view.filter_queryset(view.get_queryset())
+        paginator = view.paginator
+        if paginator is not None and hasattr(paginator, 'get_ordering'):
+            # Тот же ORDER BY ... LIMIT, что выполнит курсорная пагинация
+            queryset = queryset.order_by(*paginator.get_ordering(request, queryset, view))
+            queryset = queryset[:paginator.get_page_size(request) + 1]
+        return queryset
+
+    def find_seq_scans(self, plan):
+        tables = []
+        for pattern in SEQ_SCAN_PATTERNS:
+            for table in pattern.findall(plan):
+                if table not in tables:
+                    tables.append(table)
+        return tables
+
+    def indent(self, plan):
+        return '\n'.join(f'    {line}' for line in plan.splitlines())
@@ -0,0 +1,64 @@
+from datetime import date, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from medical_system.models import User
+from medical_system.scheduling import parse_weekdays, expand_weekly_template, generate_slots
+
+
+class Command(BaseCommand):
+    help = 'Creates time slots for doctors from a weekly template, skipping slots that overlap existing ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--doctor', action='append', default=[], help='Doctor email or user id (repeatable)')
+        parser.add_argument('--all-doctors', action='store_true', help='Generate for every user with role DOCTOR')
+        parser.add_argument('--start-date', type=date.fromisoformat, default=None, help='First day, YYYY-MM-DD (default: today)')
+        parser.add_argument('--weeks', type=int, default=12)
+        parser.add_argument('--weekdays', default='mon-fri', help="e.g. 'mon-fri' or 'mon,wed,fri'")
+        parser.add_argument('--from', dest='day_start', type=time.fromisoformat, default=time(9, 0))
+        parser.add_argument('--to', dest='day_end', type=time.fromisoformat, default=time(17, 0))
+        parser.add_argument('--slot-minutes', type=int, default=30)
+        parser.add_argument('--no-skip-holidays', action='store_true', help='Also create slots on public holidays')
+        parser.add_argument('--skip-date', action='append', type=date.fromisoformat, default=[], help='Extra day off (repeatable)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be created without writing')
+
+    def handle(self, *args, **options):
+        doctors = self.get_doctors(options)
+        try:
+            weekdays = parse_weekdays(options['weekdays'])
+        except ValueError:
+            raise CommandError(f"Invalid --weekdays value: {options['weekdays']}")
+        if options['day_start'] >= options['day_end']:
+            raise CommandError('--to must be after --from')
+
+        intervals = expand_weekly_template(
+            options['start_date'] or timezone.localdate(), options['weeks'], weekdays,
+            options['day_start'], options['day_end'], options['slot_minutes'],
+            skip_holidays=not options['no_skip_holidays'], skip_dates=options['skip_date'],
+        )
+        created, skipped = generate_slots(
+            doctors, intervals, batch_size=options['batch_size'], dry_run=options['dry_run']
+        )
+        prefix = '[dry run] would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {created} slots for {len(doctors)} doctors, skipped {skipped} overlapping'
+        ))
+
+    def get_doctors(self, options):
+        if options['all_doctors']:
+            doctors = list(User.objects.filter(role='DOCTOR'))
+        else:
+            if not options['doctor']:
+                raise CommandError('Pass --doctor (email or id) or --all-doctors')
+            doctors = []
+            for value in options['doctor']:
+                lookup = {'pk': value} if value.isdigit() else {'email': value}
+                try:
+                    doctors.append(User.objects.get(role='DOCTOR', **lookup))
+                except User.DoesNotExist:
+                    raise CommandError(f'Doctor {value} not found')
+        if not doctors:
+            raise CommandError('No doctors found')
+        return doctors
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from medical_system.models import Doctor
+from medical_system.photos import generate_photo_variants, variants_current
+
+
+class Command(BaseCommand):
+    help = 'Builds resized WebP/JPEG copies of doctor photos that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild copies even if they are up to date')
+        parser.add_argument('--doctor', type=int, action='append', dest='doctors', help='Only this doctor id')
+
+    def handle(self, *args, **options):
+        doctors = Doctor.objects.exclude(photo='').exclude(photo__isnull=True).only('id', 'photo', 'photo_variants')
+        if options['doctors']:
+            doctors = doctors.filter(pk__in=options['doctors'])
+        built = skipped = failed = 0
+        for doctor in doctors.order_by('id').iterator():
+            if not options['force'] and variants_current(doctor):
+                skipped += 1
+                continue
+            try:
+                generate_photo_variants(doctor.pk, force=options['force'])
+            except (OSError, ValueError) as exc:
+                failed += 1
+                self.stderr.write(f'Doctor {doctor.pk}: {doctor.photo.name}: {exc}')
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'Built {built}, up to date {skipped}, failed {failed}'))
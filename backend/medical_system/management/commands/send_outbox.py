@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from medical_system.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Sends queued emails from the outbox in batches over a single SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help='Emails per SMTP connection')
+        parser.add_argument('--max-attempts', type=int, default=None, help='Give up on an email after this many attempts')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls in --loop mode')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = deliver_pending(options['batch_size'], options['max_attempts'])
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -1,47 +1,30 @@
 from django.core.management.base import BaseCommand
-from medical_system.models import User, Doctor
+
+from medical_system.profiles import apply_doctor_sync, plan_doctor_sync
+from medical_system.signals import directory_changed
+
 
 class Command(BaseCommand):
-    help = 'Syncs User model doctors with Doctor model entries'
+    help = (
+        'Syncs User model doctors with Doctor model entries: creates missing profiles, fills empty '
+        'fields with defaults and copies specialty changes from User. Profiles are kept in sync on '
+        'User save as well, so this is a reconciliation job.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show the changes without writing them')
+        parser.add_argument('--batch-size', type=int, default=500)
 
     def handle(self, *args, **options):
-        # Get all users with role='DOCTOR'
-        doctor_users = User.objects.filter(role='DOCTOR')
-        
-        default_values = {
-            'experience': 0,
-            'description': 'Опытный специалист в своей области',
-            'education': 'Высшее медицинское образование',
-            'achievements': '',
-            'consultation_price': 5000.00,
-            'available_for_online': True,
-        }
-        
-        for user in doctor_users:
-            # Create or update Doctor model entry
-            doctor, created = Doctor.objects.get_or_create(
-                user=user,
-                defaults={
-                    'specialty': user.specialty,
-                    **default_values
-                }
-            )
-            
-            if created:
-                self.stdout.write(self.style.SUCCESS(f'Created new Doctor entry for {user.get_full_name()} with all fields'))
-            else:
-                # Update any None values with defaults
-                updated = False
-                for field, default_value in default_values.items():
-                    if getattr(doctor, field) is None:
-                        setattr(doctor, field, default_value)
-                        updated = True
-                
-                # Update specialty if it changed
-                if doctor.specialty != user.specialty:
-                    doctor.specialty = user.specialty
-                    updated = True
-                
-                if updated:
-                    doctor.save()
-                    self.stdout.write(self.style.SUCCESS(f'Updated Doctor entry for {user.get_full_name()}')) 
\ No newline at end of file
+        plan = plan_doctor_sync()
+        for line in plan.lines():
+            self.stdout.write(line)
+        summary = f'{len(plan.create)} profiles to create, {len(plan.update)} to update'
+        if options['dry_run']:
+            self.stdout.write(f'Dry run: {summary}')
+            return
+        if plan:
+            apply_doctor_sync(plan, batch_size=options['batch_size'])
+            # bulk-операции не шлют сигналы Doctor, сбрасываем справочник сами
+            directory_changed()
+        self.stdout.write(self.style.SUCCESS(f'Done: {summary.replace(" to ", " ")}'))
@@ -0,0 +1,251 @@
+import logging
+import random
+import threading
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+slow_logger = logging.getLogger('medical_system.slow_requests')
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_LOG_MAX_QUERIES = 20
+
+
+class RouteStats:
+    def __init__(self):
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.duration = 0.0
+        self.db_queries = 0
+        self.db_duration = 0.0
+        self.render_duration = 0.0
+        self.response_bytes = 0
+        self.statuses = {}
+
+
+class MetricsRegistry:
+    """
+    Счётчики процесса по маршрутам.
+
+    Ключ — имя URL, HTTP-метод и действие вьюсета, а не путь, поэтому число
+    серий ограничено числом маршрутов, а не числом id в URL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def observe(self, labels, status, duration, db_queries, db_duration, render_duration, response_bytes):
+        with self.lock:
+            stats = self.routes.get(labels)
+            if stats is None:
+                stats = self.routes[labels] = RouteStats()
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if duration <= bound:
+                    stats.buckets[index] += 1
+            stats.count += 1
+            stats.duration += duration
+            stats.db_queries += db_queries
+            stats.db_duration += db_duration
+            stats.render_duration += render_duration
+            stats.response_bytes += response_bytes
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+    def render(self):
+        """Текстовый формат Prometheus 0.0.4."""
+        with self.lock:
+            snapshot = sorted(self.routes.items())
+            lines = []
+            lines.append('# HELP keremet_requests_total HTTP requests by route and status.')
+            lines.append('# TYPE keremet_requests_total counter')
+            for labels, stats in snapshot:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'keremet_requests_total{{{format_labels(labels, status=status)}}} {count}')
+
+            lines.append('# HELP keremet_request_duration_seconds Request latency.')
+            lines.append('# TYPE keremet_request_duration_seconds histogram')
+            for labels, stats in snapshot:
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    lines.append(
+                        f'keremet_request_duration_seconds_bucket{{{format_labels(labels, le=bound)}}} {count}'
+                    )
+                lines.append(
+                    f'keremet_request_duration_seconds_bucket{{{format_labels(labels, le="+Inf")}}} {stats.count}'
+                )
+                lines.append(f'keremet_request_duration_seconds_sum{{{format_labels(labels)}}} {stats.duration:.6f}')
+                lines.append(f'keremet_request_duration_seconds_count{{{format_labels(labels)}}} {stats.count}')
+
+            counters = (
+                ('keremet_request_db_queries_total', 'SQL queries executed.', 'db_queries', '{}'),
+                ('keremet_request_db_seconds_total', 'Time spent in SQL queries.', 'db_duration', '{:.6f}'),
+                ('keremet_request_render_seconds_total', 'Time spent rendering responses.', 'render_duration', '{:.6f}'),
+                ('keremet_response_bytes_total', 'Response body size.', 'response_bytes', '{}'),
+            )
+            for name, help_text, attr, value_format in counters:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for labels, stats in snapshot:
+                    value = value_format.format(getattr(stats, attr))
+                    lines.append(f'{name}{{{format_labels(labels)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels, **extra):
+    route, method, action = labels
+    pairs = [('route', route), ('method', method), ('action', action)] + list(extra.items())
+    return ','.join(f'{key}="{escape_label(value)}"' for key, value in pairs)
+
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    """Обёртка execute_wrapper: считает запросы, их время и хранит SQL для лога медленных запросов."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.queries.append((elapsed, context['connection'].alias, sql))
+
+
+def install_recorder(stack, recorder):
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(recorder))
+
+
+def request_labels(request, view_func):
+    match = getattr(request, 'resolver_match', None)
+    route = (match.url_name or match.route) if match else 'unmatched'
+    # У вьюсетов действие берём из карты метод -> действие, у прочих view — метод
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return route, request.method, action
+
+
+class RequestMetricsMiddleware:
+    """
+    Записывает для каждого запроса время ответа, число и время SQL-запросов,
+    время рендеринга и размер ответа в ``registry``.
+
+    Запросы дольше METRICS_SLOW_REQUEST_SECONDS с вероятностью
+    METRICS_SLOW_REQUEST_SAMPLE_RATE пишутся в лог medical_system.slow_requests
+    вместе с самыми долгими SQL-запросами.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = self.start(request)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            install_recorder(stack, recorder)
+            response = self.get_response(request)
+        self.finish(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        # Под ASGI ORM выполняет запросы в потоке запроса (sync_to_async с
+        # thread_sensitive), поэтому обёртку ставим и снимаем в том же потоке
+        recorder = self.start(request)
+        started = time.perf_counter()
+        stack = ExitStack()
+        await sync_to_async(install_recorder)(stack, recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        self.finish(request, response, recorder, time.perf_counter() - started)
+        return response
+
+    def start(self, request):
+        request._metrics_labels = None
+        request._metrics_render = [None, None]
+        return QueryRecorder()
+
+    def finish(self, request, response, recorder, duration):
+        labels = request._metrics_labels or ('unmatched', request.method, request.method.lower())
+        render_started, render_finished = request._metrics_render
+        render_duration = render_finished - render_started if render_finished is not None else 0.0
+        if response.streaming:
+            response_bytes = int(response.get('Content-Length') or 0)
+        else:
+            response_bytes = len(response.content)
+        registry.observe(
+            labels, response.status_code, duration, recorder.count, recorder.duration,
+            render_duration, response_bytes,
+        )
+        if duration >= settings.METRICS_SLOW_REQUEST_SECONDS and random.random() < settings.METRICS_SLOW_REQUEST_SAMPLE_RATE:
+            log_slow_request(request, response, labels, duration, recorder, render_duration)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_labels = request_labels(request, view_func)
+        return None
+
+    def process_template_response(self, request, response):
+        # Вызывается прямо перед response.render(); конец ловим post-render колбэком
+        request._metrics_render[0] = time.perf_counter()
+
+        def render_finished(rendered):
+            request._metrics_render[1] = time.perf_counter()
+
+        response.add_post_render_callback(render_finished)
+        return response
+
+
+def log_slow_request(request, response, labels, duration, recorder, render_duration):
+    slowest = sorted(recorder.queries, key=lambda query: query[0], reverse=True)[:SLOW_LOG_MAX_QUERIES]
+    sql = '\n'.join(f'  [{elapsed * 1000:.1f} ms {alias}] {statement}' for elapsed, alias, statement in slowest)
+    slow_logger.warning(
+        'Slow request %s %s (%s/%s) %s: %.1f ms, %d queries in %.1f ms, render %.1f ms\n%s',
+        request.method, request.path, labels[0], labels[2], response.status_code,
+        duration * 1000, recorder.count, recorder.duration * 1000, render_duration * 1000, sql,
+    )
+
+
+def has_metrics_access(request):
+    """
+    Заголовок "Bearer <METRICS_TOKEN>"; без настроенного токена доступ
+    только при DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if not token:
+        return settings.DEBUG
+    return constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+
+
+def metrics_view(request):
+    """Метрики в формате Prometheus, только при has_metrics_access."""
+    if not has_metrics_access(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
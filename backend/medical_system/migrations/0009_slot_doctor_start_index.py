@@ -0,0 +1,17 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_system', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='timeslot',
+            index=models.Index(fields=['doctor', 'start_time'], name='slot_doctor_start_idx'),
+        ),
+    ]
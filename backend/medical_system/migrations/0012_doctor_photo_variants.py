@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 07:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_system', '0011_upload_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='doctor',
+            name='photo_variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Уменьшенные копии фото: {вариант: {формат: путь, width, height}}'),
+        ),
+    ]
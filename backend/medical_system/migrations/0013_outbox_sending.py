@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_system', '0012_doctor_photo_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxemail',
+            name='status',
+            field=models.CharField(choices=[('QUEUED', 'В очереди'), ('SENDING', 'Отправляется'), ('SENT', 'Отправлено'), ('FAILED', 'Ошибка')], default='QUEUED', max_length=10),
+        ),
+    ]
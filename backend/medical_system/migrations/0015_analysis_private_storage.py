@@ -0,0 +1,43 @@
+# Generated by Django 5.0.1 on 2026-10-18 08:23
+
+import os
+import shutil
+
+import medical_system.blobs
+from django.conf import settings
+from django.db import migrations, models
+
+
+def move_results_to_private(apps, schema_editor):
+    # Уже загруженные результаты переносятся из MEDIA_ROOT; файл остаётся на
+    # месте, только если тот же блоб служит фото врача
+    Analysis = apps.get_model('medical_system', 'Analysis')
+    Doctor = apps.get_model('medical_system', 'Doctor')
+    photos = set(Doctor.objects.exclude(photo='').values_list('photo', flat=True))
+    names = Analysis.objects.exclude(result_file='').exclude(result_file__isnull=True).values_list('result_file', flat=True)
+    for name in set(names):
+        source = os.path.join(settings.MEDIA_ROOT, name)
+        if not os.path.exists(source):
+            continue
+        target = os.path.join(settings.PRIVATE_MEDIA_ROOT, name)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+        if name not in photos:
+            os.remove(source)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('medical_system', '0014_user_updated_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analysis',
+            name='result_file',
+            field=models.FileField(blank=True, null=True, storage=medical_system.blobs.get_private_storage, upload_to='analyses/'),
+        ),
+        migrations.RunPython(move_results_to_private, migrations.RunPython.noop),
+    ]
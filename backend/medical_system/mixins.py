@@ -0,0 +1,130 @@
+import hashlib
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework.response import Response
+
+
+def conditional_etag(*parts):
+    return quote_etag(hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def related_updated_fields(model, relations, field='updated_at'):
+    """``relation__updated_at`` для вложенных в ответ связей, у моделей которых такое поле есть."""
+    lookups = []
+    for relation in relations:
+        related = model
+        for part in relation.split('__'):
+            related = related._meta.get_field(part).related_model
+        try:
+            related._meta.get_field(field)
+        except FieldDoesNotExist:
+            continue
+        lookups.append(f'{relation}__{field}')
+    return lookups
+
+
+def list_aggregates(model, updated_field, relations=()):
+    """
+    Валидатор списка: число строк и max(updated_at) по выборке и по
+    вложенным связям, одним агрегирующим запросом — переименование врача
+    меняет ETag списка его слотов.
+    """
+    aggregates = {'count': Count('pk'), 'last': Max(updated_field)}
+    for i, lookup in enumerate(related_updated_fields(model, relations, updated_field)):
+        aggregates[f'related_{i}'] = Max(lookup)
+    return aggregates
+
+
+class QueryPlanMixin:
+    """
+    Подгружает связи, которые нужны сериализатору, одним запросом.
+
+    Сериализатор описывает свои связи в ``Meta.select_related`` и
+    ``Meta.prefetch_related``, а вьюсет может дополнить их своими атрибутами
+    с теми же именами. План применяется в ``filter_queryset``, поэтому
+    работает и для ``list``, и для ``get_object`` без изменений в
+    ``get_queryset`` конкретных вьюсетов.
+    """
+    select_related = ()
+    prefetch_related = ()
+
+    def get_query_plan(self):
+        meta = getattr(self.get_serializer_class(), 'Meta', None)
+        select = list(getattr(meta, 'select_related', ())) + list(self.select_related)
+        prefetch = list(getattr(meta, 'prefetch_related', ())) + list(self.prefetch_related)
+        return select, prefetch
+
+    def apply_query_plan(self, queryset):
+        select, prefetch = self.get_query_plan()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        return self.apply_query_plan(super().filter_queryset(queryset))
+
+
+class ReadSerializerMixin:
+    """
+    Список через ``read_serializer_class`` (см. read_serializers): строки
+    читаются ``.values()``, пагинатор получает словари, модели не создаются.
+    Остальные действия работают с обычным ``serializer_class``.
+    """
+    read_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.read_serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        reader = self.read_serializer_class(context=self.get_serializer_context())
+        rows = reader.project(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.serialize(page))
+        return Response(reader.serialize(rows))
+
+
+class ConditionalGetMixin:
+    """
+    Отвечает 304 Not Modified, не сериализуя данные.
+
+    Для списка валидатор — число строк и max(updated_at) в отфильтрованной
+    выборке и во вложенных связях из плана запроса (один агрегирующий
+    запрос), для объекта — его updated_at.
+    Если клиент прислал совпадающий If-None-Match, до сериализации дело
+    не доходит.
+    """
+    updated_field = 'updated_at'
+
+    def make_etag(self, *parts):
+        request = self.request
+        return conditional_etag(request.get_full_path(), request.user.pk, request.accepted_renderer.format, *parts)
+
+    def list_etag(self, queryset):
+        relations = self.get_query_plan()[0] if hasattr(self, 'get_query_plan') else ()
+        stats = queryset.order_by().aggregate(**list_aggregates(queryset.model, self.updated_field, relations))
+        return self.make_etag(*stats.values())
+
+    def conditional_response(self, etag, build):
+        not_modified = get_conditional_response(self.request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = build()
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if not self.updated_field:
+            return super().list(request, *args, **kwargs)
+        etag = self.list_etag(self.filter_queryset(self.get_queryset()))
+        return self.conditional_response(etag, lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.make_etag(instance.pk, getattr(instance, self.updated_field))
+        return self.conditional_response(etag, lambda: Response(self.get_serializer(instance).data))
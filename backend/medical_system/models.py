@@ -1,7 +1,12 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .blobs import get_private_storage
 
 class UserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -32,6 +37,8 @@ class User(AbstractUser):
     specialty = models.CharField(max_length=100, blank=True, null=True)
     phone = models.CharField(max_length=20, blank=True, null=True)
     inn = models.CharField(max_length=12, unique=True, null=True, blank=True)  # Making INN nullable initially
+    # Входит в ETag списков, где пользователь вложен в ответ (врач, пациент)
+    updated_at = models.DateTimeField(auto_now=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -51,6 +58,20 @@ class TimeSlot(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
     status = models.CharField(max_length=20, choices=(('AVAILABLE', 'Available'), ('BOOKED', 'Booked'), ('CANCELED', 'Canceled')))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['doctor', 'status', 'start_time'], name='slot_doctor_status_start_idx'),
+            models.Index(fields=['doctor', 'start_time'], name='slot_doctor_start_idx'),
+            # Свободные слоты всех врачей по времени, end_time и doctor — без обращения к таблице
+            models.Index(
+                fields=['start_time'],
+                include=['doctor', 'end_time'],
+                condition=models.Q(status='AVAILABLE'),
+                name='slot_available_start_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.doctor} - {self.start_time}"
@@ -61,6 +82,24 @@ class Appointment(models.Model):
     time_slot = models.ForeignKey(TimeSlot, on_delete=models.CASCADE)
     status = models.CharField(max_length=20, choices=(('SCHEDULED', 'Scheduled'), ('CANCELED', 'Canceled'), ('COMPLETED', 'Completed')))
     reason = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'status'], name='appt_patient_status_idx'),
+            models.Index(fields=['doctor', 'time_slot'], name='appt_doctor_slot_idx'),
+            models.Index(fields=['patient', 'time_slot'], name='appt_patient_slot_idx'),
+            models.Index(
+                fields=['doctor', 'time_slot'],
+                condition=models.Q(status='SCHEDULED'),
+                name='appt_doctor_scheduled_idx',
+            ),
+            models.Index(
+                fields=['patient', 'time_slot'],
+                condition=models.Q(status='SCHEDULED'),
+                name='appt_patient_scheduled_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient} with {self.doctor} at {self.time_slot.start_time}"
@@ -72,6 +111,13 @@ class MedicalRecord(models.Model):
     prescription = models.TextField(blank=True, null=True)
     test_result = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', '-created_at'], name='record_patient_created_idx'),
+            models.Index(fields=['doctor', '-created_at'], name='record_doctor_created_idx'),
+        ]
 
     def __str__(self):
         return f"Record for {self.patient} by {self.doctor}"
@@ -88,9 +134,17 @@ class Analysis(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
-    result_file = models.FileField(upload_to='analyses/', null=True, blank=True)
+    # Результаты не раздаются по MEDIA_URL — только через /api/analyses/<id>/download/
+    result_file = models.FileField(upload_to='analyses/', storage=get_private_storage, null=True, blank=True)
     date_added = models.DateTimeField(default=timezone.now)
     date_completed = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'status', '-date_added'], name='analysis_patient_status_idx'),
+            models.Index(fields=['doctor', 'status', '-date_added'], name='analysis_doctor_status_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} for {self.patient}"
@@ -120,6 +174,11 @@ class Doctor(models.Model):
         blank=True,
         help_text="Фотография врача"
     )
+    photo_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="Уменьшенные копии фото: {вариант: {формат: путь, width, height}}"
+    )
     education = models.TextField(
         null=True,
         blank=True,
@@ -145,6 +204,92 @@ class Doctor(models.Model):
     class Meta:
         verbose_name = "Врач"
         verbose_name_plural = "Врачи"
+        indexes = [
+            models.Index(fields=['specialty'], name='doctor_specialty_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.get_full_name()} - {self.specialty}"
+
+class IdempotencyKey(models.Model):
+    """
+    Сохранённый ответ на запрос с заголовком Idempotency-Key. Действует
+    IDEMPOTENCY_KEY_TTL_HOURS, потом удаляется clean_idempotency_keys.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_fingerprint = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(encoder=DjangoJSONEncoder, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_idempotency_key_per_user'),
+        ]
+        # Для очистки истёкших ключей
+        indexes = [models.Index(fields=['created_at'], name='idempotency_created_idx')]
+
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
+
+
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = (
+        ('QUEUED', 'В очереди'),
+        ('SENDING', 'Отправляется'),
+        ('SENT', 'Отправлено'),
+        ('FAILED', 'Ошибка'),
+    )
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='QUEUED')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_status_next_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """Докачиваемая загрузка файла частями: init -> PUT частей -> complete."""
+    PURPOSE_CHOICES = (
+        ('ANALYSIS_RESULT', 'Результат анализа'),
+        ('DOCTOR_PHOTO', 'Фото врача'),
+    )
+    STATUS_CHOICES = (
+        ('OPEN', 'Загружается'),
+        ('COMPLETE', 'Завершена'),
+        ('ABORTED', 'Отменена'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    purpose = models.CharField(max_length=20, choices=PURPOSE_CHOICES)
+    target_id = models.BigIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='OPEN')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='upload_status_updated_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.get_full_name()} - {self.specialty}"
\ No newline at end of file
+        return f"{self.filename} ({self.received}/{self.size})"
@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+def enqueue_email(subject, body, recipients, from_email=None):
+    """
+    Кладёт письмо в outbox вместо отправки по SMTP внутри запроса.
+
+    Вызывается в той же транзакции, что и изменение данных, поэтому письмо
+    уходит только если изменение закоммичено. Отправляет ``send_outbox``.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=list(recipients),
+    )
+
+
+def backoff_delay(attempts):
+    base = getattr(settings, 'EMAIL_OUTBOX_BACKOFF_SECONDS', 60)
+    cap = getattr(settings, 'EMAIL_OUTBOX_MAX_BACKOFF_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def claim_batch(batch_size, lease=None):
+    """
+    Берёт письма в работу и сразу коммитит: статус SENDING, а в
+    next_attempt_at — срок аренды. SMTP идёт уже без транзакции и блокировок;
+    если воркер упал посреди пачки, письма после срока аренды возьмёт другой.
+    """
+    now = timezone.now()
+    lease = lease or getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 300)
+    with transaction.atomic():
+        queryset = OutboxEmail.objects.filter(
+            status__in=('QUEUED', 'SENDING'), next_attempt_at__lte=now
+        ).order_by('next_attempt_at', 'id')
+        if db_connection.features.has_select_for_update_skip_locked:
+            # Несколько воркеров не возьмут одни и те же письма
+            queryset = queryset.select_for_update(skip_locked=True)
+        emails = list(queryset[:batch_size])
+        for email in emails:
+            email.status = 'SENDING'
+            email.next_attempt_at = now + timedelta(seconds=lease)
+        OutboxEmail.objects.bulk_update(emails, ['status', 'next_attempt_at'])
+    return emails
+
+
+def record_result(email, error, max_attempts):
+    """
+    Записывает итог отправки одного письма, если аренда ещё за нами: письмо
+    в SENDING и срок аренды тот, что поставил claim_batch. Если аренда
+    истекла и письмо взял другой воркер, его попытка не затирается.
+    Возвращает, записан ли итог.
+    """
+    now = timezone.now()
+    leased_until = email.next_attempt_at
+    email.attempts += 1
+    if error is None:
+        email.status = 'SENT'
+        email.sent_at = now
+        email.last_error = ''
+    else:
+        email.last_error = error
+        if email.attempts >= max_attempts:
+            email.status = 'FAILED'
+        else:
+            email.status = 'QUEUED'
+            email.next_attempt_at = now + backoff_delay(email.attempts)
+    return bool(OutboxEmail.objects.filter(pk=email.pk, status='SENDING', next_attempt_at=leased_until).update(
+        status=email.status, attempts=email.attempts, sent_at=email.sent_at,
+        last_error=email.last_error, next_attempt_at=email.next_attempt_at,
+    ))
+
+
+def deliver_pending(batch_size=50, max_attempts=None):
+    """
+    Отправляет одну пачку писем через одно SMTP-соединение. Возвращает (sent, failed).
+
+    Письма уходят по одному, и итог каждого записывается сразу после
+    отправки: сбой на середине пачки не отправит повторно уже ушедшие.
+    """
+    max_attempts = max_attempts or getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    emails = claim_batch(batch_size)
+    if not emails:
+        return 0, 0
+
+    sent = failed = 0
+    mail_connection = get_connection(fail_silently=False)
+    try:
+        mail_connection.open()
+    except Exception as exc:
+        error = str(exc) or exc.__class__.__name__
+        for email in emails:
+            record_result(email, error, max_attempts)
+        return 0, len(emails)
+    try:
+        for email in emails:
+            message = EmailMessage(
+                email.subject, email.body, email.from_email, email.recipients, connection=mail_connection,
+            )
+            try:
+                mail_connection.send_messages([message])
+                error = None
+            except Exception as exc:
+                error = str(exc) or exc.__class__.__name__
+            record_result(email, error, max_attempts)
+            if error is None:
+                sent += 1
+            else:
+                failed += 1
+    finally:
+        try:
+            mail_connection.close()
+        except Exception:
+            pass
+    return sent, failed
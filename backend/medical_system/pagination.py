@@ -0,0 +1,44 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Курсорная (keyset) пагинация: страница выбирается условием по ключу
+    сортировки, а не OFFSET, поэтому 500-я страница читается так же быстро,
+    как первая.
+
+    Порядок можно задать во вьюхе атрибутом ``cursor_ordering``; поля могут
+    идти через связи (``time_slot__start_time``).
+    """
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-id',)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = getattr(view, 'cursor_ordering', None) or self.ordering
+        if isinstance(ordering, str):
+            return (ordering,)
+        return tuple(ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        field_name = ordering[0].lstrip('-')
+        if isinstance(instance, dict):
+            attr = instance[field_name]
+        else:
+            attr = instance
+            for part in field_name.split('__'):
+                attr = getattr(attr, part)
+        return str(attr)
+
+
+class AppointmentPagination(KeysetPagination):
+    ordering = ('-time_slot__start_time', '-id')
+
+
+class AnalysisPagination(KeysetPagination):
+    ordering = ('-date_added', '-id')
+
+
+class MedicalRecordPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,132 @@
+"""
+Уменьшенные копии фото врачей.
+
+Оригинал с камеры весит мегабайты, поэтому после загрузки в фоновом потоке
+готовятся квадратные копии нужных размеров в WebP и JPEG. Имя копии
+зависит от имени оригинала и размера, так что готовые файлы на диске
+переиспользуются, а копии от прежнего фото сразу видны как устаревшие.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from .models import Doctor
+
+logger = logging.getLogger(__name__)
+
+VARIANT_ROOT = 'photo_variants'
+# Карточка в списке врачей, страница врача и она же для экранов с плотностью 2x
+PHOTO_VARIANTS = {
+    'card': 160,
+    'profile': 400,
+    'profile_2x': 800,
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+
+photo_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'PHOTO_VARIANT_WORKERS', 2),
+    thread_name_prefix='photo-variants',
+)
+
+
+def variant_name(source, variant, fmt):
+    stem = hashlib.sha1(source.encode()).hexdigest()
+    size = PHOTO_VARIANTS[variant]
+    return f'{VARIANT_ROOT}/{stem[:2]}/{stem}/{variant}-{size}.{"jpg" if fmt == "jpeg" else fmt}'
+
+
+def variants_current(doctor):
+    """Копии сделаны из текущего фото и по текущему набору размеров."""
+    variants = doctor.photo_variants or {}
+    if not doctor.photo or set(variants) != set(PHOTO_VARIANTS):
+        return False
+    return all(
+        variants[variant].get(fmt) == variant_name(doctor.photo.name, variant, fmt)
+        for variant in PHOTO_VARIANTS for fmt in FORMATS
+    )
+
+
+def prepare_image(image):
+    image = ImageOps.exif_transpose(image)
+    if image.mode == 'RGB':
+        return image
+    # У JPEG нет прозрачности: подкладываем белый фон
+    rgba = image.convert('RGBA')
+    background = Image.new('RGB', rgba.size, 'white')
+    background.paste(rgba, mask=rgba.getchannel('A'))
+    return background
+
+
+def render_variants(source, force=False):
+    """
+    Создаёт недостающие файлы копий (при force — все заново) и возвращает
+    карту {вариант: {формат: имя, width, height}}.
+    """
+    variants = {}
+    with default_storage.open(source, 'rb') as f, Image.open(f) as original:
+        # Размер с учётом поворота из EXIF известен без декодирования пикселей
+        width, height = original.size
+        if original.getexif().get(0x0112) in (5, 6, 7, 8):
+            width, height = height, width
+        image = None
+        for variant, size in PHOTO_VARIANTS.items():
+            # Не увеличиваем маленькие фото
+            side = min(size, width, height)
+            names = {fmt: variant_name(source, variant, fmt) for fmt in FORMATS}
+            for fmt, name in names.items():
+                if default_storage.exists(name):
+                    if not force:
+                        continue
+                    default_storage.delete(name)
+                if image is None:
+                    image = prepare_image(original)
+                thumb = ImageOps.fit(image, (side, side), Image.LANCZOS, centering=(0.5, 0.4))
+                buffer = BytesIO()
+                pil_format, options = FORMATS[fmt]
+                thumb.save(buffer, pil_format, **options)
+                default_storage.save(name, ContentFile(buffer.getvalue()))
+            variants[variant] = {**names, 'width': side, 'height': side}
+    return variants
+
+
+def generate_photo_variants(doctor_id, force=False):
+    """Готовит копии фото врача и сохраняет их карту, если фото за это время не сменилось."""
+    doctor = Doctor.objects.filter(pk=doctor_id).only('photo').first()
+    if doctor is None or not doctor.photo:
+        return None
+    source = doctor.photo.name
+    variants = render_variants(source, force)
+    with transaction.atomic():
+        doctor = Doctor.objects.select_for_update().filter(pk=doctor_id).first()
+        if doctor is None or doctor.photo.name != source:
+            return None
+        doctor.photo_variants = variants
+        # post_save сбросит кэш справочника врачей
+        doctor.save(update_fields=['photo_variants'])
+    return variants
+
+
+def _run_in_background(doctor_id):
+    try:
+        generate_photo_variants(doctor_id)
+    except Exception:
+        logger.exception('Failed to build photo variants for doctor %s', doctor_id)
+    finally:
+        # Соединения у каждого потока свои, иначе они так и останутся открытыми
+        connections.close_all()
+
+
+def schedule_photo_variants(doctor):
+    """После коммита ставит обработку фото в пул потоков, не задерживая ответ."""
+    doctor_id = doctor.pk
+    transaction.on_commit(lambda: photo_executor.submit(_run_in_background, doctor_id))
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models import F, Q
+
+from .models import User, Doctor
+
+# Значения полей профиля, которые не должны оставаться пустыми
+PROFILE_DEFAULTS = {
+    'experience': 0,
+    'description': 'Опытный специалист в своей области',
+    'education': 'Высшее медицинское образование',
+    'achievements': '',
+    'consultation_price': 5000.00,
+    'available_for_online': True,
+}
+
+
+class SyncPlan:
+    """Что нужно сделать, чтобы у каждого врача был заполненный профиль."""
+
+    def __init__(self):
+        self.create = []  # пользователи-врачи без профиля
+        self.update = []  # (профиль, {поле: (было, станет)})
+
+    def __bool__(self):
+        return bool(self.create or self.update)
+
+    def lines(self):
+        for user in self.create:
+            yield f'+ {user.get_full_name()} <{user.email}>: new profile, specialty {user.specialty or "-"}'
+        for doctor, changes in self.update:
+            diff = ', '.join(f'{field} {old!r} -> {new!r}' for field, (old, new) in changes.items())
+            yield f'~ {doctor.user.get_full_name()} <{doctor.user.email}>: {diff}'
+
+
+def plan_doctor_sync(user_ids=None):
+    """
+    Два запроса на любое число врачей: пользователи без профиля и профили
+    с пустыми полями или специальностью, разошедшейся с User.specialty.
+    """
+    plan = SyncPlan()
+    users = User.objects.filter(role='DOCTOR')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    plan.create = list(users.filter(doctor_profile__isnull=True).only('id', 'email', 'first_name', 'last_name', 'specialty'))
+
+    has_gaps = Q()
+    for field in PROFILE_DEFAULTS:
+        has_gaps |= Q(**{f'{field}__isnull': True})
+    drifted = Q(user__specialty__isnull=False) & ~Q(user__specialty='') & ~Q(specialty=F('user__specialty'))
+    profiles = (
+        Doctor.objects.filter(user__in=users).filter(has_gaps | drifted)
+        .select_related('user').only(*PROFILE_DEFAULTS, 'specialty', 'user', 'user__email', 'user__first_name',
+                                     'user__last_name', 'user__specialty')
+    )
+    for doctor in profiles:
+        changes = {}
+        for field, default in PROFILE_DEFAULTS.items():
+            if getattr(doctor, field) is None:
+                changes[field] = (None, default)
+        if doctor.user.specialty and doctor.specialty != doctor.user.specialty:
+            changes['specialty'] = (doctor.specialty, doctor.user.specialty)
+        if changes:
+            plan.update.append((doctor, changes))
+    return plan
+
+
+def apply_doctor_sync(plan, batch_size=500):
+    """Создаёт недостающие профили и исправляет существующие пачками."""
+    with transaction.atomic():
+        Doctor.objects.bulk_create([
+            Doctor(user=user, specialty=user.specialty or '', **PROFILE_DEFAULTS) for user in plan.create
+        ], batch_size=batch_size)
+        fields = set()
+        for doctor, changes in plan.update:
+            for field, (_, new) in changes.items():
+                setattr(doctor, field, new)
+            fields.update(changes)
+        if fields:
+            Doctor.objects.bulk_update([doctor for doctor, _ in plan.update], sorted(fields), batch_size=batch_size)
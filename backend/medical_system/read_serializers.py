@@ -0,0 +1,156 @@
+"""
+Сериализация больших списков только для чтения.
+
+ModelSerializer создаёт модель на каждую строку и проходит по полям
+вложенных UserSerializer с их валидаторами и полем password, хотя для
+ответа нужны только значения колонок. Здесь строки читаются через
+``.values()`` одним запросом с JOIN, а каждое поле выводится заранее
+собранной функцией. JSON совпадает с ответом ModelSerializer (это
+проверяют тесты), поэтому клиенты разницы не видят.
+"""
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from operator import itemgetter
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.reverse import reverse
+from rest_framework.settings import api_settings
+
+from .models import Analysis
+from .serializers import UserSerializer
+
+PK_PLACEHOLDER = '__pk__'
+
+
+@lru_cache(maxsize=None)
+def user_fields():
+    # Поля, которые UserSerializer отдаёт при чтении (без password)
+    return tuple(name for name, field in UserSerializer().fields.items() if not field.write_only)
+
+
+def datetime_getter(lookup):
+    get = itemgetter(lookup)
+    if api_settings.DATETIME_FORMAT != ISO_8601 or not settings.USE_TZ:
+        field = serializers.DateTimeField()
+
+        def convert(row):
+            value = get(row)
+            return None if value is None else field.to_representation(value)
+        return convert
+
+    # Как DateTimeField.to_representation: в текущую зону, UTC — как Z
+    tz = timezone.get_current_timezone()
+
+    def convert(row):
+        value = get(row)
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return convert
+
+
+def nested_getter(getters):
+    def build(row):
+        return {name: get(row) for name, get in getters}
+    return build
+
+
+class ValuesSerializer(ABC):
+    """
+    Основа read-сериализаторов на ``.values()``.
+
+    Подкласс перечисляет в ``get_lookups`` колонки для запроса и собирает в
+    ``get_getters`` пары (поле, функция от строки). ``project`` превращает
+    queryset во выборку словарей — её можно отдавать пагинатору, — а
+    ``serialize`` строит ответ по готовым строкам.
+    """
+    def __init__(self, context=None):
+        self.context = context or {}
+
+    @abstractmethod
+    def get_lookups(self):
+        """Колонки для ``.values()``."""
+
+    @abstractmethod
+    def get_getters(self):
+        """Пары (поле ответа, функция от строки)."""
+
+    def project(self, queryset):
+        return queryset.values(*self.get_lookups())
+
+    def serialize(self, rows):
+        build = nested_getter(self.get_getters())
+        return [build(row) for row in rows]
+
+    def user_getter(self, relation):
+        # Вложенный UserSerializer: id из самой таблицы, остальное — через JOIN
+        return nested_getter([
+            (name, itemgetter(f'{relation}_id' if name == 'id' else f'{relation}__{name}'))
+            for name in user_fields()
+        ])
+
+    def user_lookups(self, *relations):
+        return [
+            f'{relation}_id' if name == 'id' else f'{relation}__{name}'
+            for relation in relations for name in user_fields()
+        ]
+
+
+class AppointmentReadSerializer(ValuesSerializer):
+    """То же, что AppointmentSerializer, для списков."""
+
+    def get_lookups(self):
+        # time_slot__start_time нужен курсору AppointmentPagination
+        return [
+            'id', 'time_slot_id', 'time_slot__start_time', 'status', 'reason',
+            *self.user_lookups('doctor', 'patient'),
+        ]
+
+    def get_getters(self):
+        return [
+            ('id', itemgetter('id')),
+            ('doctor', self.user_getter('doctor')),
+            ('patient', self.user_getter('patient')),
+            ('time_slot', itemgetter('time_slot_id')),
+            ('status', itemgetter('status')),
+            ('reason', itemgetter('reason')),
+        ]
+
+
+class AnalysisReadSerializer(ValuesSerializer):
+    """То же, что AnalysisSerializer, для списков."""
+
+    def get_lookups(self):
+        return [
+            'id', 'name', 'description', 'status', 'result_file', 'date_added', 'date_completed',
+            *self.user_lookups('patient', 'doctor'),
+        ]
+
+    def get_getters(self):
+        request = self.context.get('request')
+        labels = dict(Analysis._meta.get_field('status').flatchoices)
+        # Адрес download собирается один раз, в строке подставляется только id
+        download = reverse('analysis-download', args=[PK_PLACEHOLDER], request=request)
+
+        def status_display(row):
+            status = row['status']
+            return str(labels.get(status, status))
+
+        def result_file_url(row):
+            return download.replace(PK_PLACEHOLDER, str(row['id'])) if row['result_file'] else None
+
+        return [
+            ('id', itemgetter('id')),
+            ('patient', self.user_getter('patient')),
+            ('doctor', self.user_getter('doctor')),
+            ('name', itemgetter('name')),
+            ('description', itemgetter('description')),
+            ('status', itemgetter('status')),
+            ('status_display', status_display),
+            ('result_file_url', result_file_url),
+            ('date_added', datetime_getter('date_added')),
+            ('date_completed', datetime_getter('date_completed')),
+        ]
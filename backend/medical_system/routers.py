@@ -0,0 +1,130 @@
+import contextvars
+import hashlib
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+
+from .login import client_ip
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Алиас реплики для чтений текущего запроса; None — читаем из default
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', ()))
+
+
+def current_read_alias():
+    return _read_alias.get()
+
+
+@contextmanager
+def read_from(alias):
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Чтения внутри ``read_from(alias)`` уходят на реплику, всё остальное —
+    в default. Реплики не мигрируются: схему на них приносит репликация.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # На репликах те же данные, что и в default
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
+
+
+def pin_key(request):
+    # Пользователь ещё не аутентифицирован до вызова view (JWT проверяет DRF),
+    # поэтому клиента узнаём по заголовку Authorization, а без него — по IP
+    auth = request.META.get('HTTP_AUTHORIZATION')
+    identity = auth or client_ip(request)
+    return 'replica-pin:' + hashlib.sha1(identity.encode()).hexdigest()
+
+
+def pin_cache():
+    # Общий для всех воркеров кэш, см. checks.check_replica_pin_cache
+    return caches[getattr(settings, 'READ_REPLICA_PIN_CACHE', 'default')]
+
+
+def pin_to_primary(request):
+    pin_cache().set(pin_key(request), True, settings.READ_REPLICA_PIN_SECONDS)
+
+
+def is_pinned(request):
+    return pin_cache().get(pin_key(request)) is not None
+
+
+class ReadReplicaMiddleware:
+    """
+    Безопасные запросы к view с ``use_read_replica = True`` читают из случайной
+    реплики. После успешной записи клиент на READ_REPLICA_PIN_SECONDS
+    закрепляется за default, чтобы сразу видеть свои изменения, несмотря на
+    отставание репликации.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request._replica_token = None
+        try:
+            response = self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                _read_alias.reset(request._replica_token)
+                request._replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            pin_to_primary(request)
+        return response
+
+    async def __acall__(self, request):
+        request._replica_token = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if request._replica_token is not None:
+                # process_view выполнялся через sync_to_async в копии контекста,
+                # его токен здесь не подходит для reset
+                _read_alias.set(None)
+                request._replica_token = None
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_aliases():
+            await sync_to_async(pin_to_primary)(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replicas = replica_aliases()
+        if not replicas or request.method not in SAFE_METHODS:
+            return None
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if not getattr(view_class, 'use_read_replica', False) or is_pinned(request):
+            return None
+        request._replica_token = _read_alias.set(random.choice(replicas))
+        return None
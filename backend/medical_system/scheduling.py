@@ -0,0 +1,112 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import TimeSlot, User
+from .slot_events import publish_slots
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# Государственные праздники Кыргызстана с фиксированной датой (месяц, день)
+KYRGYZ_PUBLIC_HOLIDAYS = {
+    (1, 1), (1, 7), (2, 23), (3, 8), (3, 21), (3, 22),
+    (5, 1), (5, 5), (5, 9), (8, 31), (11, 7), (11, 8),
+}
+
+
+def parse_weekdays(value):
+    """'mon-fri' или 'mon,wed,fri' -> {0, 1, 2, 3, 4}."""
+    days = set()
+    for part in value.lower().replace(' ', '').split(','):
+        if not part:
+            continue
+        if '-' in part:
+            first, last = part.split('-', 1)
+            start, end = WEEKDAYS.index(first), WEEKDAYS.index(last)
+            days.update(range(start, end + 1) if start <= end else [*range(start, 7), *range(0, end + 1)])
+        else:
+            days.add(WEEKDAYS.index(part))
+    return days
+
+
+def expand_weekly_template(start_date, weeks, weekdays, day_start, day_end, slot_minutes,
+                           skip_holidays=True, skip_dates=(), tz=None):
+    """Разворачивает недельный шаблон в список интервалов (start, end)."""
+    tz = tz or timezone.get_current_timezone()
+    step = timedelta(minutes=slot_minutes)
+    skip_dates = set(skip_dates)
+    intervals = []
+    for offset in range(weeks * 7):
+        day = start_date + timedelta(days=offset)
+        if day.weekday() not in weekdays or day in skip_dates:
+            continue
+        if skip_holidays and (day.month, day.day) in KYRGYZ_PUBLIC_HOLIDAYS:
+            continue
+        start = timezone.make_aware(datetime.combine(day, day_start), tz)
+        end_of_day = timezone.make_aware(datetime.combine(day, day_end), tz)
+        while start + step <= end_of_day:
+            intervals.append((start, start + step))
+            start += step
+    return intervals
+
+
+class BusyIntervals:
+    """Занятые интервалы одного врача с проверкой пересечения за O(log n)."""
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self.starts = [start for start, _ in intervals]
+        self.max_ends = []
+        latest = None
+        for _, end in intervals:
+            latest = end if latest is None or end > latest else latest
+            self.max_ends.append(latest)
+
+    def overlaps(self, start, end):
+        index = bisect_left(self.starts, end)
+        return index > 0 and self.max_ends[index - 1] > start
+
+
+def generate_slots(doctors, intervals, batch_size=500, dry_run=False):
+    """
+    Создаёт слоты по шаблону для каждого врача одной транзакцией.
+
+    Существующие слоты (кроме отменённых) читаются одним запросом, слоты,
+    которые с ними пересекаются, пропускаются. Возвращает (created, skipped).
+    """
+    if not intervals:
+        return 0, 0
+    doctor_ids = [doctor.pk for doctor in doctors]
+    window_start = min(start for start, _ in intervals)
+    window_end = max(end for _, end in intervals)
+
+    with transaction.atomic():
+        # Блокируем врачей, чтобы параллельная генерация не создала дубли
+        list(User.objects.select_for_update().filter(pk__in=doctor_ids).values_list('pk', flat=True))
+        existing = defaultdict(list)
+        rows = (
+            TimeSlot.objects.filter(doctor_id__in=doctor_ids, start_time__lt=window_end, end_time__gt=window_start)
+            .exclude(status='CANCELED')
+            .values_list('doctor_id', 'start_time', 'end_time')
+        )
+        for doctor_id, start, end in rows:
+            existing[doctor_id].append((start, end))
+
+        slots = []
+        skipped = 0
+        for doctor_id in doctor_ids:
+            busy = BusyIntervals(existing[doctor_id])
+            for start, end in intervals:
+                if busy.overlaps(start, end):
+                    skipped += 1
+                    continue
+                slots.append(TimeSlot(doctor_id=doctor_id, start_time=start, end_time=end, status='AVAILABLE'))
+
+        if not dry_run:
+            TimeSlot.objects.bulk_create(slots, batch_size=batch_size)
+            # bulk_create не шлёт сигналы, подписчикам сообщаем сами
+            publish_slots(slots)
+    return len(slots), skipped
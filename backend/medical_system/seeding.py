@@ -0,0 +1,303 @@
+"""
+Генератор правдоподобных данных клиники для нагрузочных тестов и демо.
+
+Все значения берутся из ``random.Random(seed)``, а хеш пароля — из
+фиксированной соли, поэтому одинаковые параметры дают одинаковые данные.
+Строки пишутся пачками: на PostgreSQL через COPY, на остальных базах —
+bulk_create. Пользователи получают email в домене ``domain``, по нему же
+данные удаляются.
+"""
+import io
+import json
+import math
+import random
+import zlib
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router
+from django.db.models import JSONField
+from django.utils import timezone
+
+from .models import User, Doctor, TimeSlot, Appointment, MedicalRecord, Analysis
+from .scheduling import expand_weekly_template
+
+SCALES = {
+    'tiny': {'doctors': 5, 'patients': 50, 'slots': 500, 'appointments': 300},
+    'small': {'doctors': 100, 'patients': 2_000, 'slots': 20_000, 'appointments': 50_000},
+    'medium': {'doctors': 1_000, 'patients': 20_000, 'slots': 200_000, 'appointments': 500_000},
+    'large': {'doctors': 10_000, 'patients': 200_000, 'slots': 1_000_000, 'appointments': 5_000_000},
+}
+
+MALE_FIRST_NAMES = [
+    'Азамат', 'Айбек', 'Бакыт', 'Бекзат', 'Даниярбек', 'Эркин', 'Нурлан', 'Темирлан', 'Улан', 'Чынгыз',
+    'Асылбек', 'Мирлан', 'Руслан', 'Тимур', 'Алмаз', 'Эрлан', 'Канат', 'Жыргалбек', 'Александр', 'Дмитрий',
+]
+FEMALE_FIRST_NAMES = [
+    'Айгуль', 'Айпери', 'Асель', 'Бермет', 'Гульнара', 'Жылдыз', 'Нургуль', 'Чолпон', 'Айжан', 'Динара',
+    'Мээрим', 'Назгуль', 'Салтанат', 'Эльмира', 'Каныкей', 'Айсулуу', 'Алина', 'Елена', 'Мария', 'Анна',
+]
+# Фамилии в мужской форме; женская получается окончанием -а
+SURNAME_STEMS = [
+    'Абдыкадыров', 'Асанов', 'Бакиев', 'Жумабеков', 'Исаков', 'Калыков', 'Мамытов', 'Осмонов', 'Сыдыков',
+    'Токтогулов', 'Турдубаев', 'Усенов', 'Шаршеев', 'Эсенбаев', 'Алымбеков', 'Сатыбалдиев', 'Иванов', 'Петров',
+]
+PHONE_PREFIXES = ['700', '701', '702', '550', '551', '555', '770', '771', '777', '220', '505']
+
+SPECIALTIES = {
+    'THERAPIST': 'Опытный терапевт. Диагностика и лечение внутренних болезней.',
+    'SURGEON': 'Хирург широкого профиля, плановые и экстренные операции.',
+    'PEDIATRICIAN': 'Педиатр. Наблюдение детей с рождения до 18 лет.',
+    'NEUROLOGIST': 'Невролог. Головные боли, остеохондроз, нарушения сна.',
+    'CARDIOLOGIST': 'Кардиолог. Гипертония, аритмии, ведение после инфаркта.',
+    'DENTIST': 'Стоматолог-терапевт, лечение кариеса и профилактика.',
+}
+UNIVERSITIES = [
+    'КГМА им. И.К. Ахунбаева', 'КРСУ им. Б.Н. Ельцина', 'Ошский государственный университет',
+    'Международная высшая школа медицины', 'Казахский национальный медицинский университет',
+]
+# Смены: начало, конец, длительность приёма в минутах
+SHIFTS = [(time(8), time(14), 30), (time(9), time(17), 30), (time(13), time(19), 20), (time(9), time(15), 20)]
+
+REASONS = [
+    'Плановый осмотр', 'Повышенное давление', 'Боль в спине', 'Головная боль', 'Кашель и температура',
+    'Профилактический осмотр', 'Справка для работы', 'Повторный приём', 'Боль в груди', 'Консультация по анализам',
+]
+DIAGNOSES = [
+    ('ОРВИ', 'Обильное питьё, парацетамол при температуре выше 38.5'),
+    ('Гипертоническая болезнь II ст.', 'Лизиноприл 10 мг утром, контроль давления'),
+    ('Хронический гастрит', 'Омепразол 20 мг за 30 минут до еды, диета'),
+    ('Остеохондроз поясничного отдела', 'ЛФК, мелоксикам 7.5 мг 5 дней'),
+    ('Острый бронхит', 'Амброксол, тёплое питьё'),
+    ('Железодефицитная анемия', 'Препараты железа 3 месяца, контроль ОАК'),
+    ('Кариес', 'Пломбирование, профилактический осмотр через 6 месяцев'),
+    ('Мигрень без ауры', 'Суматриптан при приступе, дневник головной боли'),
+]
+ANALYSES = [
+    'Общий анализ крови', 'Биохимический анализ крови', 'Общий анализ мочи', 'Глюкоза крови',
+    'Липидный профиль', 'ТТГ', 'ЭКГ', 'Коагулограмма', 'Ферритин', 'С-реактивный белок',
+]
+
+
+class RowWriter:
+    """
+    Копит строки одной модели и пишет их пачками: COPY на PostgreSQL, иначе
+    bulk_create. Для COPY строки не превращаются в объекты моделей —
+    недостающие поля берут значения по умолчанию, auto_now — время пачки.
+    """
+
+    def __init__(self, model, batch_size, use_copy=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.connection = connections[router.db_for_write(model)]
+        self.use_copy = self.connection.vendor == 'postgresql' if use_copy is None else use_copy
+        self.fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+        self.rows = []
+        self.count = 0
+
+    def add(self, **values):
+        self.rows.append(values)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.use_copy:
+            self.copy(self.rows)
+        else:
+            self.model.objects.using(self.connection.alias).bulk_create([self.model(**row) for row in self.rows])
+        self.count += len(self.rows)
+        self.rows = []
+
+    def copy(self, rows):
+        now = timezone.now()
+        columns = []
+        for field in self.fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                columns.append((field.attname, lambda now=now: now, None))
+            else:
+                columns.append((field.attname, field.get_default, field if isinstance(field, JSONField) else None))
+        buffer = io.StringIO()
+        for row in rows:
+            values = []
+            for attname, default, json_field in columns:
+                value = row[attname] if attname in row else default()
+                if json_field is not None and value is not None:
+                    value = json.dumps(value, cls=json_field.encoder)
+                values.append(copy_value(value))
+            buffer.write('\t'.join(values))
+            buffer.write('\n')
+        buffer.seek(0)
+        quote = self.connection.ops.quote_name
+        column_list = ', '.join(quote(field.column) for field in self.fields)
+        with self.connection.cursor() as cursor:
+            cursor.copy_expert(f'COPY {quote(self.model._meta.db_table)} ({column_list}) FROM STDIN', buffer)
+
+
+def copy_value(value):
+    """Значение в текстовом формате COPY: \\N — NULL, спецсимволы экранируются."""
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+def seeded_users(domain):
+    return User.objects.filter(email__endswith=f'@{domain}')
+
+
+def flush_seeded(domain):
+    """Удаляет данные домена; зависимые таблицы чистятся прямыми DELETE без загрузки объектов."""
+    users = seeded_users(domain)
+    for queryset in (
+        Appointment.objects.filter(patient__in=users),
+        Appointment.objects.filter(doctor__in=users),
+        Analysis.objects.filter(patient__in=users),
+        Analysis.objects.filter(doctor__in=users),
+        MedicalRecord.objects.filter(patient__in=users),
+        MedicalRecord.objects.filter(doctor__in=users),
+        TimeSlot.objects.filter(doctor__in=users),
+        Doctor.objects.filter(user__in=users),
+    ):
+        queryset._raw_delete(queryset.db)
+    users.delete()
+
+
+def person(rng, index):
+    female = rng.random() < 0.55
+    first_name = rng.choice(FEMALE_FIRST_NAMES if female else MALE_FIRST_NAMES)
+    last_name = rng.choice(SURNAME_STEMS) + ('а' if female else '')
+    phone = f'+996{rng.choice(PHONE_PREFIXES)}{index % 1_000_000:06d}'
+    return first_name, last_name, phone
+
+
+def seed_database(doctors, patients, slots, appointments, analyses=None, records=None, seed=0,
+                  domain='seed.keremet.kg', password='123456', start_date=None, batch_size=5000,
+                  use_copy=None, log=None):
+    """
+    Заполняет базу: врачи с профилями, пациенты, слоты по сменам (рабочие
+    дни, без праздников), записи, анализы и медкарты. Половина слотов
+    каждого врача лежит до полудня ``start_date``, половина — после. На каждом занятом слоте одна
+    активная или завершённая запись, остальные записи — отменённые.
+    Возвращает число созданных строк по таблицам.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    start_date = start_date or timezone.localdate()
+    now = timezone.make_aware(datetime.combine(start_date, time(12)))
+    analyses = appointments // 5 if analyses is None else analyses
+    records = appointments // 5 if records is None else records
+    # Одна соль на прогон: хеш считается один раз и воспроизводим
+    password_hash = make_password(password, salt=f'keremetseed{seed}')
+    counts = {}
+
+    def write(model, rows):
+        writer = RowWriter(model, batch_size, use_copy)
+        for values in rows:
+            writer.add(**values)
+        writer.flush()
+        counts[model._meta.model_name] = counts.get(model._meta.model_name, 0) + writer.count
+        return writer.count
+
+    # Пользователи. ИНН: 9, роль (1 — врач, 2 — пациент), блок домена, номер —
+    # не пересекаются с реальными и с данными других доменов
+    inn_block = zlib.crc32(domain.encode()) % 1000
+    specialties = list(SPECIALTIES)
+    doctor_specialties = [specialties[i % len(specialties)] for i in range(doctors)]
+
+    def users(role, count, role_code):
+        for i in range(count):
+            first_name, last_name, phone = person(rng, i)
+            yield {
+                'email': f'{role.lower()}.{i}@{domain}', 'password': password_hash, 'role': role,
+                'first_name': first_name, 'last_name': last_name, 'phone': phone,
+                'inn': f'9{role_code}{inn_block:03d}{i:07d}',
+                'specialty': doctor_specialties[i] if role == 'DOCTOR' else None,
+                'date_joined': now - timedelta(days=rng.randint(0, 3 * 365)),
+            }
+
+    write(User, users('DOCTOR', doctors, 1))
+    write(User, users('PATIENT', patients, 2))
+    doctor_ids = list(seeded_users(domain).filter(role='DOCTOR').order_by('id').values_list('id', flat=True))
+    patient_ids = list(seeded_users(domain).filter(role='PATIENT').order_by('id').values_list('id', flat=True))
+    log(f'{len(doctor_ids)} doctors, {len(patient_ids)} patients')
+
+    write(Doctor, (
+        {
+            'user_id': user_id, 'specialty': specialty, 'experience': rng.randint(1, 35),
+            'description': SPECIALTIES[specialty],
+            'education': f'Высшее медицинское образование, {rng.choice(UNIVERSITIES)}',
+            'achievements': 'Сертификаты повышения квалификации' if rng.random() < 0.6 else '',
+            'consultation_price': rng.randrange(800, 3001, 100),
+            'available_for_online': rng.random() < 0.4,
+        }
+        for user_id, specialty in zip(doctor_ids, doctor_specialties)
+    ))
+
+    # Слоты: у каждого врача своя смена, расписание по будням без праздников
+    # Окно вокруг start_date: половина слотов до now, половина — после
+    per_doctor = max(1, slots // max(1, doctors))
+    past_count = per_doctor // 2
+    templates = []
+    for day_start, day_end, minutes in SHIFTS:
+        per_week = 5 * ((day_end.hour - day_start.hour) * 60 // minutes)
+        weeks = math.ceil(per_doctor / per_week) + 1
+        first_day = start_date - timedelta(weeks=weeks)
+        first_day -= timedelta(days=first_day.weekday())
+        intervals = expand_weekly_template(first_day, 2 * weeks + 1, set(range(5)), day_start, day_end, minutes)
+        past = [interval for interval in intervals if interval[0] < now]
+        future = [interval for interval in intervals if interval[0] >= now]
+        templates.append((past[len(past) - past_count:] if past_count else []) + future[:per_doctor - past_count])
+
+    def time_slots():
+        for doctor_id in doctor_ids:
+            for start, end in rng.choice(templates):
+                # Прошлые слоты чаще заняты, чем будущие
+                booked = rng.random() < (0.6 if start < now else 0.25)
+                yield {'doctor_id': doctor_id, 'start_time': start, 'end_time': end,
+                       'status': 'BOOKED' if booked else 'AVAILABLE'}
+
+    total_slots = write(TimeSlot, time_slots())
+    log(f'{total_slots} time slots')
+
+    # Записи: слоты читаются потоком, чтобы не держать миллионы объектов в памяти
+    slot_rows = TimeSlot.objects.filter(doctor__in=seeded_users(domain).filter(role='DOCTOR'))
+    booked_count = slot_rows.filter(status='BOOKED').count()
+    extra_per_slot = max(0, appointments - booked_count) / max(1, total_slots)
+
+    def appointment_rows():
+        created = 0
+        rows = slot_rows.order_by('id').values_list('id', 'doctor_id', 'start_time', 'status').iterator(batch_size)
+        for slot_id, doctor_id, start, status in rows:
+            statuses = ['CANCELED'] * (int(extra_per_slot) + (rng.random() < extra_per_slot % 1))
+            if status == 'BOOKED':
+                statuses.append('SCHEDULED' if start >= now else 'COMPLETED')
+            for appointment_status in statuses:
+                if created >= appointments:
+                    return
+                created += 1
+                yield {'doctor_id': doctor_id, 'patient_id': rng.choice(patient_ids), 'time_slot_id': slot_id,
+                       'status': appointment_status, 'reason': rng.choice(REASONS)}
+
+    log(f'{write(Appointment, appointment_rows())} appointments')
+
+    def analysis_rows():
+        for _ in range(analyses):
+            added = now - timedelta(days=rng.randint(0, 365), minutes=rng.randint(0, 600))
+            ready = rng.random() < 0.7
+            yield {'patient_id': rng.choice(patient_ids), 'doctor_id': rng.choice(doctor_ids),
+                   'name': rng.choice(ANALYSES), 'status': 'READY' if ready else 'PENDING',
+                   'date_added': added, 'date_completed': added + timedelta(days=rng.randint(1, 3)) if ready else None}
+
+    def record_rows():
+        for _ in range(records):
+            diagnosis, prescription = rng.choice(DIAGNOSES)
+            yield {'patient_id': rng.choice(patient_ids), 'doctor_id': rng.choice(doctor_ids),
+                   'diagnosis': diagnosis, 'prescription': prescription,
+                   'created_at': now - timedelta(days=rng.randint(0, 3 * 365))}
+
+    log(f'{write(Analysis, analysis_rows())} analyses')
+    log(f'{write(MedicalRecord, record_rows())} medical records')
+    return counts
@@ -1,5 +1,13 @@
+from datetime import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils import timezone
 from rest_framework import serializers
-from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor
+from rest_framework.reverse import reverse
+from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor, UploadSession
+from .photos import FORMATS, variants_current
+from .scheduling import parse_weekdays
 
 class UserSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True)
@@ -41,6 +49,7 @@ class TimeSlotSerializer(serializers.ModelSerializer):
     class Meta:
         model = TimeSlot
         fields = ['id', 'doctor', 'doctor_details', 'start_time', 'end_time', 'status']
+        select_related = ['doctor']
 
     def validate(self, data):
         if data['start_time'] >= data['end_time']:
@@ -54,6 +63,7 @@ class AppointmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = Appointment
         fields = ['id', 'doctor', 'patient', 'time_slot', 'status', 'reason']
+        select_related = ['doctor', 'patient', 'time_slot']
 
 class MedicalRecordSerializer(serializers.ModelSerializer):
     patient = UserSerializer(read_only=True)
@@ -61,6 +71,7 @@ class MedicalRecordSerializer(serializers.ModelSerializer):
     class Meta:
         model = MedicalRecord
         fields = ['id', 'patient', 'doctor', 'diagnosis', 'prescription', 'test_result', 'created_at']
+        select_related = ['patient', 'doctor']
 
 class AnalysisSerializer(serializers.ModelSerializer):
     patient = UserSerializer(read_only=True)
@@ -73,13 +84,14 @@ class AnalysisSerializer(serializers.ModelSerializer):
         fields = ['id', 'patient', 'doctor', 'name', 'description', 'status', 'status_display', 
                  'result_file', 'result_file_url', 'date_added', 'date_completed']
         read_only_fields = ['patient', 'doctor', 'date_added', 'date_completed']
+        # Прямой /media/ адрес не отдаём: файл результата — только через download
+        extra_kwargs = {'result_file': {'write_only': True}}
+        select_related = ['patient', 'doctor']
 
     def get_result_file_url(self, obj):
+        # Файл отдаётся только через действие download с проверкой доступа
         if obj.result_file:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.result_file.url)
-            return obj.result_file.url
+            return reverse('analysis-download', args=[obj.pk], request=self.context.get('request'))
         return None
 
     def validate(self, data):
@@ -92,16 +104,18 @@ class DoctorSerializer(serializers.ModelSerializer):
     last_name = serializers.CharField(source='user.last_name')
     email = serializers.EmailField(source='user.email', read_only=True)
     photo_url = serializers.SerializerMethodField()
+    photo_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = Doctor
         fields = [
             'id', 'first_name', 'last_name', 'email', 'specialty',
-            'experience', 'description', 'photo', 'photo_url',
+            'experience', 'description', 'photo', 'photo_url', 'photo_variants',
             'education', 'achievements', 'consultation_price',
             'available_for_online'
         ]
         read_only_fields = ['id', 'email']
+        select_related = ['user']
 
     def get_photo_url(self, obj):
         if obj.photo:
@@ -109,4 +123,91 @@ class DoctorSerializer(serializers.ModelSerializer):
             if request:
                 return request.build_absolute_uri(obj.photo.url)
             return obj.photo.url
-        return None
\ No newline at end of file
+        return None
+
+    def get_photo_variants(self, obj):
+        # Пока копии нового фото не готовы, клиент показывает photo_url
+        if not variants_current(obj):
+            return {}
+        request = self.context.get('request')
+        result = {}
+        for variant, files in obj.photo_variants.items():
+            result[variant] = {'width': files['width'], 'height': files['height']}
+            for fmt in FORMATS:
+                url = default_storage.url(files[fmt])
+                result[variant][fmt] = request.build_absolute_uri(url) if request else url
+        return result
+
+class ScheduleTemplateSerializer(serializers.Serializer):
+    start_date = serializers.DateField(required=False)
+    weeks = serializers.IntegerField(min_value=1, max_value=52, default=12)
+    weekdays = serializers.CharField(default='mon-fri')
+    day_start = serializers.TimeField(default=time(9, 0))
+    day_end = serializers.TimeField(default=time(17, 0))
+    slot_minutes = serializers.IntegerField(min_value=5, max_value=240, default=30)
+    skip_holidays = serializers.BooleanField(default=True)
+    skip_dates = serializers.ListField(child=serializers.DateField(), default=list)
+
+    def validate_weekdays(self, value):
+        try:
+            days = parse_weekdays(value)
+        except ValueError:
+            raise serializers.ValidationError("Use day names like 'mon-fri' or 'mon,wed,fri'.")
+        if not days:
+            raise serializers.ValidationError("At least one weekday is required.")
+        return days
+
+    def validate(self, data):
+        if data['day_start'] >= data['day_end']:
+            raise serializers.ValidationError("day_end must be after day_start")
+        data.setdefault('start_date', timezone.localdate())
+        return data
+
+
+class NextAvailableQuerySerializer(serializers.Serializer):
+    specialty = serializers.CharField(required=False)
+    online = serializers.BooleanField(required=False, allow_null=True, default=None)
+    after = serializers.DateTimeField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+    per_doctor = serializers.IntegerField(min_value=1, required=False)
+    max_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    min_experience = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, data):
+        if not data.get('specialty') and not data.get('online'):
+            raise serializers.ValidationError("Pass specialty or online=true.")
+        return data
+
+
+class AvailableSlotSerializer(serializers.ModelSerializer):
+    doctor = DoctorSerializer(source='doctor.doctor_profile', read_only=True)
+
+    class Meta:
+        model = TimeSlot
+        fields = ['id', 'doctor', 'start_time', 'end_time', 'status']
+        select_related = ['doctor__doctor_profile']
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'purpose', 'target_id', 'filename', 'size', 'sha256', 'received', 'status',
+                  'chunk_size', 'created_at']
+        read_only_fields = ['received', 'status', 'created_at']
+
+    def get_chunk_size(self, obj):
+        return settings.CHUNKED_UPLOAD_CHUNK_SIZE
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Size must be positive")
+        if value > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"File is larger than {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes")
+        return value
+
+    def validate_sha256(self, value):
+        if value and (len(value) != 64 or any(c not in '0123456789abcdef' for c in value.lower())):
+            raise serializers.ValidationError("Expected a hex SHA-256 digest")
+        return value.lower()
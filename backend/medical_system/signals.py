@@ -0,0 +1,99 @@
+from django.core.signals import request_started, request_finished
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+
+from . import db_stats
+from .caching import invalidate_directory, invalidate_cached_user
+from .models import User, Doctor, TimeSlot
+from .photos import schedule_photo_variants, variants_current
+from .profiles import apply_doctor_sync, plan_doctor_sync
+from .slot_events import publish_slots
+
+
+def directory_changed():
+    # Второй раз — после коммита, чтобы не закэшировать данные, прочитанные до него
+    invalidate_directory()
+    transaction.on_commit(invalidate_directory)
+
+
+@receiver([post_save, post_delete], sender=Doctor)
+def doctor_changed(sender, instance, **kwargs):
+    directory_changed()
+
+
+@receiver(post_save, sender=Doctor)
+def build_photo_variants(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Копии делаются после коммита в фоне; сохранение их карты сюда не возвращается,
+    # потому что копии уже соответствуют фото
+    if raw or not instance.photo:
+        return
+    if update_fields is not None and 'photo' not in update_fields:
+        return
+    if not variants_current(instance):
+        schedule_photo_variants(instance)
+
+
+# Поля пользователя, которые видны в справочнике врачей
+DIRECTORY_USER_FIELDS = {'first_name', 'last_name', 'email', 'role'}
+
+
+@receiver(post_init, sender=User)
+def remember_role(sender, instance, **kwargs):
+    # Роль при загрузке: при смене DOCTOR на другую врача надо убрать из справочника.
+    # Через __dict__, чтобы отложенное поле не вызывало запрос
+    instance._loaded_role = instance.__dict__.get('role')
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
+    loaded_role, instance._loaded_role = instance._loaded_role, instance.role
+    if update_fields is not None and not DIRECTORY_USER_FIELDS & set(update_fields):
+        return
+    # В справочнике есть имя и email врача: сбрасываем, если пользователь врач,
+    # был им до сохранения или у него остался профиль
+    if 'DOCTOR' in (instance.role, loaded_role) or Doctor.objects.filter(user_id=user_id).exists():
+        directory_changed()
+
+
+@receiver(post_save, sender=User)
+def sync_doctor_profile(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Профиль зависит только от роли и специальности: сохранения вроде
+    # last_login при входе не стоят лишних запросов
+    if raw or instance.role != 'DOCTOR':
+        return
+    if update_fields is not None and not {'role', 'specialty'} & set(update_fields):
+        return
+    plan = plan_doctor_sync(user_ids=[instance.pk])
+    if plan:
+        apply_doctor_sync(plan)
+
+
+@receiver(post_save, sender=TimeSlot)
+def slot_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        publish_slots([instance])
+
+
+@receiver(post_delete, sender=TimeSlot)
+def slot_deleted(sender, instance, **kwargs):
+    publish_slots([instance], status='DELETED')
+
+
+@receiver(connection_created)
+def database_connection_created(sender, connection, **kwargs):
+    db_stats.connection_opened(connection)
+
+
+@receiver(request_started)
+def count_request_started(sender, **kwargs):
+    db_stats.request_started()
+
+
+@receiver(request_finished)
+def count_request_finished(sender, **kwargs):
+    db_stats.request_finished()
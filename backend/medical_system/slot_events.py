@@ -0,0 +1,119 @@
+"""
+Изменения слотов в реальном времени: канал на врача и день, а также
+общий канал врача (день None) для страниц со слотами за несколько дней.
+
+Брокер живёт в памяти процесса: публикация идёт из синхронного кода (после
+коммита), подписчики — async-генераторы SSE-ответов в event loop ASGI.
+Каждый процесс раздаёт события только своим подписчикам, поэтому при
+нескольких процессах клиент увидит изменения, сделанные в своём процессе,
+а остальные — при переподключении (снимок дня отправляется заново).
+"""
+import asyncio
+import itertools
+import json
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+OVERFLOW = object()
+
+
+def channels_for(doctor_id, start_time):
+    return (doctor_id, timezone.localdate(start_time)), (doctor_id, None)
+
+
+def slot_payload(slot, status=None):
+    return {
+        'id': slot.pk,
+        'doctor': slot.doctor_id,
+        'start_time': slot.start_time,
+        'end_time': slot.end_time,
+        'status': status or slot.status,
+    }
+
+
+class Subscription:
+    def __init__(self, channel, loop, max_queue):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def push(self, event):
+        # Выполняется в потоке event loop. Медленный клиент не копит
+        # события без предела: очередь сбрасывается, клиент получает снимок заново
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = OVERFLOW
+        self.queue.put_nowait(event)
+
+
+class SlotBroker:
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+
+    def subscribe(self, doctor_id, day):
+        subscription = Subscription((doctor_id, day), asyncio.get_running_loop(), self.max_queue)
+        with self.lock:
+            self.subscribers.setdefault(subscription.channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            channel = self.subscribers.get(subscription.channel)
+            if channel is not None:
+                channel.discard(subscription)
+                if not channel:
+                    del self.subscribers[subscription.channel]
+
+    def subscriber_count(self):
+        with self.lock:
+            return sum(len(channel) for channel in self.subscribers.values())
+
+    def publish(self, payload):
+        """Отправляет изменение слота подписчикам его врача и дня; безопасно из любого потока."""
+        with self.lock:
+            subscribers = [
+                subscription
+                for channel in channels_for(payload['doctor'], payload['start_time'])
+                for subscription in self.subscribers.get(channel, ())
+            ]
+        if not subscribers:
+            return 0
+        event = (next(self.ids), payload)
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, event)
+            except RuntimeError:
+                # Event loop подписчика уже закрыт
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+
+broker = SlotBroker()
+
+
+def publish_slots(slots, status=None):
+    """Публикует изменения слотов после коммита текущей транзакции (или сразу вне неё)."""
+    payloads = [slot_payload(slot, status) for slot in slots if slot.pk is not None]
+
+    def send():
+        for payload in payloads:
+            broker.publish(payload)
+
+    if payloads:
+        transaction.on_commit(send)
+
+
+def format_event(event, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)}')
+    return ('\n'.join(lines) + '\n\n').encode()
@@ -1,3 +1,1663 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time as clock
+import uuid
+from unittest import mock
+from io import BytesIO, StringIO
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from asgiref.sync import async_to_sync, sync_to_async
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from PIL import Image
+
+from .authentication import tokens_for_user
+from .blobs import blob_name
+from .benchmark import Workload, compare_to_baseline, flush_dataset, generate_dataset, percentile
+from .checks import check_replica_pin_cache
+from .booking import book_time_slot, SlotUnavailable
+from .login import TokenBucket, client_ip, login_limiter
+from .serializers import AnalysisSerializer, AppointmentSerializer
+from .views import DoctorViewSet, UserViewSet
+from .models import (
+    User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor, IdempotencyKey, OutboxEmail, UploadSession,
+)
+from .metrics import registry
+from .outbox import claim_batch, enqueue_email, deliver_pending, record_result
+from .read_serializers import AnalysisReadSerializer, AppointmentReadSerializer, ValuesSerializer
+from .renderers import FastJSONRenderer
+from .photos import PHOTO_VARIANTS, generate_photo_variants, photo_executor, variants_current
+from .routers import ReadReplicaMiddleware, ReadReplicaRouter, current_read_alias, read_from
+from .scheduling import expand_weekly_template, parse_weekdays
+from .seeding import RowWriter, copy_value, flush_seeded, seed_database
+from .slot_events import OVERFLOW, broker
+from .uploads import ChunkError, clean_expired_uploads, temp_path, write_chunk
+
+
+def make_user(email, role='PATIENT', password=None, **extra):
+    return User.objects.create_user(
+        email=email,
+        password=password,
+        first_name=email.split('@')[0],
+        last_name='Test',
+        role=role,
+        **extra,
+    )
+
+
+class ListQueryCountTests(TestCase):
+    """Каждый список должен выполняться за постоянное число запросов."""
+
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg')
+        self.created = 0
+
+    def add_rows(self, count):
+        now = timezone.now()
+        for _ in range(count):
+            self.created += 1
+            other_doctor = make_user(f'doctor{self.created}@keremet.kg', role='DOCTOR', specialty='SURGEON')
+            make_profile(other_doctor, specialty='SURGEON')
+            for doctor in (self.doctor, other_doctor):
+                for offset in (timedelta(days=self.created), -timedelta(days=self.created)):
+                    slot = TimeSlot.objects.create(
+                        doctor=doctor,
+                        start_time=now + offset,
+                        end_time=now + offset + timedelta(minutes=30),
+                        status='BOOKED',
+                    )
+                    Appointment.objects.create(
+                        doctor=doctor, patient=self.patient, time_slot=slot, status='SCHEDULED'
+                    )
+            MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, diagnosis='ОРВИ')
+            Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='Общий анализ крови')
+
+    def count_queries(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def assertConstantQueries(self, user, url):
+        self.add_rows(1)
+        small = self.count_queries(user, url)
+        self.add_rows(4)
+        large = self.count_queries(user, url)
+        self.assertEqual(small, large, f'{url}: {small} queries for 1 row, {large} for 5 rows')
+
+    def test_doctors(self):
+        self.assertConstantQueries(self.patient, '/api/doctors/')
+
+    def test_time_slots(self):
+        self.assertConstantQueries(self.doctor, '/api/time-slots/')
+
+    def test_doctor_time_slots(self):
+        self.assertConstantQueries(self.doctor, '/api/doctor/time-slots/')
+
+    def test_appointments_for_patient(self):
+        self.assertConstantQueries(self.patient, '/api/appointments/')
+
+    def test_appointments_for_doctor(self):
+        self.assertConstantQueries(self.doctor, '/api/doctor/appointments/')
+
+    def test_medical_records(self):
+        self.assertConstantQueries(self.patient, '/api/medical-records/')
+
+    def test_analyses(self):
+        self.assertConstantQueries(self.doctor, '/api/analyses/')
+
+    def test_patient_dashboard(self):
+        self.assertConstantQueries(self.patient, '/api/patient/dashboard/appointments/upcoming/')
+        self.assertConstantQueries(self.patient, '/api/patient/dashboard/appointments/history/')
+
+    def test_doctor_dashboard(self):
+        self.assertConstantQueries(self.doctor, '/api/doctor/dashboard/appointments/upcoming/')
+        self.assertConstantQueries(self.doctor, '/api/doctor/dashboard/appointments/history/')
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        start = timezone.now() - timedelta(days=30)
+        for i in range(7):
+            slot = TimeSlot.objects.create(
+                doctor=self.doctor,
+                start_time=start + timedelta(hours=i),
+                end_time=start + timedelta(hours=i, minutes=30),
+                status='BOOKED',
+            )
+            Appointment.objects.create(
+                doctor=self.doctor, patient=self.patient, time_slot=slot, status='COMPLETED'
+            )
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_history_pages_cover_all_rows_in_order(self):
+        ids = self.walk('/api/patient/dashboard/appointments/history/?page_size=3')
+        expected = list(
+            Appointment.objects.order_by('-time_slot__start_time').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_page_size_query_param(self):
+        response = self.client.get('/api/appointments/?page_size=100000')
+        self.assertEqual(len(response.data['results']), 7)
+        response = self.client.get('/api/appointments/?page_size=2')
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertIsNotNone(response.data['next'])
+
+
+def make_profile(user, **fields):
+    # Профиль врача создаётся сигналом при сохранении User, здесь только заполняем поля
+    profile = Doctor.objects.get(user=user)
+    for field, value in fields.items():
+        setattr(profile, field, value)
+    profile.save()
+    return profile
+
+
+def make_slot(doctor, start=None, status='AVAILABLE'):
+    start = start or timezone.now() + timedelta(days=1)
+    return TimeSlot.objects.create(
+        doctor=doctor, start_time=start, end_time=start + timedelta(minutes=30), status=status
+    )
+
+
+class BookingTests(TestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg')
+        self.slot = make_slot(self.doctor)
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+
+    def test_booked_slot_is_rejected_without_creating_appointment(self):
+        response = self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_idempotency_key_replays_response(self):
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'booking-1'}
+        first = self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'}, **headers)
+        second = self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'}, **headers)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_idempotency_key_reused_with_other_payload(self):
+        other = make_slot(self.doctor, start=timezone.now() + timedelta(days=2))
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'booking-1'}
+        self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'}, **headers)
+        response = self.client.post('/api/appointments/', {'time_slot': other.pk, 'status': 'SCHEDULED'}, **headers)
+        self.assertEqual(response.status_code, 422)
+
+    def test_idempotency_keys_expire(self):
+        other = make_slot(self.doctor, start=timezone.now() + timedelta(days=2))
+        headers = {'HTTP_IDEMPOTENCY_KEY': 'booking-1'}
+        self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'}, **headers)
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        # Истёкший ключ не повторяет старый ответ, а обрабатывает запрос заново
+        response = self.client.post('/api/appointments/', {'time_slot': other.pk, 'status': 'SCHEDULED'}, **headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['time_slot'], other.pk)
+        self.assertEqual(IdempotencyKey.objects.count(), 1)
+
+        IdempotencyKey.objects.update(created_at=timezone.now() - timedelta(hours=25))
+        IdempotencyKey.objects.create(user=self.patient, key='booking-2', request_fingerprint='x')
+        out = StringIO()
+        call_command('clean_idempotency_keys', stdout=out)
+        self.assertIn('Deleted 1 idempotency keys', out.getvalue())
+        self.assertEqual(list(IdempotencyKey.objects.values_list('key', flat=True)), ['booking-2'])
+
+    def test_cancel_frees_slot_once(self):
+        appointment = book_time_slot(self.patient, self.slot.pk)
+        url = f'/api/appointments/{appointment.pk}/cancel/'
+        self.assertEqual(self.client.patch(url).status_code, 200)
+        self.assertEqual(self.client.patch(url).status_code, 400)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'AVAILABLE')
+
+    def test_booking_queues_email_instead_of_sending(self):
+        self.client.post('/api/appointments/', {'time_slot': self.slot.pk, 'status': 'SCHEDULED'})
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().recipients, [self.patient.email])
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    threads = 12
+
+    def test_one_slot_is_booked_exactly_once(self):
+        doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        patients = [make_user(f'patient{i}@keremet.kg') for i in range(self.threads)]
+        slot = make_slot(doctor)
+        barrier = threading.Barrier(self.threads)
+        results = []
+
+        def attempt(patient):
+            try:
+                barrier.wait()
+                try:
+                    book_time_slot(patient, slot.pk)
+                    results.append('booked')
+                except SlotUnavailable:
+                    results.append('unavailable')
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=attempt, args=(patient,)) for patient in patients]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(results.count('booked'), 1)
+        self.assertEqual(results.count('unavailable'), self.threads - 1)
+        self.assertEqual(Appointment.objects.filter(time_slot=slot).count(), 1)
+
+
+class RejectingBackend(LocmemBackend):
+    def send_messages(self, messages):
+        if any('bounce@keremet.kg' in message.to for message in messages):
+            raise ConnectionError('mailbox unavailable')
+        return super().send_messages(messages)
+
+
+class PartialBackend(LocmemBackend):
+    # Как SMTP: письма уходят по одному, ошибка обрывает пачку на середине
+    def send_messages(self, messages):
+        for message in messages:
+            if 'bounce@keremet.kg' in message.to:
+                raise ConnectionError('mailbox unavailable')
+            super().send_messages([message])
+        return len(messages)
+
+
+class OutboxTests(TestCase):
+    def test_worker_sends_batch(self):
+        for i in range(3):
+            enqueue_email('Subject', 'Body', [f'patient{i}@keremet.kg'])
+        call_command('send_outbox', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(OutboxEmail.objects.filter(status='SENT').count(), 3)
+
+    @override_settings(
+        EMAIL_BACKEND='medical_system.tests.RejectingBackend',
+        EMAIL_OUTBOX_MAX_ATTEMPTS=2,
+    )
+    def test_failed_email_is_retried_with_backoff_then_given_up(self):
+        enqueue_email('Subject', 'Body', ['patient@keremet.kg'])
+        bad = enqueue_email('Subject', 'Body', ['bounce@keremet.kg'])
+        self.assertEqual(deliver_pending(), (1, 1))
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.attempts), ('QUEUED', 1))
+        self.assertGreater(bad.next_attempt_at, timezone.now())
+        self.assertEqual(deliver_pending(), (0, 0))
+
+        OutboxEmail.objects.filter(pk=bad.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), (0, 1))
+        bad.refresh_from_db()
+        self.assertEqual(bad.status, 'FAILED')
+        self.assertIn('mailbox unavailable', bad.last_error)
+
+    @override_settings(EMAIL_BACKEND='medical_system.tests.PartialBackend')
+    def test_failure_mid_batch_does_not_resend_delivered(self):
+        enqueue_email('Subject', 'Body', ['first@keremet.kg'])
+        enqueue_email('Subject', 'Body', ['bounce@keremet.kg'])
+        enqueue_email('Subject', 'Body', ['last@keremet.kg'])
+        self.assertEqual(deliver_pending(), (2, 1))
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['first@keremet.kg', 'last@keremet.kg'])
+        OutboxEmail.objects.filter(status='QUEUED').update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), (0, 1))
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_claimed_emails_are_taken_again_after_lease(self):
+        email = enqueue_email('Subject', 'Body', ['patient@keremet.kg'])
+        self.assertEqual(claim_batch(10), [email])
+        # Воркер упал, не записав результат: до конца аренды письмо не берётся
+        self.assertEqual(deliver_pending(), (0, 0))
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_expired_lease_does_not_overwrite_new_attempt(self):
+        email = enqueue_email('Subject', 'Body', ['bounce@keremet.kg'])
+        [stale] = claim_batch(10)
+        # Аренда истекла, письмо взял и отправил другой воркер
+        OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+        [current] = claim_batch(10)
+        self.assertTrue(record_result(current, None, max_attempts=5))
+        self.assertFalse(record_result(stale, 'mailbox unavailable', max_attempts=5))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts, email.last_error), ('SENT', 1, ''))
+
+        # Новый воркер ещё отправляет — старый тоже не пишет поверх
+        second = enqueue_email('Subject', 'Body', ['patient@keremet.kg'])
+        [stale] = claim_batch(10)
+        OutboxEmail.objects.filter(pk=second.pk).update(next_attempt_at=timezone.now())
+        claim_batch(10)
+        self.assertFalse(record_result(stale, None, max_attempts=5))
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.attempts), ('SENDING', 0))
+
+
+class ExplainQueriesCommandTests(TestCase):
+    def test_explains_every_target(self):
+        make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        make_user('patient@keremet.kg')
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        self.assertIn('doctor dashboard history', out.getvalue())
+
+
+class SlotFilterTests(TestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.profile = make_profile(self.doctor, specialty='THERAPIST')
+        self.other = make_user('surgeon@keremet.kg', role='DOCTOR', specialty='SURGEON')
+        make_profile(self.other, specialty='SURGEON')
+        self.patient = make_user('patient@keremet.kg')
+        self.day = timezone.now().replace(hour=10, minute=0, second=0, microsecond=0) + timedelta(days=3)
+        for doctor in (self.doctor, self.other):
+            make_slot(doctor, start=self.day)
+            make_slot(doctor, start=self.day + timedelta(days=1))
+        self.client = APIClient()
+
+    def slot_ids(self, user, url):
+        self.client.force_authenticate(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data]
+
+    def test_date_filter(self):
+        ids = self.slot_ids(self.doctor, f'/api/doctor/time-slots/?date={self.day.date().isoformat()}')
+        self.assertEqual(ids, list(TimeSlot.objects.filter(doctor=self.doctor, start_time=self.day).values_list('id', flat=True)))
+
+    def test_doctor_profile_and_specialty_filters(self):
+        by_doctor = self.slot_ids(self.patient, f'/api/doctor/time-slots/?doctor={self.profile.pk}')
+        by_specialty = self.slot_ids(self.patient, '/api/doctor/time-slots/?specialty=THERAPIST')
+        expected = list(TimeSlot.objects.filter(doctor=self.doctor).order_by('start_time').values_list('id', flat=True))
+        self.assertEqual(by_doctor, expected)
+        self.assertEqual(by_specialty, expected)
+
+    def test_appointment_date_filter(self):
+        slot = TimeSlot.objects.get(doctor=self.doctor, start_time=self.day)
+        appointment = book_time_slot(self.patient, slot.pk)
+        book_time_slot(self.patient, TimeSlot.objects.get(doctor=self.doctor, start_time__gt=self.day).pk)
+        self.client.force_authenticate(self.doctor)
+        response = self.client.get(f'/api/doctor/appointments/?date={self.day.date().isoformat()}')
+        self.assertEqual([row['id'] for row in response.data['results']], [appointment.pk])
+
+
+class ScheduleGeneratorTests(TestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def test_expand_skips_weekends_and_holidays(self):
+        # 2025-03-17 — понедельник, 2025-03-21 (пятница) — Нооруз
+        intervals = expand_weekly_template(
+            date(2025, 3, 17), 1, parse_weekdays('mon-fri'), time(9, 0), time(11, 0), 30
+        )
+        days = sorted({start.date() for start, _ in intervals})
+        self.assertEqual(days, [date(2025, 3, 17), date(2025, 3, 18), date(2025, 3, 19), date(2025, 3, 20)])
+        self.assertEqual(len(intervals), 4 * 4)
+
+    def test_generate_endpoint_skips_overlaps(self):
+        tz = timezone.get_current_timezone()
+        existing = timezone.make_aware(datetime(2025, 3, 17, 9, 15), tz)
+        make_slot(self.doctor, start=existing)
+        payload = {
+            'start_date': '2025-03-17', 'weeks': 1, 'weekdays': 'mon',
+            'day_start': '09:00', 'day_end': '11:00', 'slot_minutes': 30,
+        }
+        response = self.client.post('/api/doctor/time-slots/generate/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data, {'created': 2, 'skipped': 2})
+        response = self.client.post('/api/doctor/time-slots/generate/', payload, format='json')
+        self.assertEqual(response.data, {'created': 0, 'skipped': 4})
+        self.assertEqual(TimeSlot.objects.filter(doctor=self.doctor).count(), 3)
+
+    def test_command_generates_for_all_doctors(self):
+        make_user('surgeon@keremet.kg', role='DOCTOR', specialty='SURGEON')
+        call_command(
+            'generate_schedule', '--all-doctors', '--start-date', '2025-03-17', '--weeks', '2',
+            stdout=StringIO(),
+        )
+        # 2 недели по 5 дней, Нооруз 21.03 пропущен, 16 слотов в день
+        self.assertEqual(TimeSlot.objects.count(), 2 * 9 * 16)
+
+
+class NextAvailableTests(TestCase):
+    def setUp(self):
+        self.patient = make_user('patient@keremet.kg')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+        self.base = timezone.now() + timedelta(days=1)
+        self.doctors = []
+        for i, price in enumerate([3000, 6000]):
+            user = make_user(f'therapist{i}@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+            make_profile(user, specialty='THERAPIST', consultation_price=price, experience=5 + i * 10,
+                         available_for_online=False)
+            self.doctors.append(user)
+            for hour in range(3):
+                make_slot(user, start=self.base + timedelta(hours=hour, minutes=i))
+        surgeon = make_user('surgeon@keremet.kg', role='DOCTOR', specialty='SURGEON')
+        make_profile(surgeon, specialty='SURGEON', available_for_online=True)
+        make_slot(surgeon, start=self.base - timedelta(hours=1))
+
+    def get(self, query):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(f'/api/doctors/next-available/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        return response.data
+
+    def test_earliest_slots_across_specialty(self):
+        data = self.get('specialty=THERAPIST&limit=4')
+        starts = [row['start_time'] for row in data]
+        self.assertEqual(starts, sorted(starts))
+        self.assertEqual(len(data), 4)
+        self.assertEqual({row['doctor']['specialty'] for row in data}, {'THERAPIST'})
+
+    def test_per_doctor_and_price_filters(self):
+        data = self.get('specialty=THERAPIST&per_doctor=1')
+        self.assertEqual(len(data), 2)
+        data = self.get('specialty=THERAPIST&max_price=4000')
+        self.assertEqual({row['doctor']['email'] for row in data}, {'therapist0@keremet.kg'})
+        data = self.get('specialty=THERAPIST&min_experience=10')
+        self.assertEqual({row['doctor']['email'] for row in data}, {'therapist1@keremet.kg'})
+
+    def test_online_doctors(self):
+        data = self.get('online=true')
+        self.assertEqual([row['doctor']['specialty'] for row in data], ['SURGEON'])
+
+
+class DoctorDirectoryCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = make_user('patient@keremet.kg')
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.profile = make_profile(self.doctor, specialty='THERAPIST')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+
+    def test_repeat_request_is_served_from_cache(self):
+        first = self.client.get('/api/doctors/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/doctors/')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/doctors/?specialty=THERAPIST')['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/doctors/?specialty=THERAPIST', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_doctor_and_user_changes_invalidate(self):
+        etag = self.client.get('/api/doctors/')['ETag']
+        self.profile.experience = 12
+        self.profile.save()
+        response = self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['experience'], 12)
+
+        self.doctor.first_name = 'Айгуль'
+        self.doctor.save()
+        self.assertEqual(self.client.get('/api/doctors/').data[0]['first_name'], 'Айгуль')
+
+    def test_role_change_from_doctor_invalidates(self):
+        etag = self.client.get('/api/doctors/')['ETag']
+        user = User.objects.get(pk=self.doctor.pk)
+        user.role = 'PATIENT'
+        user.save()
+        self.assertEqual(self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Профиль остался: изменения имени бывшего врача тоже видны в справочнике
+        user.first_name = 'Бермет'
+        user.save()
+        self.assertEqual(self.client.get('/api/doctors/').data[0]['first_name'], 'Бермет')
+
+        # Сохранение полей вне справочника его не сбрасывает
+        etag = self.client.get('/api/doctors/')['ETag']
+        user.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/doctors/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg')
+        self.analysis = Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='Глюкоза')
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+
+    def test_unchanged_list_returns_304_before_serializing(self):
+        etag = self.client.get('/api/analyses/')['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/analyses/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_update_add_and_delete_change_the_etag(self):
+        etag = self.client.get('/api/analyses/')['ETag']
+        self.analysis.status = 'CANCELED'
+        self.analysis.save()
+        self.assertEqual(self.client.get('/api/analyses/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        etag = self.client.get('/api/analyses/')['ETag']
+        self.analysis.delete()
+        self.assertEqual(self.client.get('/api/analyses/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def get_slots(self, path, etag=None):
+        headers = {'Authorization': f'Bearer {tokens_for_user(self.patient).access_token}'}
+        if etag:
+            headers['If-None-Match'] = etag
+        if path.startswith('/api/async/'):
+            return async_to_sync(AsyncClient().get)(path, headers=headers)
+        return APIClient().get(path, headers=headers)
+
+    def test_list_etag_covers_filtered_rows_and_nested_users(self):
+        day = timezone.localdate() + timedelta(days=3)
+        start = timezone.make_aware(datetime.combine(day, time(10)))
+        make_slot(self.doctor, start=start)
+        query = f'?doctor={Doctor.objects.get(user=self.doctor).pk}&date={day.isoformat()}'
+        for path in (f'/api/time-slots/{query}', f'/api/async/time-slots/{query}'):
+            etag = self.get_slots(path)['ETag']
+            # Слот другого дня не входит в выборку и не сбрасывает ETag
+            make_slot(self.doctor, start=start + timedelta(days=1))
+            self.assertEqual(self.get_slots(path, etag).status_code, 304, path)
+            # Врач вложен в ответ: его переименование — новая версия списка
+            self.doctor.first_name = f'Айгуль {path}'
+            self.doctor.save()
+            self.assertEqual(self.get_slots(path, etag).status_code, 200, path)
+
+    def test_detail_and_me(self):
+        url = f'/api/analyses/{self.analysis.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        etag = self.client.get('/api/users/me/')['ETag']
+        self.assertEqual(self.client.get('/api/users/me/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.patient.phone = '+996555000111'
+        self.patient.save()
+        self.assertEqual(self.client.get('/api/users/me/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class DashboardSummaryTests(TestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg')
+        self.client = APIClient()
+
+    def add_rows(self, count):
+        now = timezone.now()
+        for i in range(count):
+            doctor = make_user(f'doctor{TimeSlot.objects.count()}@keremet.kg', role='DOCTOR', specialty='SURGEON')
+            for doc in (doctor, self.doctor):
+                for offset in (timedelta(days=i + 1), -timedelta(days=i + 1)):
+                    slot = make_slot(doc, start=now + offset, status='BOOKED')
+                    Appointment.objects.create(doctor=doc, patient=self.patient, time_slot=slot, status='SCHEDULED')
+                make_slot(doc, start=now + timedelta(days=i + 1, hours=2))
+            MedicalRecord.objects.create(patient=self.patient, doctor=doctor, diagnosis='ОРВИ')
+            Analysis.objects.create(patient=self.patient, doctor=doctor, name='Общий анализ крови')
+
+    def get(self, user, url):
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(ctx.captured_queries)
+
+    def test_patient_dashboard_sections_share_one_user_query(self):
+        self.add_rows(1)
+        _, small = self.get(self.patient, '/api/patient/dashboard/?limit=3')
+        self.add_rows(4)
+        data, large = self.get(self.patient, '/api/patient/dashboard/?limit=3')
+        self.assertEqual(small, large)
+        # 4 раздела + один общий запрос пользователей
+        self.assertEqual(large, 5)
+        self.assertEqual(data['user']['email'], self.patient.email)
+        self.assertEqual(len(data['analyses']['results']), 3)
+        self.assertEqual(len(data['medical_records']['results']), 3)
+        self.assertIn('/api/patient/dashboard/appointments/upcoming/', data['upcoming']['next'])
+
+        rest = self.client.get(data['analyses']['next']).data
+        self.assertEqual(len(rest['results']), 2)
+
+    def test_doctor_dashboard_schedule_and_patients(self):
+        self.add_rows(2)
+        data, _ = self.get(self.doctor, '/api/doctor/dashboard/')
+        self.assertEqual(len(data['schedule']['results']), 4)
+        self.assertEqual([row['id'] for row in data['patients']['results']], [self.patient.pk])
+        patients, _ = self.get(self.doctor, '/api/doctor/dashboard/patients/')
+        self.assertEqual([row['id'] for row in patients['results']], [self.patient.pk])
+
+    def test_placeholder_sections_return_real_data(self):
+        self.add_rows(2)
+        analyses, _ = self.get(self.patient, '/api/patient/dashboard/analyses/')
+        records, _ = self.get(self.patient, '/api/patient/dashboard/medical-record/')
+        schedule, _ = self.get(self.doctor, '/api/doctor/dashboard/schedule/')
+        self.assertEqual(len(analyses['results']), 2)
+        self.assertEqual(len(records['results']), 2)
+        self.assertEqual(len(schedule['results']), 4)
+
+
+class CachedAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.patient = make_user('patient@keremet.kg', password='pass12345')
+        self.client = APIClient()
+        token = tokens_for_user(self.patient).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_authenticated_reads_skip_user_query(self):
+        self.client.get('/api/users/me/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+        self.assertEqual(response.data['email'], self.patient.email)
+
+    def test_user_save_invalidates_cache(self):
+        self.client.get('/api/users/me/')
+        self.patient.phone = '+996700000001'
+        self.patient.save()
+        self.assertEqual(self.client.get('/api/users/me/').data['phone'], '+996700000001')
+
+    def test_profile_update_keeps_password(self):
+        self.client.get('/api/users/me/')
+        response = self.client.put('/api/users/me/', {'phone': '+996700000002'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.patient.refresh_from_db()
+        self.assertEqual(self.patient.phone, '+996700000002')
+        self.assertTrue(self.patient.check_password('pass12345'))
+
+    def test_inactive_user_is_rejected(self):
+        self.patient.is_active = False
+        self.patient.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+
+class LoginTests(TestCase):
+    def setUp(self):
+        login_limiter.reset()
+        self.patient = make_user('patient@keremet.kg', password='pass12345')
+        self.client = APIClient()
+
+    def test_login_uses_single_user_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                '/api/auth/login/', {'email': 'patient@keremet.kg', 'password': 'pass12345'}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['user_id'], self.patient.pk)
+        self.assertEqual(response.data['user_role'], 'PATIENT')
+        self.assertIn('access', response.data)
+
+    def test_unknown_email_and_wrong_password(self):
+        response = self.client.post('/api/auth/login/', {'email': 'nobody@keremet.kg', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post('/api/auth/login/', {'email': 'patient@keremet.kg', 'password': 'x'}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(LOGIN_RATE_LIMIT_ENABLED=True)
+    def test_rate_limit_per_email(self):
+        payload = {'email': 'patient@keremet.kg', 'password': 'wrong'}
+        codes = [self.client.post('/api/auth/login/', payload, format='json').status_code for _ in range(11)]
+        self.assertEqual(codes[:10], [401] * 10)
+        self.assertEqual(codes[10], 429)
+
+    def test_client_ip_ignores_forwarded_for_without_trusted_proxy(self):
+        factory = RequestFactory()
+        request = factory.post('/', HTTP_X_FORWARDED_FOR='1.2.3.4', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(client_ip(request), '10.0.0.1')
+        # За одним прокси берётся адрес, который он дописал, а не подставленный клиентом
+        request = factory.post('/', HTTP_X_FORWARDED_FOR='1.2.3.4, 5.6.7.8', REMOTE_ADDR='10.0.0.1')
+        with override_settings(TRUSTED_PROXY_COUNT=1):
+            self.assertEqual(client_ip(request), '5.6.7.8')
+        with override_settings(TRUSTED_PROXY_COUNT=3):
+            self.assertEqual(client_ip(request), '10.0.0.1')
+
+    def test_token_bucket_refills(self):
+        bucket = TokenBucket(capacity=2, refill_rate=1000)
+        self.assertEqual(bucket.consume('a'), 0)
+        self.assertEqual(bucket.consume('a'), 0)
+        clock.sleep(0.01)
+        self.assertEqual(bucket.consume('a'), 0)
+
+        slow = TokenBucket(capacity=1, refill_rate=0.1)
+        self.assertEqual(slow.consume('ip'), 0)
+        self.assertAlmostEqual(slow.consume('email', 'ip'), 10, delta=0.1)
+        # Отказ по одному ключу не списывает жетон с другого
+        self.assertEqual(slow.consume('email'), 0)
+
+
+class AsyncLoginTests(TransactionTestCase):
+    def setUp(self):
+        login_limiter.reset()
+        make_user('patient@keremet.kg', password='pass12345')
+
+    async def test_async_login(self):
+        client = AsyncClient()
+        response = await client.post(
+            '/api/auth/login/async/',
+            json.dumps({'email': 'patient@keremet.kg', 'password': 'pass12345'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user_role'], 'PATIENT')
+        response = await client.post(
+            '/api/auth/login/async/',
+            json.dumps({'email': 'patient@keremet.kg', 'password': 'nope'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 401)
+
+
+class AsyncReadEndpointTests(TestCase):
+    """Async-эндпоинты отдают то же, что синхронные."""
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.profile = make_profile(self.doctor, specialty='THERAPIST', experience=7)
+        self.patient = make_user('patient@keremet.kg')
+        now = timezone.now()
+        slot = make_slot(self.doctor, start=now + timedelta(days=1), status='BOOKED')
+        Appointment.objects.create(doctor=self.doctor, patient=self.patient, time_slot=slot, status='SCHEDULED')
+        make_slot(self.doctor, start=now + timedelta(days=1, hours=2))
+        make_slot(self.doctor, start=now + timedelta(days=2))
+        Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='Глюкоза')
+        MedicalRecord.objects.create(patient=self.patient, doctor=self.doctor, diagnosis='ОРВИ')
+
+    def auth(self, user):
+        return f'Bearer {tokens_for_user(user).access_token}'
+
+    def get_both(self, user, path):
+        sync = APIClient().get(f'/api/{path}', HTTP_AUTHORIZATION=self.auth(user))
+        response = async_to_sync(AsyncClient().get)(f'/api/async/{path}', headers={'Authorization': self.auth(user)})
+        self.assertEqual(sync.status_code, 200)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), sync.json())
+        return response
+
+    def test_responses_match_sync_endpoints(self):
+        day = (timezone.localdate() + timedelta(days=2)).isoformat()
+        self.get_both(self.patient, 'users/me/')
+        self.get_both(self.patient, 'doctors/')
+        self.get_both(self.patient, 'doctors/?specialty=THERAPIST')
+        self.get_both(self.patient, 'time-slots/')
+        self.get_both(self.patient, f'time-slots/?doctor={self.profile.pk}&date={day}')
+        self.get_both(self.doctor, 'time-slots/?status=BOOKED')
+        data = self.get_both(self.patient, 'patient/dashboard/?limit=1').json()
+        self.assertEqual(len(data['analyses']['results']), 1)
+        self.get_both(self.doctor, 'doctor/dashboard/')
+
+    def test_auth_roles_and_filter_errors(self):
+        client = AsyncClient()
+        get = async_to_sync(client.get)
+        response = get('/api/async/users/me/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+        self.assertEqual(get('/api/async/users/me/', headers={'Authorization': 'Bearer nope'}).status_code, 401)
+        headers = {'Authorization': self.auth(self.patient)}
+        self.assertEqual(get('/api/async/doctor/dashboard/', headers=headers).status_code, 403)
+        self.assertEqual(get('/api/async/time-slots/?date=tomorrow', headers=headers).status_code, 400)
+
+    def test_conditional_get(self):
+        get = async_to_sync(AsyncClient().get)
+        headers = {'Authorization': self.auth(self.patient)}
+        for path in ('users/me/', 'doctors/', 'time-slots/'):
+            etag = get(f'/api/async/{path}', headers=headers)['ETag']
+            response = get(f'/api/async/{path}', headers={**headers, 'If-None-Match': etag})
+            self.assertEqual(response.status_code, 304, path)
+
+    def test_metrics_record_async_routes(self):
+        async_to_sync(AsyncClient().get)('/api/async/time-slots/', headers={'Authorization': self.auth(self.patient)})
+        stats = registry.routes[('async-timeslot-list', 'GET', 'get')]
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.statuses, {200: 1})
+        self.assertGreaterEqual(stats.db_queries, 2)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class HealthTests(TestCase):
+    def get(self):
+        return APIClient().get('/api/health/', HTTP_AUTHORIZATION='Bearer secret')
+
+    def test_health_details_need_metrics_token(self):
+        response = APIClient().get('/api/health/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        with mock.patch.object(connection, 'ensure_connection', side_effect=Exception('connection refused')):
+            response = APIClient().get('/api/health/', HTTP_AUTHORIZATION='Bearer nope')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json(), {'status': 'error'})
+
+    def test_health_reports_databases(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        default = response.json()['databases']['default']
+        self.assertEqual(default['status'], 'ok')
+        self.assertGreaterEqual(default['pool']['open'], 1)
+        self.assertEqual(default['pool']['open'], default['pool']['in_use'] + default['pool']['idle'])
+        self.assertIn('wait_ms', default)
+
+    def test_health_fails_when_database_is_down(self):
+        with mock.patch.object(connection, 'ensure_connection', side_effect=Exception('connection refused')):
+            response = self.get()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['databases']['default']['error'], 'connection refused')
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'], READ_REPLICA_PIN_SECONDS=5)
+class ReadReplicaRoutingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.seen = []
+
+    def run_request(self, method, view, auth='Bearer a', status=200):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            self.seen.append(current_read_alias())
+            return HttpResponse(status=status)
+
+        middleware = ReadReplicaMiddleware(get_response)
+        request = getattr(self.factory, method)('/api/doctors/', HTTP_AUTHORIZATION=auth)
+        middleware(request)
+
+    def test_safe_reads_go_to_replica(self):
+        self.run_request('get', DoctorViewSet.as_view({'get': 'list'}))
+        self.run_request('get', UserViewSet.as_view({'get': 'list'}))
+        self.run_request('post', DoctorViewSet.as_view({'post': 'create'}), status=400)
+        self.assertEqual(self.seen, ['replica_1', None, None])
+        # После запроса контекст сброшен
+        self.assertIsNone(current_read_alias())
+
+    def test_write_pins_client_to_primary(self):
+        directory = DoctorViewSet.as_view({'get': 'list', 'post': 'create'})
+        self.run_request('post', directory, status=201)
+        self.run_request('get', directory)
+        self.run_request('get', directory, auth='Bearer other')
+        self.assertEqual(self.seen, [None, None, 'replica_1'])
+
+    def test_replicas_require_shared_pin_cache(self):
+        self.assertEqual([error.id for error in check_replica_pin_cache(None)], ['medical_system.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                             'LOCATION': 'redis://localhost:6379/0'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(check_replica_pin_cache(None), [])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertEqual(check_replica_pin_cache(None), [])
+
+    def test_router(self):
+        router = ReadReplicaRouter()
+        self.assertIsNone(router.db_for_read(User))
+        with read_from('replica_1'):
+            self.assertEqual(router.db_for_read(User), 'replica_1')
+            self.assertEqual(router.db_for_write(User), 'default')
+        self.assertFalse(router.allow_migrate('replica_1', 'medical_system'))
+        self.assertIsNone(router.allow_migrate('default', 'medical_system'))
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        self.client = APIClient()
+        self.client.force_authenticate(make_user('patient@keremet.kg'))
+
+    def test_metrics_are_recorded_per_route_and_action(self):
+        self.client.get('/api/doctors/')
+        self.client.get('/api/doctors/')
+        self.client.get('/api/nope/')
+        with override_settings(DEBUG=True):
+            body = APIClient().get('/api/metrics/').content.decode()
+        labels = 'route="doctor-list",method="GET",action="list"'
+        self.assertIn(f'keremet_requests_total{{{labels},status="200"}} 2', body)
+        self.assertIn(f'keremet_request_duration_seconds_count{{{labels}}} 2', body)
+        self.assertIn(f'keremet_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', body)
+        self.assertIn('route="unmatched",method="GET",action="get",status="404"', body)
+        stats = registry.routes[('doctor-list', 'GET', 'list')]
+        # Второй запрос отдан из кэша справочника без обращений к БД
+        self.assertGreaterEqual(stats.db_queries, 1)
+        self.assertGreater(stats.response_bytes, 0)
+        self.assertGreater(stats.render_duration, 0)
+
+    @override_settings(METRICS_SLOW_REQUEST_SECONDS=0, METRICS_SLOW_REQUEST_SAMPLE_RATE=1.0)
+    def test_slow_request_log_includes_sql(self):
+        with self.assertLogs('medical_system.slow_requests', level='WARNING') as logs:
+            self.client.get('/api/time-slots/')
+        self.assertIn('timeslot-list/list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_closed_without_token(self):
+        self.assertEqual(APIClient().get('/api/metrics/').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(APIClient().get('/api/metrics/').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_token(self):
+        self.assertEqual(APIClient().get('/api/metrics/').status_code, 403)
+        self.assertEqual(APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer nope').status_code, 403)
+        response = APIClient().get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+
+@override_settings(LOGIN_RATE_LIMIT_ENABLED=False)
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        generate_dataset(doctors=3, patients=6, slots=96, appointments=60, seed=1)
+
+    def test_generated_dataset(self):
+        self.assertEqual(User.objects.filter(role='DOCTOR').count(), 3)
+        self.assertEqual(Doctor.objects.count(), 3)
+        self.assertEqual(TimeSlot.objects.count(), 96)
+        self.assertEqual(Appointment.objects.count(), 60)
+        # На каждом занятом слоте не больше одной активной записи
+        booked = TimeSlot.objects.filter(status='BOOKED').count()
+        self.assertLessEqual(Appointment.objects.exclude(status='CANCELED').count(), booked)
+        flush_dataset()
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(TimeSlot.objects.exists())
+
+    def test_workload_reports_percentiles(self):
+        mix = {'browse_doctors': 1, 'list_slots': 1, 'dashboard': 1, 'book': 1, 'cancel': 1}
+        results = Workload(seed=2, mix=mix).run(40)
+        self.assertEqual(set(results['endpoints']), set(mix))
+        self.assertEqual(results['missing'], [])
+        self.assertGreater(results['endpoints']['book']['statuses'].get('201', 0), 0)
+        self.assertGreater(results['endpoints']['cancel']['statuses'].get('200', 0), 0)
+        for name, endpoint in results['endpoints'].items():
+            self.assertEqual(endpoint['errors'], 0, name)
+            self.assertLessEqual(endpoint['p50_ms'], endpoint['p95_ms'])
+            self.assertLessEqual(endpoint['p95_ms'], endpoint['p99_ms'])
+        self.assertEqual(results['endpoints']['browse_doctors']['statuses'], {'200': results['endpoints']['browse_doctors']['requests']})
+
+        slower = json.loads(json.dumps(results))
+        slower['endpoints']['dashboard']['p95_ms'] = results['endpoints']['dashboard']['p95_ms'] * 2 + 1
+        self.assertEqual([name for name, *_ in compare_to_baseline(slower, results, 0.2)], ['dashboard'])
+        self.assertEqual(compare_to_baseline(results, results, 0.2), [])
+
+    def test_workload_reports_skipped_operations(self):
+        TimeSlot.objects.update(status='BOOKED')
+        results = Workload(seed=2, mix={'book': 1, 'cancel': 1}).run(10)
+        self.assertEqual(results['endpoints'], {})
+        # Отмена без записей уходит в book, и та тоже пропускается
+        self.assertEqual(results['skipped']['book'], 10)
+        self.assertGreater(results['skipped']['cancel'], 0)
+        self.assertEqual(results['missing'], ['book', 'cancel'])
+        with self.assertRaises(CommandError):
+            call_command('bench_api', requests=10, concurrency=1, stdout=StringIO())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+
+class SeedTests(TestCase):
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('email').values_list('email', 'first_name', 'last_name', 'phone', 'inn', 'password')),
+            list(Doctor.objects.order_by('user__email').values_list('specialty', 'experience', 'consultation_price')),
+            list(TimeSlot.objects.order_by('doctor__email', 'start_time').values_list('start_time', 'status')),
+            list(Appointment.objects.order_by('time_slot__doctor__email', 'time_slot__start_time', 'status')
+                 .values_list('status', 'reason', 'patient__email')),
+            list(Analysis.objects.order_by('date_added').values_list('name', 'status', 'patient__email')),
+        )
+
+    def test_same_seed_gives_same_data(self):
+        options = dict(doctors=4, patients=10, slots=80, appointments=50, seed=7, start_date=date(2026, 3, 2))
+        counts = seed_database(**options)
+        self.assertEqual(counts['user'], 14)
+        self.assertEqual(counts['timeslot'], 80)
+        self.assertEqual(counts['appointment'], Appointment.objects.count())
+        first = self.snapshot()
+        # Праздники и выходные в расписание не попадают
+        for start, _ in first[2]:
+            self.assertLess(timezone.localtime(start).weekday(), 5)
+            self.assertNotEqual((start.month, start.day), (3, 8))
+        # Один хеш пароля на всех
+        self.assertEqual(len({row[5] for row in first[0]}), 1)
+
+        flush_seeded('seed.keremet.kg')
+        self.assertFalse(User.objects.exists())
+        seed_database(**options)
+        self.assertEqual(self.snapshot(), first)
+
+    def test_schedule_spans_past_and_future(self):
+        seed_database(doctors=4, patients=10, slots=80, appointments=50, seed=3, start_date=date(2026, 3, 4))
+        # Граница — полдень start_date
+        now = timezone.make_aware(datetime(2026, 3, 4, 12))
+        slots = TimeSlot.objects.all()
+        self.assertEqual(slots.filter(start_time__lt=now).count(), 40)
+        self.assertEqual(slots.filter(start_time__gte=now).count(), 40)
+        self.assertTrue(slots.filter(start_time__gte=now, status='AVAILABLE').exists())
+        self.assertTrue(Appointment.objects.filter(status='SCHEDULED').exists())
+        self.assertTrue(Appointment.objects.filter(status='COMPLETED').exists())
+
+    def test_copy_rows(self):
+        writer = RowWriter(Doctor, batch_size=10, use_copy=True)
+        user = make_user('doctor@keremet.kg', role='DOCTOR')
+        writer.add(user_id=user.pk, specialty='THERAPIST', description='Строка\tс табом', consultation_price=1500,
+                   available_for_online=True)
+        with mock.patch.object(writer.connection, 'cursor') as cursor:
+            writer.flush()
+        sql, buffer = cursor.return_value.__enter__.return_value.copy_expert.call_args.args
+        self.assertTrue(sql.startswith('COPY "medical_system_doctor" ("user_id", "specialty"'))
+        row = buffer.getvalue().rstrip('\n').split('\t')
+        self.assertEqual(len(row), len(writer.fields))
+        values = dict(zip([field.attname for field in writer.fields], row))
+        self.assertEqual(values['description'], 'Строка\\tс табом')
+        self.assertEqual(values['experience'], '\\N')
+        self.assertEqual(values['available_for_online'], 't')
+        self.assertEqual(writer.count, 1)
+        self.assertEqual(copy_value('a\\b\nc'), 'a\\\\b\\nc')
+
+
+class SyncDoctorsTests(TestCase):
+    def test_profile_follows_user(self):
+        doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.assertEqual(doctor.doctor_profile.specialty, 'THERAPIST')
+        doctor.specialty = 'SURGEON'
+        doctor.save()
+        self.assertEqual(Doctor.objects.get(user=doctor).specialty, 'SURGEON')
+        # Сохранение last_login при входе профиль не трогает
+        with self.assertNumQueries(1):
+            doctor.save(update_fields=['last_login'])
+
+    def test_set_based_sync(self):
+        users = [make_user(f'doctor{i}@keremet.kg', role='DOCTOR', specialty='THERAPIST') for i in range(4)]
+        Doctor.objects.filter(user=users[0]).delete()
+        Doctor.objects.filter(user=users[1]).update(experience=None, education=None)
+        User.objects.filter(pk=users[2].pk).update(specialty='DENTIST')
+
+        out = StringIO()
+        call_command('sync_doctors', '--dry-run', stdout=out)
+        self.assertIn('Dry run: 1 profiles to create, 2 to update', out.getvalue())
+        self.assertIn("specialty 'THERAPIST' -> 'DENTIST'", out.getvalue())
+        self.assertFalse(Doctor.objects.filter(user=users[0]).exists())
+
+        # Два чтения, одна вставка, одно обновление и savepoint вокруг записи
+        with self.assertNumQueries(6):
+            call_command('sync_doctors', stdout=StringIO())
+        self.assertTrue(Doctor.objects.filter(user=users[0]).exists())
+        self.assertEqual(Doctor.objects.get(user=users[1]).experience, 0)
+        self.assertEqual(Doctor.objects.get(user=users[2]).specialty, 'DENTIST')
+
+        out = StringIO()
+        call_command('sync_doctors', stdout=out)
+        self.assertIn('0 profiles create, 0 update', out.getvalue())
+
+
+class AnalysisDownloadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PROTECTED_MEDIA_SERVER=None,
+                                              PRIVATE_MEDIA_ROOT=os.path.join(self.media_root, 'private'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.patient = make_user('patient@keremet.kg')
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR')
+        self.content = bytes(range(256)) * 40
+        self.analysis = Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='ОАК')
+        self.analysis.result_file.save('result.pdf', ContentFile(self.content))
+        self.url = f'/api/analyses/{self.analysis.pk}/download/'
+        self.client = APIClient()
+        self.client.force_authenticate(self.patient)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_full_download(self):
+        response, body = self.get(HTTP_ACCEPT='application/pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('attachment', response['Content-Disposition'])
+
+        response = self.client.get('/api/analyses/')
+        listing = response.json()['results']
+        self.assertTrue(listing[0]['result_file_url'].endswith(self.url))
+        # Прямого адреса файла в ответах нет
+        self.assertNotIn('result_file', listing[0])
+        self.assertNotIn('/media/', response.content.decode())
+        detail = self.client.get(f"/api/analyses/{listing[0]['id']}/")
+        self.assertNotIn('/media/', detail.content.decode())
+
+    def test_ranges(self):
+        response, body = self.get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.content[100:200])
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.content)}')
+
+        response, body = self.get(HTTP_RANGE='bytes=-10')
+        self.assertEqual(body, self.content[-10:])
+        response, body = self.get(HTTP_RANGE=f'bytes={len(self.content)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.content)}')
+        # If-Range с устаревшим ETag — отдаём файл целиком
+        response, body = self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.content)
+
+    def test_conditional_request(self):
+        response, _ = self.get()
+        response, body = self.get(HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+
+    def test_access_is_checked(self):
+        self.client.force_authenticate(make_user('other@keremet.kg'))
+        response, _ = self.get()
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(APIClient().get(self.url).status_code, 401)
+
+    @override_settings(PROTECTED_MEDIA_SERVER='nginx')
+    def test_nginx_handoff(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.analysis.result_file.name}')
+        self.assertEqual(body, b'')
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.private_root = os.path.join(self.media_root, 'private')
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root,
+                                              CHUNKED_UPLOAD_DIR=os.path.join(self.media_root, 'chunked'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.patient = make_user('patient@keremet.kg')
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR')
+        self.analysis = Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='МРТ')
+        self.content = os.urandom(250 * 1024)
+        self.client = APIClient()
+        self.client.force_authenticate(self.doctor)
+
+    def start(self, content=None, **fields):
+        content = self.content if content is None else content
+        data = {'purpose': 'ANALYSIS_RESULT', 'target_id': self.analysis.pk, 'filename': 'scan.dcm',
+                'size': len(content), **fields}
+        return self.client.post('/api/uploads/', data, format='json')
+
+    def put(self, upload_id, content, start, total=None):
+        end = start + len(content) - 1
+        return self.client.generic('PUT', f'/api/uploads/{upload_id}/', content,
+                                   content_type='application/octet-stream',
+                                   HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{total or len(self.content)}')
+
+    def upload(self, content=None, chunk=100 * 1024, **fields):
+        content = self.content if content is None else content
+        upload_id = self.start(content, **fields).json()['id']
+        for start in range(0, len(content), chunk):
+            response = self.put(upload_id, content[start:start + chunk], start, len(content))
+            self.assertEqual(response.status_code, 200, response.content)
+        return upload_id, self.client.post(f'/api/uploads/{upload_id}/complete/')
+
+    def test_chunked_upload_attaches_result(self):
+        upload_id, response = self.upload(sha256=hashlib.sha256(self.content).hexdigest())
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['status'], 'COMPLETE')
+        self.assertFalse(response.json()['deduplicated'])
+
+        self.analysis.refresh_from_db()
+        self.assertEqual(self.analysis.status, 'READY')
+        digest = hashlib.sha256(self.content).hexdigest()
+        self.assertEqual(self.analysis.result_file.name, blob_name(digest, 'scan.dcm'))
+        self.assertTrue(self.analysis.result_file.name.startswith(f'blobs/{digest[:2]}/{digest[2:4]}/'))
+        with self.analysis.result_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        # Результат лежит в закрытом хранилище и по MEDIA_URL недоступен
+        self.assertTrue(os.path.exists(os.path.join(self.private_root, self.analysis.result_file.name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.analysis.result_file.name)))
+        with self.assertRaises(ValueError):
+            self.analysis.result_file.url
+        self.assertFalse(os.path.exists(temp_path(UploadSession.objects.get(pk=upload_id))))
+
+        # Скачивается под именем анализа, а не под хешем
+        self.client.force_authenticate(self.patient)
+        download = self.client.get(f'/api/analyses/{self.analysis.pk}/download/')
+        self.assertIn("filename*=UTF-8''%D0%9C%D0%A0%D0%A2.dcm", download['Content-Disposition'])
+        b''.join(download.streaming_content)
+
+    def test_resume_after_interrupted_chunk(self):
+        upload_id = self.start().json()['id']
+        self.assertEqual(self.put(upload_id, self.content[:1000], 0).status_code, 200)
+        # Повтор уже принятой части и пропуск вперёд — 409 с текущим смещением
+        response = self.put(upload_id, self.content[:1000], 0)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['received'], 1000)
+        self.assertEqual(self.put(upload_id, self.content[5000:6000], 5000).status_code, 409)
+
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').json()['received'], 1000)
+        self.assertEqual(self.put(upload_id, self.content[1000:], 1000).status_code, 200)
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 200)
+        self.analysis.refresh_from_db()
+        with self.analysis.result_file.open('rb') as f:
+            self.assertEqual(f.read(), self.content)
+        # Результат лежит в закрытом хранилище и по MEDIA_URL недоступен
+        self.assertTrue(os.path.exists(os.path.join(self.private_root, self.analysis.result_file.name)))
+        self.assertFalse(os.path.exists(os.path.join(self.media_root, self.analysis.result_file.name)))
+        with self.assertRaises(ValueError):
+            self.analysis.result_file.url
+
+    @override_settings(CHUNKED_UPLOAD_CHUNK_SIZE=64 * 1024)
+    def test_chunk_larger_than_chunk_size_is_rejected(self):
+        upload_id = self.start().json()['id']
+        self.assertEqual(self.put(upload_id, self.content[:64 * 1024 + 1], 0).status_code, 413)
+        self.assertEqual(self.put(upload_id, self.content[:64 * 1024], 0).status_code, 200)
+
+    def test_offset_advances_only_once_for_concurrent_retries(self):
+        upload_id = self.start().json()['id']
+        # Две копии одной части прочитали received=0; вторая проиграла UPDATE
+        stale = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(self.put(upload_id, self.content[:1000], 0).status_code, 200)
+        with self.assertRaises(ChunkError) as ctx:
+            write_chunk(stale, BytesIO(self.content[:1000]), 0, 999)
+        self.assertEqual((ctx.exception.status, stale.received), (409, 1000))
+
+    def test_duplicate_upload_reuses_blob(self):
+        _, first = self.upload()
+        other = Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='МРТ повторно')
+        _, second = self.upload(target_id=other.pk)
+        self.assertTrue(second.json()['deduplicated'])
+        other.refresh_from_db()
+        self.analysis.refresh_from_db()
+        self.assertEqual(other.result_file.name, self.analysis.result_file.name)
+        blob_dir = os.path.dirname(os.path.join(self.private_root, other.result_file.name))
+        self.assertEqual(len(os.listdir(blob_dir)), 1)
+
+        # Обычная загрузка одним запросом тоже кладёт файл в blobs/
+        third = Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='МРТ')
+        response = self.client.post(f'/api/analyses/{third.pk}/upload_result/',
+                                    {'result_file': ContentFile(self.content, name='scan.dcm')}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        third.refresh_from_db()
+        self.assertEqual(third.result_file.name, other.result_file.name)
+
+    def test_incomplete_and_corrupt_uploads_are_rejected(self):
+        upload_id = self.start().json()['id']
+        self.put(upload_id, self.content[:1000], 0)
+        response = self.client.post(f'/api/uploads/{upload_id}/complete/')
+        self.assertEqual(response.status_code, 409)
+
+        _, response = self.upload(sha256='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.analysis.refresh_from_db()
+        self.assertFalse(self.analysis.result_file)
+
+    def test_access_is_checked(self):
+        self.client.force_authenticate(make_user('other@keremet.kg', role='DOCTOR'))
+        self.assertEqual(self.start().status_code, 404)
+        response = self.start(purpose='DOCTOR_PHOTO', target_id=self.doctor.doctor_profile.pk)
+        self.assertEqual(response.status_code, 404)
+
+        self.client.force_authenticate(self.doctor)
+        upload_id = self.start().json()['id']
+        self.client.force_authenticate(self.patient)
+        self.assertEqual(self.put(upload_id, self.content[:10], 0).status_code, 404)
+        self.assertEqual(self.start(size=10 ** 12).status_code, 400)
+
+    def test_doctor_photo(self):
+        self.assertEqual(self.upload(purpose='DOCTOR_PHOTO', target_id=self.doctor.doctor_profile.pk)[1].status_code,
+                         400)
+        buffer = BytesIO()
+        Image.new('RGB', (8, 8), 'red').save(buffer, 'PNG')
+        photo = buffer.getvalue()
+        _, response = self.upload(photo, purpose='DOCTOR_PHOTO', target_id=self.doctor.doctor_profile.pk,
+                                  filename='me.PNG')
+        self.assertEqual(response.status_code, 200, response.content)
+        profile = Doctor.objects.get(user=self.doctor)
+        self.assertEqual(profile.photo.name, blob_name(hashlib.sha256(photo).hexdigest(), 'me.png'))
+
+    def test_delete_during_chunk_removes_part_file(self):
+        upload_id = self.start().json()['id']
+        session = UploadSession.objects.get(pk=upload_id)
+        client = self.client
+
+        class CancelledStream(BytesIO):
+            # DELETE приходит, пока PUT ещё пишет часть
+            def read(self, size=-1):
+                if self.tell() == 0:
+                    client.delete(f'/api/uploads/{upload_id}/')
+                return super().read(size)
+
+        with self.assertRaises(ChunkError) as ctx:
+            write_chunk(session, CancelledStream(self.content[:1000]), 0, 999)
+        self.assertEqual(ctx.exception.status, 409)
+        self.assertEqual(UploadSession.objects.get(pk=upload_id).status, 'ABORTED')
+        self.assertFalse(os.path.exists(temp_path(session)))
+
+    def test_clean_removes_orphan_part_files(self):
+        os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+        orphan = os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{uuid.uuid4()}.part')
+        with open(orphan, 'wb') as f:
+            f.write(b'x')
+        self.assertEqual(clean_expired_uploads(), (0, 0))
+        self.assertTrue(os.path.exists(orphan))
+        self.assertEqual(clean_expired_uploads(now=timezone.now() + timedelta(days=2)), (0, 1))
+        self.assertFalse(os.path.exists(orphan))
+
+    def test_clean_expired_uploads(self):
+        upload_id = self.start().json()['id']
+        self.put(upload_id, self.content[:1000], 0)
+        session = UploadSession.objects.get(pk=upload_id)
+        self.assertEqual(clean_expired_uploads(), (0, 0))
+        self.assertEqual(clean_expired_uploads(now=timezone.now() + timedelta(days=2)), (1, 1))
+        self.assertFalse(os.path.exists(temp_path(session)))
+
+
+def sync_executor():
+    # Фоновая обработка фото выполняется сразу в потоке теста (без закрытия его соединения)
+    return mock.patch.object(photo_executor, 'submit', side_effect=lambda fn, doctor_id: generate_photo_variants(doctor_id))
+
+
+class PhotoVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = make_user('doctor@keremet.kg', role='DOCTOR')
+        self.profile = make_profile(self.user, specialty='THERAPIST')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def photo(self, size=(1200, 900), mode='RGB', fmt='JPEG', name='photo.jpg'):
+        buffer = BytesIO()
+        Image.new(mode, size, 'blue').save(buffer, fmt)
+        return ContentFile(buffer.getvalue(), name=name)
+
+    def upload(self, photo):
+        with sync_executor(), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/doctors/{self.profile.pk}/upload_photo/', {'photo': photo},
+                                        format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.profile.refresh_from_db()
+        return response
+
+    def test_variants_built_after_upload(self):
+        response = self.upload(self.photo())
+        # Ответ на загрузку не ждёт обработки
+        self.assertEqual(response.json()['photo_variants'], {})
+        self.assertTrue(variants_current(self.profile))
+
+        for variant, size in PHOTO_VARIANTS.items():
+            files = self.profile.photo_variants[variant]
+            self.assertEqual((files['width'], files['height']), (size, size))
+            with Image.open(os.path.join(self.media_root, files['webp'])) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (size, size)))
+            with Image.open(os.path.join(self.media_root, files['jpeg'])) as image:
+                self.assertEqual((image.format, image.size), ('JPEG', (size, size)))
+
+        data = self.client.get(f'/api/doctors/{self.profile.pk}/').json()
+        self.assertEqual(set(data['photo_variants']), set(PHOTO_VARIANTS))
+        self.assertTrue(data['photo_variants']['card']['webp'].startswith('http://testserver/media/photo_variants/'))
+        # Справочник сброшен сохранением карты копий
+        listing = self.client.get('/api/doctors/').json()
+        self.assertEqual(listing[0]['photo_variants']['card'], data['photo_variants']['card'])
+
+    def test_small_transparent_photo(self):
+        self.upload(self.photo(size=(300, 200), mode='RGBA', fmt='PNG', name='photo.png'))
+        self.assertEqual(self.profile.photo_variants['card']['width'], 160)
+        self.assertEqual(self.profile.photo_variants['profile']['width'], 200)
+        self.assertEqual(self.profile.photo_variants['profile_2x']['height'], 200)
+
+    def test_new_photo_replaces_stale_variants(self):
+        self.upload(self.photo())
+        old = self.profile.photo_variants
+        with self.captureOnCommitCallbacks(execute=False):
+            self.client.post(f'/api/doctors/{self.profile.pk}/upload_photo/',
+                             {'photo': self.photo(size=(640, 640))}, format='multipart')
+        self.profile.refresh_from_db()
+        # Пока новые копии не готовы, старые не отдаются
+        self.assertEqual(self.profile.photo_variants, old)
+        self.assertEqual(self.client.get(f'/api/doctors/{self.profile.pk}/').json()['photo_variants'], {})
+
+    def test_backfill_command(self):
+        self.profile.photo.save('photo.jpg', self.photo(), save=False)
+        Doctor.objects.filter(pk=self.profile.pk).update(photo=self.profile.photo.name)
+        out = StringIO()
+        call_command('photo_variants', stdout=out)
+        self.assertIn('Built 1, up to date 0, failed 0', out.getvalue())
+        self.profile.refresh_from_db()
+        self.assertTrue(variants_current(self.profile))
+
+        out = StringIO()
+        call_command('photo_variants', stdout=out)
+        self.assertIn('Built 0, up to date 1, failed 0', out.getvalue())
+
+
+class SlotStreamTests(TransactionTestCase):
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR')
+        self.profile = make_profile(self.doctor, specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg')
+        self.token = str(tokens_for_user(self.patient).access_token)
+        self.day = timezone.localdate() + timedelta(days=1)
+        start = timezone.make_aware(datetime.combine(self.day, time(10, 0)))
+        self.slot = TimeSlot.objects.create(doctor=self.doctor, start_time=start, end_time=start + timedelta(minutes=30),
+                                            status='AVAILABLE')
+        self.url = f'/api/time-slots/stream/?doctor={self.profile.pk}&date={self.day.isoformat()}&token={self.token}'
+
+    @staticmethod
+    def parse(chunk):
+        fields = dict(line.split(': ', 1) for line in chunk.decode().strip().splitlines() if not line.startswith(':'))
+        if 'data' in fields:
+            fields['data'] = json.loads(fields['data'])
+        return fields
+
+    async def next_event(self, stream):
+        while True:
+            chunk = await asyncio.wait_for(anext(stream), 5)
+            if chunk.startswith(b'event:') or chunk.startswith(b'id:'):
+                return self.parse(chunk)
+
+    async def disconnect(self, stream):
+        # ASGI-сервер при обрыве соединения отменяет задачу, ждущую следующую часть
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0.05)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+
+    async def test_snapshot_then_changes(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+
+        snapshot = await self.next_event(stream)
+        self.assertEqual(snapshot['event'], 'snapshot')
+        self.assertEqual([(slot['id'], slot['status']) for slot in snapshot['data']], [(self.slot.pk, 'AVAILABLE')])
+        self.assertEqual(broker.subscriber_count(), 1)
+
+        # Слот другого дня в этот канал не попадает
+        other_start = self.slot.start_time + timedelta(days=1)
+        await TimeSlot.objects.acreate(doctor=self.doctor, start_time=other_start,
+                                       end_time=other_start + timedelta(minutes=30), status='AVAILABLE')
+        appointment = await sync_to_async(book_time_slot)(self.patient, self.slot.pk)
+        event = await self.next_event(stream)
+        self.assertEqual(event['event'], 'slot')
+        self.assertEqual((event['data']['id'], event['data']['status']), (self.slot.pk, 'BOOKED'))
+        self.assertTrue(event['data']['start_time'].endswith('Z'))
+
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        response = await sync_to_async(client.patch)(f'/api/appointments/{appointment.pk}/cancel/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await self.next_event(stream))['data']['status'], 'AVAILABLE')
+
+        await sync_to_async(self.slot.delete)()
+        self.assertEqual((await self.next_event(stream))['data']['status'], 'DELETED')
+
+        await self.disconnect(stream)
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_generated_slots_reach_doctor_channel(self):
+        response = await AsyncClient().get(f'/api/time-slots/stream/?doctor={self.profile.pk}',
+                                           headers={'Authorization': f'Bearer {self.token}'})
+        stream = aiter(response.streaming_content)
+        snapshot = await self.next_event(stream)
+        self.assertEqual(len(snapshot['data']), 1)
+
+        client = APIClient()
+        client.force_authenticate(self.doctor)
+        response = await sync_to_async(client.post)('/api/time-slots/generate/', {
+            'start_date': (self.day + timedelta(days=7)).isoformat(), 'weeks': 1, 'weekdays': 'mon',
+            'day_start': '09:00', 'day_end': '10:00', 'slot_minutes': 30,
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        events = [await self.next_event(stream) for _ in range(2)]
+        self.assertEqual({event['data']['status'] for event in events}, {'AVAILABLE'})
+        await self.disconnect(stream)
+
+    async def test_slow_client_gets_fresh_snapshot(self):
+        response = await AsyncClient().get(self.url)
+        stream = aiter(response.streaming_content)
+        await self.next_event(stream)
+        subscription = next(iter(broker.subscribers[(self.doctor.pk, self.day)]))
+        for index in range(broker.max_queue + 1):
+            subscription.push((index, {}))
+        self.assertIs(subscription.queue.get_nowait(), OVERFLOW)
+        subscription.push(OVERFLOW)
+        self.assertEqual((await self.next_event(stream))['event'], 'snapshot')
+        await self.disconnect(stream)
+
+    async def test_auth_and_validation(self):
+        client = AsyncClient()
+        base = f'/api/time-slots/stream/?doctor={self.profile.pk}'
+        self.assertEqual((await client.get(base)).status_code, 401)
+        self.assertEqual((await client.get(f'{base}&token=broken')).status_code, 401)
+        self.assertEqual((await client.get(f'{base}&date=tomorrow&token={self.token}')).status_code, 400)
+        self.assertEqual((await client.get(f'/api/time-slots/stream/?doctor=0&token={self.token}')).status_code, 404)
+
+    def test_wsgi_returns_single_snapshot(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        chunks = response.content.split(b'\n\n')
+        self.assertEqual(chunks[0], b'retry: 3000')
+        self.assertEqual(self.parse(chunks[1])['data'][0]['id'], self.slot.pk)
+
+
+class ReadSerializerTests(TestCase):
+    """Списки через .values() отдают те же байты, что ModelSerializer."""
+
+    def setUp(self):
+        self.doctor = make_user('doctor@keremet.kg', role='DOCTOR', specialty='THERAPIST')
+        self.patient = make_user('patient@keremet.kg', phone='+996700000001')
+        now = timezone.now()
+        for i in range(3):
+            slot = make_slot(self.doctor, start=now + timedelta(days=i + 1, microseconds=i), status='BOOKED')
+            Appointment.objects.create(
+                doctor=self.doctor, patient=self.patient, time_slot=slot, status='SCHEDULED',
+                reason=['Кашель\u2028и насморк', None, ''][i],
+            )
+        Analysis.objects.create(patient=self.patient, doctor=self.doctor, name='Глюкоза')
+        Analysis.objects.create(
+            patient=self.patient, doctor=self.doctor, name='ОАК', description='Натощак', status='READY',
+            result_file=blob_name('ab' * 32, 'result.pdf'), date_completed=now,
+        )
+        self.request = RequestFactory().get('/api/analyses/')
+
+    def assertSameOutput(self, queryset, serializer_class, reader_class):
+        context = {'request': self.request}
+        expected = serializer_class(queryset, many=True, context=context).data
+        reader = reader_class(context=context)
+        data = reader.serialize(reader.project(queryset))
+        self.assertEqual(data, json.loads(json.dumps(expected)))
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_appointments_match_model_serializer(self):
+        self.assertSameOutput(Appointment.objects.order_by('id'), AppointmentSerializer, AppointmentReadSerializer)
+
+    def test_analyses_match_model_serializer(self):
+        self.assertSameOutput(Analysis.objects.order_by('id'), AnalysisSerializer, AnalysisReadSerializer)
+
+    def test_subclass_must_define_lookups_and_getters(self):
+        class Incomplete(ValuesSerializer):
+            def get_lookups(self):
+                return ['id']
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+    def test_list_endpoints_paginate_dicts(self):
+        client = APIClient()
+        client.force_authenticate(self.patient)
+        first = client.get('/api/appointments/?page_size=2').json()
+        rest = client.get(first['next']).json()
+        ids = [row['id'] for row in first['results'] + rest['results']]
+        self.assertEqual(ids, list(Appointment.objects.order_by('-time_slot__start_time').values_list('id', flat=True)))
+        self.assertEqual(first['results'][0]['patient']['phone'], '+996700000001')
+        self.assertNotIn('password', first['results'][0]['patient'])
+
+        analyses = client.get('/api/analyses/').json()['results']
+        self.assertEqual(analyses[0]['status_display'], 'Готов')
+        self.assertTrue(analyses[0]['result_file_url'].endswith(f"/api/analyses/{analyses[0]['id']}/download/"))
+
+    def test_fast_renderer_matches_json_renderer(self):
+        data = {
+            'when': timezone.now(), 'day': date(2024, 3, 1), 'at': time(9, 30), 'price': Decimal('12.50'),
+            'text': 'строка\u2029', 1: None, 'nested': [{'id': 1}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        # orjson не кодирует целые больше 64 бит — отдаёт обычный рендерер
+        self.assertEqual(FastJSONRenderer().render({'big': 2 ** 70}), JSONRenderer().render({'big': 2 ** 70}))
+        self.assertEqual(FastJSONRenderer().render(None), b'')
 
-# Create your tests here.
@@ -0,0 +1,152 @@
+import os
+import re
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from PIL import Image
+
+from .blobs import file_digest, store_local_file
+from .models import Analysis, UploadSession
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+READ_SIZE = 64 * 1024
+
+
+class ChunkError(Exception):
+    """Часть не принята; status — HTTP-код ответа."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_content_range(header, size):
+    """'bytes 0-1048575/7340032' -> (start, end) включительно."""
+    match = CONTENT_RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        raise ChunkError('Content-Range header "bytes <start>-<end>/<total>" is required')
+    start, end, total = map(int, match.groups())
+    if total != size:
+        raise ChunkError(f'Total size {total} does not match upload size {size}')
+    if start > end or end >= size:
+        raise ChunkError('Invalid Content-Range', status=416)
+    return start, end
+
+
+def temp_path(session):
+    return os.path.join(settings.CHUNKED_UPLOAD_DIR, f'{session.pk}.part')
+
+
+def write_chunk(session, stream, start, end):
+    """
+    Пишет часть из потока запроса прямо в файл по смещению start, по
+    READ_SIZE байт, не держа её в памяти и без транзакции: медленный клиент
+    не держит соединение с БД и блокировки. Смещение сдвигается после
+    записи одним UPDATE ... WHERE received = start; из двух одновременных
+    повторов одной части засчитывается один (второй получит 409), а
+    целостность файла проверяет sha256 при завершении.
+    """
+    if end - start + 1 > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise ChunkError(f'Chunk is larger than {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes', status=413)
+    if start != session.received:
+        # Часть уже получена или между ними пропуск: клиент продолжит с received
+        raise ChunkError('Chunk does not start at the current offset', status=409)
+    os.makedirs(settings.CHUNKED_UPLOAD_DIR, exist_ok=True)
+    path = temp_path(session)
+    remaining = end - start + 1
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+    try:
+        offset = start
+        while remaining > 0:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            os.pwrite(fd, data, offset)
+            offset += len(data)
+            remaining -= len(data)
+    finally:
+        os.close(fd)
+    received = end + 1 - remaining
+    advanced = UploadSession.objects.filter(pk=session.pk, status='OPEN', received=start).update(
+        received=received, updated_at=timezone.now(),
+    )
+    if not advanced:
+        try:
+            session.refresh_from_db(fields=['received', 'status'])
+        except UploadSession.DoesNotExist:
+            session.status = None
+        if session.status != 'OPEN':
+            # Сессию отменили или удалили, пока писалась часть: файл, который
+            # мы могли создать заново, больше никому не нужен
+            remove_temp_file(session)
+            raise ChunkError('Upload is no longer open', status=409)
+        raise ChunkError('Chunk does not start at the current offset', status=409)
+    session.received = received
+    if remaining:
+        raise ChunkError('Chunk body is shorter than its Content-Range')
+
+
+def finish_upload(session):
+    """
+    Проверяет размер и контрольную сумму и переносит файл в хранилище
+    блобов. Возвращает (имя, был_ли_такой_файл_уже).
+    """
+    if session.received != session.size:
+        raise ChunkError(f'Upload is incomplete: {session.received} of {session.size} bytes received', status=409)
+    path = temp_path(session)
+    with open(path, 'rb') as f:
+        digest = file_digest(f)
+    if session.sha256 and session.sha256.lower() != digest:
+        discard_upload(session)
+        raise ChunkError('Checksum mismatch, upload discarded')
+    if session.purpose == 'DOCTOR_PHOTO':
+        try:
+            with Image.open(path) as image:
+                image.verify()
+        except Exception:
+            discard_upload(session)
+            raise ChunkError('Upload a valid image')
+    # Результаты анализов — в закрытое хранилище, фото врачей — в публичное
+    storage = Analysis._meta.get_field('result_file').storage if session.purpose == 'ANALYSIS_RESULT' else None
+    return store_local_file(path, session.filename, digest, storage)
+
+
+def remove_temp_file(session):
+    path = temp_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+        return True
+    return False
+
+
+def discard_upload(session):
+    remove_temp_file(session)
+    session.status = 'ABORTED'
+    session.save(update_fields=['status', 'updated_at'])
+
+
+def clean_expired_uploads(hours=None, now=None):
+    """
+    Удаляет сессии без активности дольше hours часов вместе с их временными
+    файлами, а также старые .part-файлы без открытой сессии — их может
+    оставить часть, дописанная после отмены загрузки.
+    """
+    hours = settings.CHUNKED_UPLOAD_EXPIRE_HOURS if hours is None else hours
+    cutoff = (now or timezone.now()) - timedelta(hours=hours)
+    expired = UploadSession.objects.filter(updated_at__lt=cutoff)
+    removed = 0
+    for session in expired.only('id').iterator():
+        removed += remove_temp_file(session)
+    deleted, _ = expired.delete()
+
+    if os.path.isdir(settings.CHUNKED_UPLOAD_DIR):
+        open_ids = {str(pk) for pk in UploadSession.objects.filter(status='OPEN').values_list('pk', flat=True)}
+        for entry in os.scandir(settings.CHUNKED_UPLOAD_DIR):
+            session_id, ext = os.path.splitext(entry.name)
+            if ext != '.part' or session_id in open_ids:
+                continue
+            if entry.stat().st_mtime < cutoff.timestamp():
+                os.remove(entry.path)
+                removed += 1
+    return deleted, removed
@@ -2,10 +2,16 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
+from .async_views import (
+    AsyncDoctorDashboardView, AsyncDoctorDirectoryView, AsyncLoginView, AsyncMeView, AsyncPatientDashboardView,
+    AsyncTimeSlotListView, SlotStreamView,
+)
+from .metrics import metrics_view
 from .views import (
     UserViewSet, DoctorViewSet, TimeSlotViewSet, AppointmentViewSet,
     MedicalRecordViewSet, AnalysisViewSet, PatientDashboardView,
-    DoctorDashboardView, CustomTokenObtainPairView
+    DoctorDashboardView, PatientDashboardSummaryView, DoctorDashboardSummaryView, CustomTokenObtainPairView,
+    HealthView, UploadViewSet
 )
 
 router = DefaultRouter()
@@ -15,28 +21,46 @@ router.register(r'time-slots', TimeSlotViewSet)
 router.register(r'appointments', AppointmentViewSet)
 router.register(r'medical-records', MedicalRecordViewSet)
 router.register(r'analyses', AnalysisViewSet)
+router.register(r'uploads', UploadViewSet, basename='upload')
 
 # URL patterns for the API
 urlpatterns = [
+    # Раньше роутера, иначе stream попадёт в time-slots/<pk>/
+    path('time-slots/stream/', SlotStreamView.as_view(), name='time-slot-stream'),
     path('', include(router.urls)),
+    path('health/', HealthView.as_view(), name='health'),
+    path('metrics/', metrics_view, name='metrics'),
     path('auth/login/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('auth/login/async/', AsyncLoginView.as_view(), name='token_obtain_pair_async'),
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
+    # Async-версии самых частых чтений для ASGI (uvicorn keremet.asgi:application)
+    path('async/', include([
+        path('users/me/', AsyncMeView.as_view(), name='async-user-me'),
+        path('doctors/', AsyncDoctorDirectoryView.as_view(), name='async-doctor-list'),
+        path('time-slots/', AsyncTimeSlotListView.as_view(), name='async-timeslot-list'),
+        path('patient/dashboard/', AsyncPatientDashboardView.as_view(), name='async-patient-dashboard'),
+        path('doctor/dashboard/', AsyncDoctorDashboardView.as_view(), name='async-doctor-dashboard'),
+    ])),
     
     # Patient dashboard URLs
+    path('patient/dashboard/', PatientDashboardSummaryView.as_view(), name='patient_dashboard'),
     path('patient/dashboard/appointments/upcoming/', PatientDashboardView.as_view(view_type='upcoming'), name='patient_upcoming_appointments'),
     path('patient/dashboard/appointments/history/', PatientDashboardView.as_view(view_type='history'), name='patient_appointment_history'),
-    path('patient/dashboard/analyses/', PatientDashboardView.as_view(), name='patient_analyses'),
-    path('patient/dashboard/medical-record/', PatientDashboardView.as_view(), name='patient_medical_record'),
+    path('patient/dashboard/analyses/', PatientDashboardView.as_view(view_type='analyses'), name='patient_analyses'),
+    path('patient/dashboard/medical-record/', PatientDashboardView.as_view(view_type='medical_records'), name='patient_medical_record'),
     
     # Doctor dashboard URLs
-    path('doctor/dashboard/schedule/', DoctorDashboardView.as_view(), name='doctor_schedule'),
+    path('doctor/dashboard/', DoctorDashboardSummaryView.as_view(), name='doctor_dashboard'),
+    path('doctor/dashboard/schedule/', DoctorDashboardView.as_view(view_type='schedule'), name='doctor_schedule'),
     path('doctor/dashboard/appointments/upcoming/', DoctorDashboardView.as_view(view_type='upcoming'), name='doctor_upcoming_appointments'),
     path('doctor/dashboard/appointments/history/', DoctorDashboardView.as_view(view_type='history'), name='doctor_appointment_history'),
-    path('doctor/dashboard/patients/', DoctorDashboardView.as_view(), name='doctor_patients'),
+    path('doctor/dashboard/patients/', DoctorDashboardView.as_view(view_type='patients'), name='doctor_patients'),
     
     # Doctor time slots and appointments
     path('doctor/', include([
         path('time-slots/', TimeSlotViewSet.as_view({'get': 'list', 'post': 'create'}), name='doctor-time-slots'),
+        path('time-slots/generate/', TimeSlotViewSet.as_view({'post': 'generate'}), name='doctor-time-slots-generate'),
         path('time-slots/<int:pk>/', TimeSlotViewSet.as_view({'delete': 'destroy'}), name='doctor-time-slot-detail'),
         path('appointments/', AppointmentViewSet.as_view({'get': 'list'}), name='doctor-appointments'),
     ])),
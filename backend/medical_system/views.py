@@ -1,20 +1,57 @@
 from rest_framework import viewsets, generics, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
-from django.core.mail import send_mail
+from django.conf import settings
 from django.utils import timezone
-from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor
-from .serializers import UserSerializer, TimeSlotSerializer, AppointmentSerializer, MedicalRecordSerializer, AnalysisSerializer, DoctorSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
-from django.contrib.auth import get_user_model
-from django.core.exceptions import ObjectDoesNotExist
+from django.db import IntegrityError, transaction
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from .models import User, TimeSlot, Appointment, MedicalRecord, Analysis, Doctor, IdempotencyKey, UploadSession
+from .read_serializers import AnalysisReadSerializer, AppointmentReadSerializer
+from .serializers import (
+    UserSerializer, TimeSlotSerializer, AppointmentSerializer, MedicalRecordSerializer, AnalysisSerializer,
+    DoctorSerializer, ScheduleTemplateSerializer, NextAvailableQuerySerializer, AvailableSlotSerializer,
+    UploadSessionSerializer,
+)
+from .mixins import QueryPlanMixin, ConditionalGetMixin, ReadSerializerMixin
+from .filters import TimeSlotFilter, AppointmentFilter
+from .pagination import KeysetPagination, AppointmentPagination, AnalysisPagination, MedicalRecordPagination
+from .dashboard import PATIENT_SECTIONS, DOCTOR_SECTIONS, build_dashboard
+from .booking import book_time_slot, cancel_appointment, SlotUnavailable, AppointmentAlreadyCanceled
+from .outbox import enqueue_email
+from .idempotency import active_keys, key_cutoff
+from .scheduling import expand_weekly_template, generate_slots
+from .caching import get_directory_version, directory_etag, get_cached_directory, set_cached_directory
+from . import db_stats
+from .routers import read_from
+from .downloads import serve_file
+from .blobs import store_upload
+from .uploads import ChunkError, discard_upload, finish_upload, parse_content_range, write_chunk
+from .renderers import PassthroughRenderer
+from .metrics import has_metrics_access
+from .login import check_rate_limit, client_ip, find_user, login_payload, record_login, retry_after_header
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+import hashlib
+import json
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
+
+def request_fingerprint(request):
+    payload = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method} {request.path} {payload}'.encode()).hexdigest()
+
+def user_etag(user):
+    fields = [name for name in UserSerializer.Meta.fields if name != 'password']
+    return quote_etag(hashlib.sha1(repr([getattr(user, name) for name in fields]).encode()).hexdigest())
+
 class IsDoctor(permissions.BasePermission):
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'DOCTOR'
@@ -45,17 +82,28 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get', 'put'], permission_classes=[permissions.IsAuthenticated])
     def me(self, request):
-        serializer = self.get_serializer(request.user)
         if request.method == 'PUT':
             serializer = self.get_serializer(request.user, data=request.data, partial=True)
             serializer.is_valid(raise_exception=True)
             serializer.save()
-        return Response(serializer.data)
+            return Response(serializer.data)
+
+        # Пользователь уже загружен аутентификацией: валидатор считается без запросов
+        user = request.user
+        etag = user_etag(user)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response = Response(self.get_serializer(user).data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
-class DoctorViewSet(viewsets.ModelViewSet):
+class DoctorViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     permission_classes = [permissions.IsAuthenticated]
+    use_read_replica = True
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -69,6 +117,32 @@ class DoctorViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(specialty=specialty)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if set(request.query_params) - {'specialty'}:
+            return super().list(request, *args, **kwargs)
+
+        # Справочник меняется редко: отдаём 304 или готовый JSON из кэша без запросов к БД
+        specialty = request.query_params.get('specialty')
+        version = get_directory_version()
+        etag = quote_etag(directory_etag(version, request, specialty))
+        last_modified = int(version)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        data = get_cached_directory(version, request, specialty)
+        if data is None:
+            # Кэш живёт до следующей смены версии, поэтому наполняем его из
+            # default, а не из реплики, которая может ещё не догнать запись
+            with read_from(None):
+                data = super().list(request, *args, **kwargs).data
+            set_cached_directory(version, request, specialty, data)
+        response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
     @action(detail=False, methods=['get', 'put', 'patch'])
     def me(self, request):
         doctor = get_object_or_404(Doctor, user=request.user)
@@ -83,35 +157,87 @@ class DoctorViewSet(viewsets.ModelViewSet):
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'], url_path='next-available')
+    def next_available(self, request):
+        params = NextAvailableQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        options = params.validated_data
+
+        doctors = Doctor.objects.all()
+        if options.get('specialty'):
+            doctors = doctors.filter(specialty=options['specialty'])
+        if options.get('online'):
+            doctors = doctors.filter(available_for_online=True)
+        if 'max_price' in options:
+            doctors = doctors.filter(consultation_price__lte=options['max_price'])
+        if 'min_experience' in options:
+            doctors = doctors.filter(experience__gte=options['min_experience'])
+
+        slots = TimeSlot.objects.filter(
+            status='AVAILABLE',
+            start_time__gte=options.get('after') or timezone.now(),
+            doctor__in=doctors.values('user_id'),
+        )
+        if 'per_doctor' in options:
+            # Не больше N ближайших слотов у каждого врача, чтобы один врач не занял всю выдачу
+            slots = slots.annotate(
+                doctor_rank=Window(RowNumber(), partition_by=F('doctor_id'), order_by=F('start_time').asc())
+            ).filter(doctor_rank__lte=options['per_doctor'])
+        slots = slots.select_related(*AvailableSlotSerializer.Meta.select_related)
+        slots = slots.order_by('start_time', 'id')[:options['limit']]
+        serializer = AvailableSlotSerializer(slots, many=True, context=self.get_serializer_context())
+        return Response(serializer.data)
+
     @action(detail=True, methods=['post'])
     def upload_photo(self, request, pk=None):
         doctor = self.get_object()
         if 'photo' not in request.FILES:
             return Response({'error': 'No photo provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        doctor.photo = request.FILES['photo']
+        doctor.photo.name, _ = store_upload(request.FILES['photo'])
         doctor.save()
         serializer = self.get_serializer(doctor)
         return Response(serializer.data)
 
-class TimeSlotViewSet(viewsets.ModelViewSet):
+class TimeSlotViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = TimeSlot.objects.all()
     serializer_class = TimeSlotSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filterset_fields = ['status', 'start_time']
+    use_read_replica = True
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = TimeSlotFilter
 
     def get_queryset(self):
         if self.request.user.role == 'DOCTOR':
-            return TimeSlot.objects.filter(doctor=self.request.user)
-        return TimeSlot.objects.filter(status='AVAILABLE')
+            queryset = TimeSlot.objects.filter(doctor=self.request.user)
+        else:
+            queryset = TimeSlot.objects.filter(status='AVAILABLE')
+        return queryset.order_by('start_time')
 
     def perform_create(self, serializer):
         serializer.save(doctor=self.request.user)
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['post'], permission_classes=[permissions.IsAuthenticated, IsDoctor])
+    def generate(self, request):
+        template = ScheduleTemplateSerializer(data=request.data)
+        template.is_valid(raise_exception=True)
+        options = template.validated_data
+        intervals = expand_weekly_template(
+            options['start_date'], options['weeks'], options['weekdays'],
+            options['day_start'], options['day_end'], options['slot_minutes'],
+            skip_holidays=options['skip_holidays'], skip_dates=options['skip_dates'],
+        )
+        created, skipped = generate_slots([request.user], intervals)
+        return Response({'created': created, 'skipped': skipped}, status=status.HTTP_201_CREATED)
+
+class AppointmentViewSet(ConditionalGetMixin, ReadSerializerMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
+    read_serializer_class = AppointmentReadSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = AppointmentPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = AppointmentFilter
 
     def get_queryset(self):
         user = self.request.user
@@ -121,43 +247,85 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             return Appointment.objects.filter(patient=user)
         return Appointment.objects.none()
 
-    def perform_create(self, serializer):
-        time_slot = serializer.validated_data['time_slot']
-        if time_slot.status != 'AVAILABLE':
-            return Response({"error": "Time slot is not available"}, status=status.HTTP_400_BAD_REQUEST)
-        time_slot.status = 'BOOKED'
-        time_slot.save()
-        appointment = serializer.save(patient=self.request.user, doctor=time_slot.doctor)
-        send_mail(
-            'Appointment Confirmation',
-            f'You have booked an appointment with {appointment.doctor} at {appointment.time_slot.start_time}',
-            'from@example.com',
-            [appointment.patient.email],
-            fail_silently=True,
-        )
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        key = request.headers.get('Idempotency-Key')
+        fingerprint = request_fingerprint(request)
+        if key:
+            replay = self.replay_idempotent(request.user, key, fingerprint)
+            if replay is not None:
+                return replay
+
+        try:
+            with transaction.atomic():
+                record = None
+                if key:
+                    # Истёкший ключ с тем же значением больше не действует
+                    IdempotencyKey.objects.filter(user=request.user, key=key, created_at__lt=key_cutoff()).delete()
+                    record = IdempotencyKey.objects.create(
+                        user=request.user, key=key, request_fingerprint=fingerprint
+                    )
+                try:
+                    appointment = book_time_slot(
+                        request.user,
+                        serializer.validated_data['time_slot'].pk,
+                        reason=serializer.validated_data.get('reason'),
+                    )
+                except SlotUnavailable:
+                    appointment = None
+                    data, code = {"error": "Time slot is not available"}, status.HTTP_400_BAD_REQUEST
+                else:
+                    data, code = self.get_serializer(appointment).data, status.HTTP_201_CREATED
+                    enqueue_email(
+                        'Appointment Confirmation',
+                        f'You have booked an appointment with {appointment.doctor} at {appointment.time_slot.start_time}',
+                        [appointment.patient.email],
+                    )
+                if record:
+                    record.response_status = code
+                    record.response_body = data
+                    record.save(update_fields=['response_status', 'response_body'])
+        except IntegrityError:
+            # Параллельный запрос с тем же ключом успел раньше
+            replay = self.replay_idempotent(request.user, key, fingerprint)
+            if replay is None:
+                raise
+            return replay
+
+        return Response(data, status=code)
+
+    def replay_idempotent(self, user, key, fingerprint):
+        record = active_keys().filter(user=user, key=key).first()
+        if record is None or record.response_status is None:
+            return None
+        if record.request_fingerprint != fingerprint:
+            return Response(
+                {"error": "Idempotency-Key was already used with a different request"},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(record.response_body, status=record.response_status, headers={'Idempotent-Replayed': 'true'})
 
     @action(detail=True, methods=['patch'])
     def cancel(self, request, pk=None):
         appointment = self.get_object()
-        if appointment.status == 'CANCELED':
+        try:
+            with transaction.atomic():
+                cancel_appointment(appointment)
+                enqueue_email(
+                    'Appointment Canceled',
+                    f'Your appointment with {appointment.doctor} at {appointment.time_slot.start_time} has been canceled',
+                    [appointment.patient.email],
+                )
+        except AppointmentAlreadyCanceled:
             return Response({"error": "Appointment already canceled"}, status=status.HTTP_400_BAD_REQUEST)
-        appointment.status = 'CANCELED'
-        appointment.time_slot.status = 'AVAILABLE'
-        appointment.time_slot.save()
-        appointment.save()
-        send_mail(
-            'Appointment Canceled',
-            f'Your appointment with {appointment.doctor} at {appointment.time_slot.start_time} has been canceled',
-            'from@example.com',
-            [appointment.patient.email],
-            fail_silently=True,
-        )
         return Response({"status": "Appointment canceled"})
 
-class MedicalRecordViewSet(viewsets.ModelViewSet):
+class MedicalRecordViewSet(ConditionalGetMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = MedicalRecord.objects.all()
     serializer_class = MedicalRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = MedicalRecordPagination
 
     def get_queryset(self):
         user = self.request.user
@@ -170,10 +338,13 @@ class MedicalRecordViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(doctor=self.request.user)
 
-class AnalysisViewSet(viewsets.ModelViewSet):
+class AnalysisViewSet(ConditionalGetMixin, ReadSerializerMixin, QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Analysis.objects.all()
     serializer_class = AnalysisSerializer
+    read_serializer_class = AnalysisReadSerializer
     permission_classes = [permissions.IsAuthenticated]
+    use_read_replica = True
+    pagination_class = AnalysisPagination
     filterset_fields = ['status', 'date_added']
 
     def get_queryset(self):
@@ -210,13 +381,27 @@ class AnalysisViewSet(viewsets.ModelViewSet):
         if 'result_file' not in request.FILES:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
-        analysis.result_file = request.FILES['result_file']
+        analysis.result_file.name, _ = store_upload(request.FILES['result_file'], analysis.result_file.storage)
         analysis.status = 'READY'
         analysis.save()
         
         serializer = self.get_serializer(analysis)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, PassthroughRenderer])
+    def download(self, request, pk=None):
+        """Файл результата для пациента и врача анализа; ?inline=1 — открыть в браузере."""
+        analysis = self.get_object()
+        if not analysis.result_file:
+            return Response({'error': 'No result file'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            # Файл хранится под хешем, пользователю отдаём его под именем анализа
+            ext = os.path.splitext(analysis.result_file.name)[1]
+            return serve_file(request, analysis.result_file, as_attachment=request.query_params.get('inline') != '1',
+                              filename=f'{analysis.name}{ext}')
+        except FileNotFoundError:
+            return Response({'error': 'Result file is missing'}, status=status.HTTP_404_NOT_FOUND)
+
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         analysis = self.get_object()
@@ -234,78 +419,222 @@ class AnalysisViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(analysis)
         return Response(serializer.data)
 
-class PatientDashboardView(generics.ListAPIView):
-    permission_classes = [permissions.IsAuthenticated, IsPatient]
-    serializer_class = AppointmentSerializer
-    view_type = None
-    
+class UploadViewSet(viewsets.GenericViewSet):
+    """
+    Докачиваемая загрузка файлов частями:
+    POST /uploads/ -> PUT /uploads/<id>/ с Content-Range (сколько угодно раз,
+    GET /uploads/<id>/ — сколько уже получено) -> POST /uploads/<id>/complete/.
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
     def get_queryset(self):
-        if self.view_type == 'upcoming':
-            return Appointment.objects.filter(
-                patient=self.request.user,
-                status='SCHEDULED',
-                time_slot__start_time__gte=timezone.now()
-            ).order_by('time_slot__start_time')
-        elif self.view_type == 'history':
-            return Appointment.objects.filter(
-                patient=self.request.user,
-                time_slot__start_time__lt=timezone.now()
-            ).order_by('-time_slot__start_time')
-        return Appointment.objects.none()
+        return UploadSession.objects.filter(user=self.request.user)
 
-class DoctorDashboardView(generics.ListAPIView):
-    permission_classes = [permissions.IsAuthenticated, IsDoctor]
-    serializer_class = AppointmentSerializer
+    def get_upload_target(self, purpose, target_id, for_update=False):
+        user = self.request.user
+        if purpose == 'ANALYSIS_RESULT':
+            # Те же права, что у AnalysisViewSet.upload_result
+            queryset = Analysis.objects.all()
+            if user.role == 'DOCTOR':
+                queryset = queryset.filter(doctor=user)
+            elif user.role == 'PATIENT':
+                queryset = queryset.filter(patient=user)
+        else:
+            queryset = Doctor.objects.all()
+            if not user.is_staff:
+                queryset = queryset.filter(user=user)
+        if for_update:
+            queryset = queryset.select_for_update()
+        return queryset.filter(pk=target_id).first()
+
+    def create(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        if self.get_upload_target(data['purpose'], data['target_id']) is None:
+            return Response({'error': 'Target not found'}, status=status.HTTP_404_NOT_FOUND)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, pk=None):
+        return Response(self.get_serializer(self.get_object()).data)
+
+    def update(self, request, pk=None):
+        # Тело запроса читается из потока по кускам, request.data не трогаем.
+        # Транзакции и блокировки нет: write_chunk сдвигает смещение атомарным UPDATE
+        session = get_object_or_404(self.get_queryset(), pk=pk)
+        if session.status != 'OPEN':
+            return Response({'error': f'Upload is {session.status.lower()}'}, status=status.HTTP_409_CONFLICT)
+        try:
+            start, end = parse_content_range(request.META.get('HTTP_CONTENT_RANGE'), session.size)
+            write_chunk(session, request.stream, start, end)
+        except ChunkError as exc:
+            return Response({'error': str(exc), 'received': session.received}, status=exc.status)
+        return Response(self.get_serializer(session).data)
+
+    def destroy(self, request, pk=None):
+        with transaction.atomic():
+            session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            if session.status == 'OPEN':
+                discard_upload(session)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        with transaction.atomic():
+            session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            if session.status != 'OPEN':
+                return Response({'error': f'Upload is {session.status.lower()}'}, status=status.HTTP_409_CONFLICT)
+            target = self.get_upload_target(session.purpose, session.target_id, for_update=True)
+            if target is None:
+                discard_upload(session)
+                return Response({'error': 'Target not found'}, status=status.HTTP_404_NOT_FOUND)
+            try:
+                name, deduplicated = finish_upload(session)
+            except ChunkError as exc:
+                return Response({'error': str(exc), 'received': session.received}, status=exc.status)
+
+            if session.purpose == 'ANALYSIS_RESULT':
+                target.result_file.name = name
+                target.status = 'READY'
+                target.save()
+                target_data = AnalysisSerializer(target, context=self.get_serializer_context()).data
+            else:
+                target.photo.name = name
+                target.save()
+                target_data = DoctorSerializer(target, context=self.get_serializer_context()).data
+            session.status = 'COMPLETE'
+            session.save(update_fields=['status', 'updated_at'])
+
+        data = self.get_serializer(session).data
+        data.update(deduplicated=deduplicated, target=target_data)
+        return Response(data)
+
+class DashboardSectionView(ConditionalGetMixin, QueryPlanMixin, generics.ListAPIView):
+    """Один раздел личного кабинета (см. dashboard.PATIENT_SECTIONS / DOCTOR_SECTIONS)."""
+    pagination_class = KeysetPagination
+    use_read_replica = True
+    sections = {}
     view_type = None
-    
+
+    @property
+    def section(self):
+        return self.sections[self.view_type]
+
+    @property
+    def cursor_ordering(self):
+        return self.section.ordering
+
+    @property
+    def updated_field(self):
+        return self.section.updated_field
+
+    def get_serializer_class(self):
+        return self.section.serializer_class
+
     def get_queryset(self):
-        if self.view_type == 'upcoming':
-            return Appointment.objects.filter(
-                doctor=self.request.user,
-                status='SCHEDULED',
-                time_slot__start_time__gte=timezone.now()
-            ).order_by('time_slot__start_time')
-        elif self.view_type == 'history':
-            return Appointment.objects.filter(
-                doctor=self.request.user,
-                time_slot__start_time__lt=timezone.now()
-            ).order_by('-time_slot__start_time')
-        return Appointment.objects.none()
+        return self.section.queryset(self.request.user, timezone.now())
+
+class PatientDashboardView(DashboardSectionView):
+    permission_classes = [permissions.IsAuthenticated, IsPatient]
+    sections = PATIENT_SECTIONS
+
+class DoctorDashboardView(DashboardSectionView):
+    permission_classes = [permissions.IsAuthenticated, IsDoctor]
+    sections = DOCTOR_SECTIONS
+
+class DashboardSummaryView(generics.GenericAPIView):
+    """Весь кабинет одним запросом: профиль и первые страницы всех разделов."""
+    use_read_replica = True
+    sections = {}
+    default_limit = 5
+    max_limit = 50
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get('limit', self.default_limit))
+        except ValueError:
+            return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, self.max_limit))
+        return Response(build_dashboard(request, self.sections, limit))
+
+class PatientDashboardSummaryView(DashboardSummaryView):
+    permission_classes = [permissions.IsAuthenticated, IsPatient]
+    sections = PATIENT_SECTIONS
+
+class DoctorDashboardSummaryView(DashboardSummaryView):
+    permission_classes = [permissions.IsAuthenticated, IsDoctor]
+    sections = DOCTOR_SECTIONS
+
+class HealthView(APIView):
+    """
+    Readiness-проба: каждая база отвечает на SELECT 1. Всем отдаётся только
+    ok/error; статистика соединений и текст ошибок — с токеном метрик или при DEBUG.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        databases = {}
+        for alias in settings.DATABASES:
+            databases[alias] = {**db_stats.probe(alias), 'pool': db_stats.pool_stats(alias)}
+        healthy = all(db['status'] == 'ok' for db in databases.values())
+        data = {'status': 'ok' if healthy else 'error'}
+        if has_metrics_access(request):
+            data['databases'] = databases
+        return Response(data, status=status.HTTP_200_OK if healthy else status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+class CustomTokenObtainPairView(APIView):
+    """
+    Вход по email и паролю: один запрос пользователя, проверка пароля и
+    токены из уже загруженного объекта. Попытки ограничены по email и IP.
+    """
+    permission_classes = [permissions.AllowAny]
+    authentication_classes = []
 
-class CustomTokenObtainPairView(TokenObtainPairView):
     def post(self, request, *args, **kwargs):
         try:
             email = request.data.get('email')
-            User = get_user_model()
-            
-            try:
-                user = User.objects.get(email=email)
-                logger.info(f"Login attempt for user: {email}")
-            except ObjectDoesNotExist:
+            password = request.data.get('password')
+            if not email or not password:
+                return Response(
+                    {"detail": "Укажите email и пароль."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            retry_after = check_rate_limit(email, client_ip(request))
+            if retry_after:
+                logger.warning(f"Login rate limit exceeded for {email}")
+                return Response(
+                    {"detail": "Слишком много попыток входа. Попробуйте позже."},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={'Retry-After': retry_after_header(retry_after)}
+                )
+
+            user = find_user(email)
+            if user is None:
                 logger.warning(f"Login attempt failed: User with email {email} not found")
                 return Response(
                     {"detail": "Пользователь с таким email не найден."},
                     status=status.HTTP_404_NOT_FOUND
                 )
+            logger.info(f"Login attempt for user: {email}")
+
+            if not user.check_password(password) or not user.is_active:
+                return Response(
+                    {"detail": "Неверный пароль."},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+
+            record_login(user)
+            logger.info(f"User {email} logged in successfully")
+            return Response(login_payload(user))
 
-            response = super().post(request, *args, **kwargs)
-            if response.status_code == 200:
-                logger.info(f"User {email} logged in successfully")
-                # Add user role to response
-                response.data['user_role'] = user.role
-                response.data['user_id'] = user.id
-                response.data['full_name'] = f"{user.first_name} {user.last_name}"
-            return response
-
-        except TokenError as e:
-            logger.error(f"Token error during login: {str(e)}")
-            return Response(
-                {"detail": "Неверный пароль."},
-                status=status.HTTP_401_UNAUTHORIZED
-            )
         except Exception as e:
             logger.error(f"Unexpected error during login: {str(e)}")
             return Response(
                 {"detail": "Произошла ошибка при входе в систему."},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
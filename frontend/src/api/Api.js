@@ -64,6 +64,24 @@ api.interceptors.response.use(
   }
 );
 
+// Списки записей, анализов и медкарт приходят постранично: { next, previous, results }.
+// Проходим по ссылкам next, пока страницы не кончатся, и возвращаем весь список.
+const MAX_PAGE_SIZE = 200;
+
+const fetchAllPages = async (url) => {
+  let response = await api.get(url, { params: { page_size: MAX_PAGE_SIZE } });
+  if (Array.isArray(response.data)) {
+    return response.data;
+  }
+  const items = [...response.data.results];
+  while (response.data.next) {
+    // next уже содержит page_size и курсор
+    response = await api.get(response.data.next);
+    items.push(...response.data.results);
+  }
+  return items;
+};
+
 export const authApi = {
   login: async (email, password) => {
     try {
@@ -133,8 +151,7 @@ export const authApi = {
 export const doctorApi = {
   getUpcomingAppointments: async () => {
     try {
-      const response = await api.get('/doctor/dashboard/appointments/upcoming/');
-      return response.data;
+      return await fetchAllPages('/doctor/dashboard/appointments/upcoming/');
     } catch (error) {
       console.error('Error fetching doctor appointments:', error);
       throw error.response?.data || error.message;
@@ -143,8 +160,7 @@ export const doctorApi = {
 
   getAppointmentHistory: async () => {
     try {
-      const response = await api.get('/doctor/dashboard/appointments/history/');
-      return response.data;
+      return await fetchAllPages('/doctor/dashboard/appointments/history/');
     } catch (error) {
       console.error('Error fetching appointment history:', error);
       throw error.response?.data || error.message;
@@ -254,8 +270,7 @@ export const doctorApi = {
   getMyAppointments: async (date) => {
     try {
       const formattedDate = date ? date.toISOString().split('T')[0] : '';
-      const response = await api.get(`/doctor/appointments/${formattedDate ? `?date=${formattedDate}` : ''}`);
-      return response.data;
+      return await fetchAllPages(`/doctor/appointments/${formattedDate ? `?date=${formattedDate}` : ''}`);
     } catch (error) {
       console.error('Error fetching my appointments:', error);
       throw error.response?.data || error.message;
@@ -286,8 +301,7 @@ export const patientApi = {
 
   getUpcomingAppointments: async () => {
     try {
-      const response = await api.get('/patient/dashboard/appointments/upcoming/');
-      return response.data;
+      return await fetchAllPages('/patient/dashboard/appointments/upcoming/');
     } catch (error) {
       console.error('Error fetching upcoming appointments:', error);
       throw error.response?.data || error.message;
@@ -296,8 +310,7 @@ export const patientApi = {
 
   getAppointmentHistory: async () => {
     try {
-      const response = await api.get('/patient/dashboard/appointments/history/');
-      return response.data;
+      return await fetchAllPages('/patient/dashboard/appointments/history/');
     } catch (error) {
       console.error('Error fetching appointment history:', error);
       throw error.response?.data || error.message;
@@ -306,8 +319,7 @@ export const patientApi = {
 
   getMedicalRecords: async () => {
     try {
-      const response = await api.get('/medical-records/');
-      return response.data;
+      return await fetchAllPages('/medical-records/');
     } catch (error) {
       console.error('Error fetching medical records:', error);
       throw error.response?.data || error.message;
@@ -316,8 +328,7 @@ export const patientApi = {
 
   getAnalyses: async () => {
     try {
-      const response = await api.get('/analyses/');
-      return response.data;
+      return await fetchAllPages('/analyses/');
     } catch (error) {
       console.error('Error fetching analyses:', error);
       throw error.response?.data || error.message;
@@ -333,6 +344,16 @@ export const patientApi = {
       throw error.response?.data || error.message;
     }
   },
+
+  // Слоты врача в реальном времени (server-sent events); возвращает функцию отписки.
+  // EventSource не передает заголовки, поэтому токен идет в query string.
+  subscribeDoctorTimeSlots: (doctorId, { onSnapshot, onSlot }) => {
+    const token = encodeURIComponent(localStorage.getItem('access_token') || '');
+    const source = new EventSource(`${API_URL}/time-slots/stream/?doctor=${doctorId}&token=${token}`);
+    source.addEventListener('snapshot', (event) => onSnapshot(JSON.parse(event.data)));
+    source.addEventListener('slot', (event) => onSlot(JSON.parse(event.data)));
+    return () => source.close();
+  },
 };
 
 export const profileApi = {
@@ -371,12 +392,22 @@ export const commonApi = {
 
 export const getAnalyses = async () => {
   try {
-    const response = await api.get('/analyses/');
-    return response.data;
+    return await fetchAllPages('/analyses/');
   } catch (error) {
     console.error('Error fetching analyses:', error);
     throw error.response?.data || error.message;
   }
 };
 
+// Файл результата анализа отдаётся только авторизованным запросом
+export const downloadAnalysisResult = async (analysisId) => {
+  try {
+    const response = await api.get(`/analyses/${analysisId}/download/`, { responseType: 'blob' });
+    return response.data;
+  } catch (error) {
+    console.error('Error downloading analysis result:', error);
+    throw error.response?.data || error.message;
+  }
+};
+
 export default api;
\ No newline at end of file
@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import './AnalysesPage.css';
-import { getAnalyses } from '../../api/Api';
+import { getAnalyses, downloadAnalysisResult } from '../../api/Api';
 
 function AnalysesPage({ userRole = 'PATIENT', isProfileView = false }) {
     const navigate = useNavigate();
@@ -43,11 +43,18 @@ function AnalysesPage({ userRole = 'PATIENT', isProfileView = false }) {
         };
     }, []);
 
-    const handleDownload = (analysis) => {
-        if (analysis.result_file) {
-            window.open(analysis.result_file, '_blank');
-        } else {
+    const handleDownload = async (analysis) => {
+        if (!analysis.result_file_url) {
             alert(`Файл для анализа "${analysis.name}" не найден`);
+            return;
+        }
+        try {
+            const blob = await downloadAnalysisResult(analysis.id);
+            const url = URL.createObjectURL(blob);
+            window.open(url, '_blank');
+            setTimeout(() => URL.revokeObjectURL(url), 60000);
+        } catch (err) {
+            alert(`Не удалось загрузить файл для анализа "${analysis.name}"`);
         }
     };
 
@@ -87,7 +94,7 @@ function AnalysesPage({ userRole = 'PATIENT', isProfileView = false }) {
                                 <p className={`analysis-status ${analysis.status === 'Готов' ? 'ready' : 'processing'}`}>Статус: {analysis.status}</p>
                             </div>
                             <div className="analysis-actions">
-                                {analysis.status === 'Готов' && analysis.result_file ? (
+                                {analysis.status === 'Готов' && analysis.result_file_url ? (
                                     <button
                                         onClick={() => handleDownload(analysis)}
                                         className="download-button"
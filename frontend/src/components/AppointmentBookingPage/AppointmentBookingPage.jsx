@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { useLocation } from 'react-router-dom';
 import { patientApi } from '../../api/Api';
+import DoctorPhoto from '../DoctorsPage/DoctorPhoto';
 import './AppointmentBookingPage.css';
 
 export default function AppointmentBookingPage({ onBook }) {
@@ -28,6 +29,28 @@ export default function AppointmentBookingPage({ onBook }) {
     }
   }, [selectedDoctor]);
 
+  // Занятые и освободившиеся слоты приходят с сервера, без повторных запросов
+  useEffect(() => {
+    if (!selectedDoctor) {
+      return undefined;
+    }
+    return patientApi.subscribeDoctorTimeSlots(selectedDoctor.id, {
+      onSnapshot: (slots) => setAvailableSlots(slots.filter(slot => slot.status === 'AVAILABLE')),
+      onSlot: (slot) => {
+        setAvailableSlots(slots => {
+          const others = slots.filter(item => item.id !== slot.id);
+          if (slot.status !== 'AVAILABLE') {
+            return others;
+          }
+          return [...others, slot].sort((a, b) => new Date(a.start_time) - new Date(b.start_time));
+        });
+        if (slot.status !== 'AVAILABLE') {
+          setSelectedSlot(selected => (selected?.id === slot.id ? null : selected));
+        }
+      },
+    });
+  }, [selectedDoctor]);
+
   const fetchDoctors = async () => {
     try {
       setLoading(true);
@@ -123,7 +146,7 @@ export default function AppointmentBookingPage({ onBook }) {
                   <div key={doctor.id} className="doctor-card" onClick={() => handleSelectDoctor(doctor)}>
                     <div className="doctor-photo">
                       {doctor.photo_url ? (
-                        <img src={doctor.photo_url} alt={`${doctor.first_name} ${doctor.last_name}`} />
+                        <DoctorPhoto doctor={doctor} variant="card" retinaVariant="profile" alt={`${doctor.first_name} ${doctor.last_name}`} />
                       ) : (
                         <div className="doctor-initials">
                           {doctor.first_name[0]}{doctor.last_name[0]}
@@ -1,4 +1,5 @@
 import React from 'react';
+import DoctorPhoto from './DoctorPhoto';
 import './DoctorCard.css';
 
 const SPECIALTY_LABELS = {
@@ -20,7 +21,7 @@ function DoctorCard({ doctor, onSelect, isPatientView }) {
         <div className="doctor-card-vertical">
             <div className="doctor-photo-vertical">
                 {doctor.photo ? (
-                    <img src={doctor.photo} alt={fullName} />
+                    <DoctorPhoto doctor={doctor} variant="profile" retinaVariant="profile_2x" alt={fullName} />
                 ) : (
                     <div className="doctor-photo-placeholder doctor-initials-large">
                         {doctor.first_name[0]}{doctor.last_name[0]}
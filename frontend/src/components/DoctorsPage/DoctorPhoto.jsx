@@ -0,0 +1,23 @@
+import React from 'react';
+
+// Уменьшенные копии фото из photo_variants: WebP, если браузер умеет, иначе JPEG.
+// Пока копии не готовы, показываем оригинал.
+function DoctorPhoto({ doctor, variant = 'card', retinaVariant, alt }) {
+    const variants = doctor.photo_variants || {};
+    const main = variants[variant];
+    if (!main) {
+        const original = doctor.photo_url || doctor.photo;
+        return original ? <img src={original} alt={alt} /> : null;
+    }
+    const retina = retinaVariant && variants[retinaVariant];
+    const srcSet = (format) => (retina ? `${main[format]} 1x, ${retina[format]} 2x` : main[format]);
+
+    return (
+        <picture>
+            <source type="image/webp" srcSet={srcSet('webp')} />
+            <img src={main.jpeg} srcSet={srcSet('jpeg')} width={main.width} height={main.height} alt={alt} loading="lazy" />
+        </picture>
+    );
+}
+
+export default DoctorPhoto;